@@ -0,0 +1,12 @@
+"""
+Offline benchmarks for the backend hot paths.
+
+Run from the ``backend`` directory, e.g.::
+
+    python -m benchmarks.event_serialization --events 10000
+    python -m benchmarks.suite --quick
+
+``benchmarks.suite`` runs the ML, trending feed and ingestion benchmarks
+together, writes the timings to ``benchmarks/results/<commit>.json`` and
+compares them with a saved baseline. None of them touch the network.
+"""
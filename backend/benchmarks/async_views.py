@@ -0,0 +1,92 @@
+"""
+How many slow content generations one events process can hold at once,
+WSGI deployment against ASGI.
+
+Each step sends ``concurrency`` simultaneous ``/api/generate-content/``
+requests for distinct events, so the cache never answers them, and reports
+how long the whole wave took. With the fake model sleeping ``D`` seconds, a
+server that can hold every request finishes a wave in about ``D``; one that
+parks a thread per request queues them behind its thread count.
+
+Start both deployments with the fake model and the cache disabled::
+
+    cd backend && CONTENT_MODEL_BACKEND=fake FAKE_CONTENT_MODEL_DELAY=2 CONTENT_CACHE_ENABLED=false \\
+        gunicorn event_trigger.wsgi --workers 1 --threads 16 --bind 127.0.0.1:8000
+    cd backend && CONTENT_MODEL_BACKEND=fake FAKE_CONTENT_MODEL_DELAY=2 CONTENT_CACHE_ENABLED=false \\
+        uvicorn event_trigger.asgi:application --workers 1 --port 8001
+
+then, from ``backend``::
+
+    python -m benchmarks.async_views --concurrency 10,50,100,200,400
+"""
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.loadtest import percentile, _ms
+
+
+def generate(session, url, title):
+    event = {'title': title, 'description': 'Async view benchmark'}
+    start = time.perf_counter()
+    try:
+        response = session.post(f'{url}/api/generate-content/', json={'event': event}, timeout=300)
+        ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_wave(url, concurrency):
+    """Send ``concurrency`` requests at once and wait for all of them."""
+    url = url.rstrip('/')
+    run_id = uuid.uuid4().hex[:8]
+    sessions = [requests.Session() for _ in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(
+            lambda i: generate(sessions[i], url, f'Benchmark {run_id} #{i}'), range(concurrency)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, ok in samples if ok)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'concurrency': concurrency,
+        'wave_s': round(elapsed, 3),
+        'requests_per_s': round(len(latencies) / elapsed, 2),
+        'error_rate': errors / concurrency,
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--asgi-url', default='http://127.0.0.1:8001')
+    parser.add_argument('--concurrency', default='10,50,100,200', help='Comma separated wave sizes')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    deployments = {'wsgi': args.wsgi_url, 'asgi': args.asgi_url}
+    results = {name: [] for name in deployments}
+    for concurrency in (int(c) for c in args.concurrency.split(',')):
+        print(f'\n{concurrency} concurrent generations')
+        for name, url in deployments.items():
+            step = run_wave(url, concurrency)
+            results[name].append(step)
+            print(f"  {name}: wave {step['wave_s']:7.2f}s  {step['requests_per_s']:7.1f} req/s"
+                  f"  p50 {step['p50_ms']} ms  p99 {step['p99_ms']} ms  errors {step['error_rate']:.1%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
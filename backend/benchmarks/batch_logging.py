@@ -0,0 +1,112 @@
+"""
+Batch prediction latency with logging off, sampled and logging every post.
+
+Each mode posts the same batch to ``/ml/predict_batch`` through the Flask
+test client. ``every_post_sync`` writes one record per post on the request
+thread, like the old ``print`` calls; the other modes go through the
+background ``AsyncStreamHandler``.
+
+The random forest takes around 100 ms per post, which hides the logging cost,
+so by default the predictor's forest pass returns a fixed result and only the
+route's own per-post work (feature extraction included) is timed. ``--real-model`` runs the loaded model instead.
+
+    python -m benchmarks.batch_logging --posts 1000
+    python -m benchmarks.batch_logging --posts 50 --real-model
+"""
+import argparse
+import logging
+import random
+import sys
+import tempfile
+
+from benchmarks.common import ml_test_client, print_results, time_call
+
+SAMPLE_POSTS = [
+    'Big sale this weekend! 50% off everything 🎉 #sale #deal',
+    'Follow us and tag a friend who needs this 👇 #giveaway',
+    'New collection just dropped. Shop now: https://example.com/shop',
+    'Thanks @partner for the amazing collab! #teamwork',
+    'Quiet morning at the studio.',
+]
+
+
+def make_posts(count):
+    rng = random.Random(42)
+    return [
+        {'id': i, 'content': rng.choice(SAMPLE_POSTS) if (i + 1) % 50 else '', 'has_image': rng.random() < 0.5}
+        for i in range(count)
+    ]
+
+
+FIXED_PREDICTION = {'category': 'medium', 'confidence': 50.0, 'feature_importance': {}}
+
+
+def run(posts, repeat, output, real_model=False):
+    from unittest import mock
+
+    from telemetry import AsyncStreamHandler, JsonFormatter
+
+    client, routes = ml_test_client()
+    fixed = None
+    if not real_model:
+        # /ml/predict_batch extracts features per post and scores them in one predict_rows pass
+        mock.patch.object(routes.predictor, 'predict', return_value=FIXED_PREDICTION).start()
+        fixed = mock.patch.object(
+            routes.predictor, 'predict_rows', side_effect=lambda rows, *_: [FIXED_PREDICTION] * len(rows)
+        ).start()
+    batch = {'posts': make_posts(posts)}
+    logger = logging.getLogger(routes.__name__)
+    logger.propagate = False
+
+    def use(handler, level, rate):
+        for old in logger.handlers:
+            logger.removeHandler(old)
+            old.close()
+        if handler is not None:
+            logger.addHandler(handler)
+        logger.setLevel(level)
+        routes.item_sampler.rate = rate
+
+    def sync_handler():
+        handler = logging.StreamHandler(output)
+        handler.setFormatter(JsonFormatter())
+        return handler
+
+    def predict():
+        response = client.post('/ml/predict_batch', json=batch)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    modes = {
+        'off': lambda: use(None, logging.WARNING, 0),
+        'sampled_1pct': lambda: use(AsyncStreamHandler(output), logging.INFO, 0.01),
+        'every_post_async': lambda: use(AsyncStreamHandler(output), logging.INFO, 1.0),
+        'every_post_sync': lambda: use(sync_handler(), logging.INFO, 1.0),
+    }
+
+    results = {}
+    for name, configure in modes.items():
+        configure()
+        results[name] = time_call(predict, repeat)
+    use(None, logging.WARNING, 0)
+    mock.patch.stopall()
+    if fixed is not None:
+        assert fixed.called, 'the fixed prediction was never used; the timings include the real model'
+
+    label = 'real model' if real_model else 'fixed prediction'
+    print_results(f'Batch prediction ({posts} posts, {label})', results)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Log destination (default: a temporary file; "-" for stderr)')
+    parser.add_argument('--real-model', action='store_true', help='Time the loaded random forest too')
+    args = parser.parse_args()
+
+    if args.output == '-':
+        run(args.posts, args.repeat, sys.stderr, args.real_model)
+    else:
+        with open(args.output, 'a') if args.output else tempfile.TemporaryFile('w') as output:
+            run(args.posts, args.repeat, output, args.real_model)
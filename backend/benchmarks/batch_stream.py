@@ -0,0 +1,95 @@
+"""
+Peak memory and time to first byte of a large ``/ml/predict_batch``, as one
+JSON document against streamed NDJSON and MessagePack.
+
+Each format posts the same batch, read from a temporary file so the request
+body is not held in memory. The whole response is consumed, and Python
+allocations during the request are traced with tracemalloc. The JSON request
+parses the body and builds the whole response before the first byte, while
+the streamed formats work one chunk at a time. Each chunk is its own forest
+pass, so smaller chunks lower peak memory at some cost in total time.
+
+    python -m benchmarks.batch_stream --posts 5000
+    python -m benchmarks.batch_stream --posts 50000 --chunk 250
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.batch_logging import make_posts
+from benchmarks.common import ml_test_client
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'msgpack': 'application/msgpack',
+}
+
+
+def write_body(path, posts, wire_format):
+    with open(path, 'wb') as f:
+        if wire_format == 'json':
+            f.write(json.dumps({'posts': posts}).encode())
+        elif wire_format == 'ndjson':
+            for post in posts:
+                f.write(json.dumps(post).encode() + b'\n')
+        else:
+            import msgpack
+            packer = msgpack.Packer()
+            for post in posts:
+                f.write(packer.pack(post))
+
+
+def measure(client, path, wire_format, chunk):
+    with open(path, 'rb') as body:
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = client.post(
+            f'/ml/predict_batch?chunk={chunk}', input_stream=body,
+            content_type=CONTENT_TYPES[wire_format], buffered=False
+        )
+        first_byte = None
+        size = 0
+        for data in response.response:
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(data)
+        total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        response.close()
+    assert response.status_code == 200, response.status_code
+    return {
+        'first_byte_ms': round(first_byte * 1000, 1),
+        'total_ms': round(total * 1000, 1),
+        'peak_mb': round(peak / (1024 * 1024), 2),
+        'response_kb': round(size / 1024, 1),
+    }
+
+
+def run(posts=5000, chunk=1000, formats=('json', 'ndjson', 'msgpack')):
+    client, _ = ml_test_client()
+    batch = make_posts(posts)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for wire_format in formats:
+            path = f'{tmp}/body.{wire_format}'
+            write_body(path, batch, wire_format)
+            results[wire_format] = measure(client, path, wire_format, chunk)
+
+    print(f'\n/ml/predict_batch with {posts} posts (streamed chunk {chunk})')
+    for wire_format, stats in results.items():
+        print(f"  {wire_format:<8} first byte {stats['first_byte_ms']:9.1f} ms   total {stats['total_ms']:9.1f} ms   "
+              f"peak {stats['peak_mb']:7.2f} MB   response {stats['response_kb']:9.1f} KB")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--chunk', type=int, default=1000)
+    parser.add_argument('--formats', nargs='+', default=['json', 'ndjson', 'msgpack'], choices=list(CONTENT_TYPES))
+    args = parser.parse_args()
+    run(args.posts, args.chunk, args.formats)
@@ -0,0 +1,65 @@
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Keep per-request log summaries out of the timing output
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+def setup_django():
+    """Configure Django against a throwaway test database."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_trigger.settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def ml_test_client():
+    """Flask test client for the ML blueprint, plus the ``routes.ml_routes`` module.
+
+    Importing the routes loads the production model, as the ML server does.
+    """
+    src_dir = os.path.join(BACKEND_DIR, 'src')
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+
+    from flask import Flask
+    from routes import ml_routes
+
+    app = Flask(__name__)
+    app.register_blueprint(ml_routes.ml_routes, url_prefix='/ml')
+    return app.test_client(), ml_routes
+
+
+def time_call(func, repeat=5, warmup=1):
+    """Run ``func`` several times and return timing stats in milliseconds."""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'min_ms': min(samples),
+        'median_ms': statistics.median(samples),
+        'max_ms': max(samples),
+        'repeat': repeat,
+    }
+
+
+def print_results(title, results):
+    print(f"\n{title}")
+    for name, stats in results.items():
+        print(f"  {name:<40} median {stats['median_ms']:9.2f} ms   min {stats['min_ms']:9.2f} ms")
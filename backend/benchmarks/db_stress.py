@@ -0,0 +1,232 @@
+"""
+Concurrent read/write stress test for the database profile in settings.
+
+Writer threads upsert events the way ``fetch_events`` does and push content
+jobs through enqueue, claim and completion, while reader threads page through
+the trending feed and fetch single events. Every operation ends with
+``close_old_connections()``, as a request does, so reconnect cost under
+``CONN_MAX_AGE = 0`` is part of the timing.
+
+Each variant runs in its own interpreter against a fresh database (a
+temporary file for SQLite, ``test_<name>`` for Postgres). ``tuned`` is the
+profile as configured; ``untuned`` drops its OPTIONS and persistent
+connections, which is what settings used to ship.
+
+    python -m benchmarks.db_stress                            # tuned vs untuned SQLite
+    python -m benchmarks.db_stress --variant tuned --check    # exit 1 on any lock error
+    DATABASE_PROFILE=postgres python -m benchmarks.db_stress
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from benchmarks.common import BACKEND_DIR, setup_django
+from benchmarks.loadtest import percentile, _ms
+
+SEED_EVENTS = 5000
+PAGE_SIZE = 50
+
+
+def configure(variant, sqlite_path):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_trigger.settings')
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    if variant == 'untuned':
+        database['OPTIONS'] = {}
+        database['CONN_MAX_AGE'] = 0
+    if database['ENGINE'].endswith('sqlite3'):
+        # The default test database is in memory, where WAL and locking do not apply
+        database['TEST'] = {'NAME': sqlite_path}
+    old_name = database['NAME']
+    setup_django()
+    return old_name
+
+
+class Workload:
+    def __init__(self, rng, worker):
+        self.rng = rng
+        self.worker = worker
+        self.count = 0
+
+    def upsert_event(self):
+        from django.utils import timezone
+        from events.models import GlobalEvent
+
+        self.count += 1
+        day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        obj, created = GlobalEvent.objects.get_or_create(
+            title=f'Stress event {self.worker}-{self.count % 200}',
+            date=day + timedelta(days=self.count % 30),
+            defaults={'trending_score': self.rng.uniform(10, 100), 'event_type': 'Festival'},
+        )
+        if not created:
+            GlobalEvent.objects.filter(pk=obj.pk).update(trending_score=self.rng.uniform(10, 100))
+
+    def job_cycle(self):
+        from events.jobs import claim_next_job, enqueue_content_job
+        from events.models import ContentJob
+
+        enqueue_content_job({'title': f'Stress job {self.worker}', 'description': 'stress'})
+        job = claim_next_job()
+        if job is not None:
+            job.status = ContentJob.STATUS_SUCCEEDED
+            job.result = {'socialMedia': 'posts', 'videoScript': 'script'}
+            job.save(update_fields=['status', 'result'])
+
+    def trending_page(self):
+        from django.utils import timezone
+        from events.trending import EVENT_FIELDS, iter_event_rows, paginate, rank_events, upcoming_events
+
+        now = timezone.now()
+        page, _ = paginate(rank_events(upcoming_events(now), now), limit=PAGE_SIZE, now=now)
+        list(iter_event_rows([pk for _, pk in page], EVENT_FIELDS))
+
+    def get_event(self):
+        from events.models import GlobalEvent
+
+        GlobalEvent.objects.filter(pk=self.rng.randint(1, SEED_EVENTS)).values_list('id', 'title').first()
+
+
+WRITER_OPS = {'upsert_event': 3, 'job_cycle': 1}
+READER_OPS = {'trending_page': 1, 'get_event': 4}
+
+
+def stress(writers, readers, duration):
+    from django.db import OperationalError, close_old_connections, connection
+
+    stop = threading.Event()
+    samples = []  # (op, latency_s, error or None)
+    lock = threading.Lock()
+
+    def worker(index, weights):
+        rng = random.Random(index)
+        workload = Workload(rng, index)
+        names, relative = list(weights), list(weights.values())
+        local = []
+        while not stop.is_set():
+            op = rng.choices(names, relative)[0]
+            start = time.perf_counter()
+            try:
+                getattr(workload, op)()
+                error = None
+            except OperationalError as e:
+                error = str(e)
+            finally:
+                close_old_connections()
+            local.append((op, time.perf_counter() - start, error))
+        connection.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i, WRITER_OPS)) for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=(writers + i, READER_OPS)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    by_op = defaultdict(list)
+    for sample in samples:
+        by_op[sample[0]].append(sample)
+    ops = {}
+    for op, rows in sorted(by_op.items()):
+        latencies = sorted(latency for _, latency, error in rows if error is None)
+        ops[op] = {
+            'ops_per_s': round(len(latencies) / elapsed, 1),
+            'errors': sum(1 for row in rows if row[2] is not None),
+            'p50_ms': _ms(percentile(latencies, 0.50)),
+            'p99_ms': _ms(percentile(latencies, 0.99)),
+        }
+    errors = sorted({error for _, _, error in samples if error is not None})
+    return {'elapsed_s': round(elapsed, 2), 'ops': ops, 'error_messages': errors}
+
+
+def run_child(variant, writers, readers, duration):
+    from django.conf import settings
+    from django.db import connection
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_name = configure(variant, os.path.join(tmp, 'stress.sqlite3'))
+        from benchmarks.event_serialization import seed_events
+        seed_events(SEED_EVENTS)
+        connection.close()
+
+        report = stress(writers, readers, duration)
+        database = settings.DATABASES['default']
+        report.update({
+            'variant': variant,
+            'engine': database['ENGINE'].rsplit('.', 1)[-1],
+            'conn_max_age': database['CONN_MAX_AGE'],
+            'options': sorted(database['OPTIONS']),
+        })
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                report['journal_mode'] = cursor.fetchone()[0]
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return report
+
+
+def run_variant(variant, args):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.db_stress', '--child', variant,
+         '--writers', str(args.writers), '--readers', str(args.readers), '--duration', str(args.duration)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(report):
+    journal = f", journal {report['journal_mode']}" if 'journal_mode' in report else ''
+    print(f"\n{report['variant']} {report['engine']} (CONN_MAX_AGE {report['conn_max_age']}, "
+          f"options {', '.join(report['options']) or 'none'}{journal})")
+    for op, stats in report['ops'].items():
+        print(f"  {op:<14} {stats['ops_per_s']:8.1f} ops/s  p50 {stats['p50_ms']} ms  "
+              f"p99 {stats['p99_ms']} ms  errors {stats['errors']}")
+    for message in report['error_messages']:
+        print(f"  error: {message}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--variant', choices=['tuned', 'untuned', 'both'], default='both')
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load per variant')
+    parser.add_argument('--check', action='store_true', help='Exit 1 if the tuned profile saw any database errors')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.writers, args.readers, args.duration)))
+        return 0
+
+    variants = ['tuned', 'untuned'] if args.variant == 'both' else [args.variant]
+    reports = {variant: run_variant(variant, args) for variant in variants}
+    for report in reports.values():
+        print_report(report)
+
+    if args.check and 'tuned' in reports:
+        errors = sum(stats['errors'] for stats in reports['tuned']['ops'].values())
+        if errors:
+            print(f'\nTuned profile hit {errors} database errors')
+            return 1
+        print('\nTuned profile completed without database errors')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Compare the DRF ModelSerializer path with the values_list() fast path used
+by the read-only event endpoints.
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks.common import print_results, setup_django, time_call
+
+
+def seed_events(count):
+    from django.utils import timezone
+    from events.models import GlobalEvent
+
+    now = timezone.now()
+    rng = random.Random(42)
+    GlobalEvent.objects.bulk_create([
+        GlobalEvent(
+            title=f'Synthetic event {i}',
+            description='Synthetic description for benchmarking. ' * rng.randint(1, 10),
+            location=rng.choice(['India', 'Mumbai', 'Delhi']),
+            event_type=rng.choice(['Holiday', 'Weather Change', 'Festival', None]),
+            date=now + timedelta(minutes=rng.randint(1, 29 * 24 * 60)),
+            trending_score=rng.uniform(10, 100),
+        )
+        for i in range(count)
+    ], batch_size=1000)
+
+
+def run(count, repeat):
+    from rest_framework.renderers import JSONRenderer
+    from events.models import GlobalEvent
+    from events.serializers import (
+        GlobalEventSerializer, event_rows_to_dicts, stream_json_array
+    )
+
+    seed_events(count)
+    fields = GlobalEventSerializer.Meta.fields
+
+    def drf_path():
+        events = list(GlobalEvent.objects.all())
+        return JSONRenderer().render(GlobalEventSerializer(events, many=True).data)
+
+    def fast_path():
+        rows = GlobalEvent.objects.values_list(*fields)
+        return b''.join(stream_json_array(event_rows_to_dicts(rows, fields)))
+
+    assert drf_path() == fast_path(), 'fast path output differs from DRF output'
+
+    results = {
+        'drf_model_serializer': time_call(drf_path, repeat),
+        'values_fast_path': time_call(fast_path, repeat),
+    }
+    print_results(f'Event serialization ({count} events)', results)
+    speedup = results['drf_model_serializer']['median_ms'] / results['values_fast_path']['median_ms']
+    print(f"  speedup: {speedup:.1f}x")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.events, args.repeat)
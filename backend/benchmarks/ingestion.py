@@ -0,0 +1,72 @@
+"""
+``fetch_events`` ingestion against stub Calendarific and OpenWeatherMap
+responses, for a first import and for a re-run where every event exists.
+
+    python -m benchmarks.ingestion --holidays 500
+"""
+import argparse
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from benchmarks.common import print_results, setup_django, time_call
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def stub_get(holidays):
+    """Replacement for ``requests.get`` serving canned API payloads, no network."""
+    from django.utils import timezone
+
+    today = timezone.now().date()
+    calendar = {'response': {'holidays': [
+        {
+            'name': f'Holiday {i}',
+            'description': f'Synthetic holiday number {i}',
+            'date': {'iso': (today + timedelta(days=1 + i % 28)).isoformat()},
+        }
+        for i in range(holidays)
+    ]}}
+    weather = {'weather': [{'main': 'Rain'}]}
+
+    def get(url, params=None, **kwargs):
+        return StubResponse(calendar if 'calendarific' in url else weather)
+
+    return get
+
+
+def run(quick=False, holidays=None):
+    from django.core.management import call_command
+    from events.models import GlobalEvent
+
+    holidays = holidays or (100 if quick else 500)
+
+    def ingest():
+        call_command('fetch_events', stdout=StringIO())
+
+    def first_import():
+        GlobalEvent.objects.all().delete()
+        ingest()
+
+    results = {}
+    with mock.patch('events.utils.requests.get', stub_get(holidays)):
+        results[f'fetch_events[holidays={holidays},new]'] = time_call(first_import, repeat=3)
+        results[f'fetch_events[holidays={holidays},existing]'] = time_call(ingest, repeat=3)
+    print_results('Event ingestion (stubbed sources)', results)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--holidays', type=int, default=500)
+    parser.add_argument('--quick', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.quick, args.holidays)
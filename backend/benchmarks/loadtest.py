@@ -0,0 +1,245 @@
+"""
+Replay synthetic traffic against running ML and events services while
+ramping up concurrency, and report throughput, latency percentiles and error
+rates at each step.
+
+Post content comes from the scraped tweets in ``ml/training_data/raw_tweets_*.json``.
+Start the services first, with the fake LLM so content jobs never leave the box::
+
+    cd backend/src && python -m flask --app ml_server run --port 5007 --with-threads
+    cd backend && CONTENT_MODEL_BACKEND=fake FAKE_CONTENT_MODEL_DELAY=0.5 python manage.py runserver --noreload
+    cd backend && CONTENT_MODEL_BACKEND=fake FAKE_CONTENT_MODEL_DELAY=0.5 python manage.py run_content_workers
+
+then, from ``backend``::
+
+    python -m benchmarks.loadtest --mix all --concurrency 1,2,4,8,16 --duration 20
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from benchmarks.common import BACKEND_DIR
+
+TWEETS_GLOB = os.path.join(BACKEND_DIR, 'ml', 'training_data', 'raw_tweets_*.json')
+BATCH_SIZES = (5, 20, 50)
+JOB_TIMEOUT = 60
+JOB_POLL_INTERVAL = 0.2
+ML_KINDS = ('predict', 'predict_batch')
+
+# Relative weights of each request type per mix
+MIXES = {
+    'ml': {'predict': 7, 'predict_batch': 3},
+    'events': {'trending_page': 6, 'trending_full': 2, 'content_job': 2},
+    'all': {'predict': 4, 'predict_batch': 2, 'trending_page': 2, 'trending_full': 1, 'content_job': 1},
+}
+
+
+def load_tweet_texts(pattern=TWEETS_GLOB):
+    texts = set()
+    for path in sorted(glob.glob(pattern)):
+        with open(path) as f:
+            texts.update(tweet['text'] for tweet in json.load(f) if tweet.get('text'))
+    if not texts:
+        raise SystemExit(f'No tweet texts found in {pattern}')
+    return sorted(texts)
+
+
+class Traffic:
+    """Builds and sends one request of each type. Every call returns the number
+    of items processed (posts for the ML service, requests otherwise)."""
+
+    def __init__(self, ml_url, events_url, texts, rng):
+        self.ml_url = ml_url.rstrip('/')
+        self.events_url = events_url.rstrip('/')
+        self.texts = texts
+        self.rng = rng
+        self.session = requests.Session()
+
+    def post(self):
+        return {
+            'id': self.rng.randrange(1_000_000),
+            'content': self.rng.choice(self.texts),
+            'has_image': self.rng.random() < 0.6,
+        }
+
+    def predict(self):
+        response = self.session.post(f'{self.ml_url}/ml/predict', json=self.post(), timeout=30)
+        response.raise_for_status()
+        return 1
+
+    def predict_batch(self):
+        posts = [self.post() for _ in range(self.rng.choice(BATCH_SIZES))]
+        response = self.session.post(f'{self.ml_url}/ml/predict_batch', json={'posts': posts}, timeout=120)
+        response.raise_for_status()
+        return len(posts)
+
+    def trending_page(self):
+        response = self.session.get(f'{self.events_url}/api/trending-events/', params={'limit': 50}, timeout=30)
+        response.raise_for_status()
+        return 1
+
+    def trending_full(self):
+        response = self.session.get(f'{self.events_url}/api/trending-events/', timeout=60)
+        response.raise_for_status()
+        return 1
+
+    def content_job(self):
+        text = self.rng.choice(self.texts)
+        event = {'title': ' '.join(text.split()[:6]), 'description': text}
+        response = self.session.post(f'{self.events_url}/api/content-jobs/', json={'event': event}, timeout=30)
+        response.raise_for_status()
+        job_url = self.events_url + response.headers['Location']
+
+        # Latency for this type is submission to completed job
+        deadline = time.monotonic() + JOB_TIMEOUT
+        while time.monotonic() < deadline:
+            job = self.session.get(job_url, timeout=30).json()
+            if job['status'] == 'succeeded':
+                return 1
+            if job['status'] == 'failed':
+                raise RuntimeError(job.get('error', 'job failed'))
+            time.sleep(JOB_POLL_INTERVAL)
+        raise TimeoutError(f'Job did not finish within {JOB_TIMEOUT}s')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def run_step(concurrency, duration, weights, ml_url, events_url, texts, seed=0):
+    """Run ``concurrency`` closed-loop workers for ``duration`` seconds."""
+    names, relative = list(weights), list(weights.values())
+    stop = threading.Event()
+    samples = []  # (kind, latency_s, items, ok)
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        traffic = Traffic(ml_url, events_url, texts, rng)
+        local = []
+        while not stop.is_set():
+            kind = rng.choices(names, relative)[0]
+            start = time.perf_counter()
+            try:
+                items, ok = getattr(traffic, kind)(), True
+            except Exception:
+                items, ok = 0, False
+            local.append((kind, time.perf_counter() - start, items, ok))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return summarize(samples, elapsed, concurrency)
+
+
+def summarize(samples, elapsed, concurrency):
+    by_kind = defaultdict(list)
+    for sample in samples:
+        by_kind[sample[0]].append(sample)
+
+    kinds = {}
+    for kind, rows in sorted(by_kind.items()):
+        latencies = sorted(latency for _, latency, _, ok in rows if ok)
+        errors = sum(1 for row in rows if not row[3])
+        kinds[kind] = {
+            'requests': len(rows),
+            'requests_per_s': len(rows) / elapsed,
+            'items_per_s': sum(row[2] for row in rows) / elapsed,
+            'error_rate': errors / len(rows),
+            'p50_ms': _ms(percentile(latencies, 0.50)),
+            'p90_ms': _ms(percentile(latencies, 0.90)),
+            'p99_ms': _ms(percentile(latencies, 0.99)),
+        }
+
+    all_latencies = sorted(latency for _, latency, _, ok in samples if ok)
+    return {
+        'concurrency': concurrency,
+        'elapsed_s': elapsed,
+        'requests': len(samples),
+        'requests_per_s': len(samples) / elapsed,
+        'error_rate': (sum(1 for s in samples if not s[3]) / len(samples)) if samples else 0.0,
+        'p99_ms': _ms(percentile(all_latencies, 0.99)),
+        'posts_per_s': sum(s[2] for s in samples if s[0] in ML_KINDS) / elapsed,
+        'events_requests_per_s': sum(1 for s in samples if s[0] not in ML_KINDS) / elapsed,
+        'kinds': kinds,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def print_step(step):
+    print(f"\nconcurrency {step['concurrency']}: {step['requests_per_s']:.1f} req/s "
+          f"({step['posts_per_s']:.1f} posts/s, {step['events_requests_per_s']:.1f} events req/s), "
+          f"errors {step['error_rate']:.1%}, p99 {step['p99_ms']} ms")
+    for kind, stats in step['kinds'].items():
+        print(f"  {kind:<14} {stats['requests_per_s']:7.1f} req/s {stats['items_per_s']:8.1f} items/s"
+              f"  p50 {stats['p50_ms']} ms  p90 {stats['p90_ms']} ms  p99 {stats['p99_ms']} ms"
+              f"  errors {stats['error_rate']:.1%}")
+
+
+def saturation_point(steps, p99_budget_ms):
+    """Highest concurrency whose overall p99 stays within budget, with its throughput."""
+    best = None
+    for step in steps:
+        if step['p99_ms'] is not None and step['p99_ms'] <= p99_budget_ms and step['error_rate'] < 0.01:
+            best = step
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ml-url', default='http://127.0.0.1:5007')
+    parser.add_argument('--events-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='all')
+    parser.add_argument('--concurrency', default='1,2,4,8,16', help='Comma separated ramp of worker counts')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per concurrency step')
+    parser.add_argument('--p99-budget-ms', type=float, default=1000,
+                        help='p99 above which a step counts as degraded')
+    parser.add_argument('--output', help='Write every step as JSON to this file')
+    args = parser.parse_args(argv)
+
+    texts = load_tweet_texts()
+    weights = MIXES[args.mix]
+    print(f"Replaying {args.mix} mix ({', '.join(weights)}) with {len(texts)} distinct tweet texts")
+
+    steps = []
+    for step_index, concurrency in enumerate(int(c) for c in args.concurrency.split(',')):
+        step = run_step(concurrency, args.duration, weights, args.ml_url, args.events_url, texts, seed=step_index)
+        steps.append(step)
+        print_step(step)
+
+    best = saturation_point(steps, args.p99_budget_ms)
+    if best:
+        print(f"\nSustained within p99 {args.p99_budget_ms:.0f} ms: concurrency {best['concurrency']}, "
+              f"{best['posts_per_s']:.1f} posts/s, {best['events_requests_per_s']:.1f} events req/s")
+    else:
+        print(f"\nNo step stayed within p99 {args.p99_budget_ms:.0f} ms with under 1% errors")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'mix': args.mix, 'weights': weights, 'steps': steps}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Resident memory footprint of one prediction worker, by component.
+
+Each emoji mode is measured in a fresh interpreter so import costs are not
+shared. Components are attributed by the growth of RSS as they load, in the
+order a worker loads them; the model arrays are also counted exactly.
+Per-request temporaries (the one-row DataFrame and friends) are measured
+with tracemalloc as the peak allocation of a single ``predict`` call.
+
+    python -m benchmarks.memory                 # report both modes
+    python -m benchmarks.memory --check         # exit 1 if the lean mode exceeds the budget
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import BACKEND_DIR
+
+MODEL_FILE = os.path.join(BACKEND_DIR, 'ml', 'models', 'model_20250722_212611.joblib')
+BUDGET_FILE = os.path.join(BACKEND_DIR, 'benchmarks', 'memory_budget.json')
+SAMPLE_CONTENT = 'New collection out now 🎉✨ shop the look #fashion #style @brand https://example.com $250'
+WARM_REQUESTS = 200
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux), or the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def forest_array_mb(model):
+    """Bytes held by the node and value arrays of every tree, in MB."""
+    total = 0
+    for estimator in model.estimators_:
+        state = estimator.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    return total / (1024 * 1024)
+
+
+def measure(emoji_mode):
+    """Load a worker step by step in this process and return the footprint."""
+    import tracemalloc
+
+    components = {}
+    last = rss_mb()
+    components['interpreter'] = last
+
+    def record(name):
+        nonlocal last
+        now = rss_mb()
+        components[name] = now - last
+        last = now
+
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    record('numpy_pandas')
+
+    import joblib
+    import sklearn.ensemble  # noqa: F401
+    import sklearn.preprocessing  # noqa: F401
+    record('sklearn')
+
+    from ml.train import PostPerformancePredictor
+    record('ml_train')
+
+    predictor = PostPerformancePredictor(emoji_mode=emoji_mode)
+    predictor.count_emojis(SAMPLE_CONTENT)  # loads emoji.EMOJI_DATA in full mode
+    record('emoji_table')
+
+    predictor.model = joblib.load(MODEL_FILE)
+    record('model')
+
+    predictor.scaler = joblib.load(MODEL_FILE.replace('model_', 'scaler_'))
+    record('scaler')
+
+    predictor.predict(SAMPLE_CONTENT, True)
+    record('first_request')
+
+    tracemalloc.start()
+    predictor.predict(SAMPLE_CONTENT, True)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for _ in range(WARM_REQUESTS):
+        predictor.predict(SAMPLE_CONTENT, True)
+    record(f'after_{WARM_REQUESTS}_requests')
+
+    return {
+        'emoji_mode': emoji_mode,
+        'components_mb': {name: round(value, 2) for name, value in components.items()},
+        'model_arrays_mb': round(forest_array_mb(predictor.model), 2),
+        'trees': len(predictor.model.estimators_),
+        'request_peak_kb': round(peak / 1024, 1),
+        'total_rss_mb': round(rss_mb(), 2),
+    }
+
+
+def measure_in_subprocess(emoji_mode):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.memory', '--child', emoji_mode],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    # The model loader prints progress lines; the report is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(report):
+    print(f"\n{report['emoji_mode']} emoji mode: {report['total_rss_mb']:.1f} MB RSS")
+    for name, value in report['components_mb'].items():
+        print(f"  {name:<24} {value:8.2f} MB")
+    print(f"  {'(forest node arrays)':<24} {report['model_arrays_mb']:8.2f} MB across {report['trees']} trees")
+    print(f"  {'(per-request peak)':<24} {report['request_peak_kb']:8.1f} KB")
+
+
+def check_budget(report, budget):
+    """Return a list of budget violations for ``report``."""
+    failures = []
+    if report['total_rss_mb'] > budget['total_rss_mb']:
+        failures.append(f"total RSS {report['total_rss_mb']:.1f} MB > {budget['total_rss_mb']} MB")
+    if report['request_peak_kb'] > budget['request_peak_kb']:
+        failures.append(f"per-request peak {report['request_peak_kb']:.1f} KB > {budget['request_peak_kb']} KB")
+    for name, limit in budget.get('components_mb', {}).items():
+        value = report['components_mb'].get(name)
+        if value is not None and value > limit:
+            failures.append(f"{name} {value:.1f} MB > {limit} MB")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['full', 'lean', 'both'], default='both')
+    parser.add_argument('--check', action='store_true', help=f'Enforce {os.path.basename(BUDGET_FILE)} on the lean mode')
+    parser.add_argument('--json', action='store_true', help='Print the reports as JSON')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child)))
+        return 0
+
+    modes = ['full', 'lean'] if args.mode == 'both' else [args.mode]
+    if args.check and 'lean' not in modes:
+        modes.append('lean')
+    reports = {mode: measure_in_subprocess(mode) for mode in modes}
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports.values():
+            print_report(report)
+        if 'full' in reports and 'lean' in reports:
+            saved = reports['full']['total_rss_mb'] - reports['lean']['total_rss_mb']
+            print(f"\nlean mode saves {saved:.1f} MB per worker")
+
+    if args.check:
+        with open(BUDGET_FILE) as f:
+            budget = json.load(f)
+        failures = check_budget(reports['lean'], budget)
+        if failures:
+            print('\nMemory budget exceeded:\n  ' + '\n  '.join(failures))
+            return 1
+        print('\nWithin memory budget')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
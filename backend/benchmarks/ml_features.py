@@ -0,0 +1,37 @@
+"""
+Feature extraction cost across content sizes.
+
+    python -m benchmarks.ml_features
+"""
+import argparse
+
+from benchmarks.common import print_results, time_call
+
+SIZES = (50, 500, 5000)
+SNIPPET = 'Big sale today 🎉 #deal @brand shop now at https://example.com/offer for $20! '
+
+
+def make_content(length):
+    return (SNIPPET * (length // len(SNIPPET) + 1))[:length]
+
+
+def run(quick=False):
+    from ml.train import PostPerformancePredictor
+
+    predictor = PostPerformancePredictor()
+    repeat = 5 if quick else 20
+    results = {}
+    for size in SIZES:
+        content = make_content(size)
+        # 100 extractions per sample so sub-millisecond calls are measurable
+        results[f'extract_features[chars={size}]'] = time_call(
+            lambda: [predictor.extract_features_from_content(content) for _ in range(100)], repeat
+        )
+    print_results('Feature extraction (100 calls per sample)', results)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--quick', action='store_true')
+    run(parser.parse_args().quick)
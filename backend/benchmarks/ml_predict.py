@@ -0,0 +1,40 @@
+"""
+``/ml/predict_batch`` latency against batch size, and one ``/ml/best_times``
+sweep over all 168 weekly slots, with the production model.
+
+    python -m benchmarks.ml_predict
+"""
+import argparse
+
+from benchmarks.batch_logging import make_posts
+from benchmarks.common import ml_test_client, print_results, time_call
+
+BATCH_SIZES = (1, 10, 50, 1000)
+QUICK_BATCH_SIZES = (1, 10)
+
+
+def run(quick=False):
+    client, _ = ml_test_client()
+    results = {}
+    for size in QUICK_BATCH_SIZES if quick else BATCH_SIZES:
+        batch = {'posts': make_posts(size)}
+
+        def predict():
+            response = client.post('/ml/predict_batch', json=batch)
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+        results[f'predict_batch[posts={size}]'] = time_call(predict, repeat=3)
+
+    def best_times():
+        response = client.post('/ml/best_times', json={'content': make_posts(1)[0]['content'], 'has_image': True})
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    results['best_times[slots=168]'] = time_call(best_times, repeat=5)
+    print_results('Batch prediction', results)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--quick', action='store_true')
+    run(parser.parse_args().quick)
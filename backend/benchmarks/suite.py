@@ -0,0 +1,154 @@
+"""
+Run every benchmark, save the results as JSON and flag regressions.
+
+Results go to ``benchmarks/results/<commit>.json``. Each run is compared
+against ``benchmarks/results/baseline.json`` (or ``--compare``); the command
+exits with status 1 when any benchmark's median is slower than the
+baseline by more than ``--threshold``, so it can gate CI.
+
+    python -m benchmarks.suite                    # run and compare with the baseline
+    python -m benchmarks.suite --save-baseline    # run and make this the new baseline
+    python -m benchmarks.suite --only ml_features,trending_feed --quick
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks.common import BACKEND_DIR, setup_django
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'baseline.json')
+
+# Module name -> whether it needs the Django test database
+BENCHMARKS = {
+    'ml_features': False,
+    'ml_predict': False,
+    'trending_feed': True,
+    'ingestion': True,
+}
+
+DEFAULT_THRESHOLD = 0.25
+# Ignore differences smaller than this; sub-millisecond timings are mostly noise
+MIN_DELTA_MS = 0.5
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_suite(names, quick=False):
+    if any(BENCHMARKS[name] for name in names):
+        setup_django()
+
+    results = {}
+    for name in names:
+        module = importlib.import_module(f'benchmarks.{name}')
+        results.update(module.run(quick=quick))
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'quick': quick,
+        'results': results,
+    }
+
+
+def save_results(report, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta_ms=MIN_DELTA_MS):
+    """Return ``(name, baseline_ms, current_ms, change, regressed)`` per shared benchmark.
+
+    ``change`` is the relative change of the median; positive means slower.
+    """
+    rows = []
+    for name, stats in sorted(current['results'].items()):
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        old, new = before['median_ms'], stats['median_ms']
+        change = (new - old) / old if old else 0.0
+        rows.append((name, old, new, change, change > threshold and new - old > min_delta_ms))
+    return rows
+
+
+def print_comparison(rows, baseline):
+    print(f"\nCompared with {baseline.get('commit', '?')} ({baseline.get('created_at', '?')})")
+    for name, old, new, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"  {name:<40} {old:9.2f} -> {new:9.2f} ms  {change:+7.1%}{flag}")
+
+
+def resolve_baseline(ref):
+    if ref is None:
+        return BASELINE_PATH if os.path.exists(BASELINE_PATH) else None
+    if os.path.exists(ref):
+        return ref
+    # Accept a bare commit id for results saved by an earlier run
+    return os.path.join(RESULTS_DIR, f'{ref}.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', help=f"Comma separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--quick', action='store_true', help='Smaller inputs and fewer repeats')
+    parser.add_argument('--output', help='Where to write the results (default: results/<commit>.json)')
+    parser.add_argument('--compare', help='Baseline results file or commit id (default: results/baseline.json)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative slowdown of the median that counts as a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='Also write the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    names = list(BENCHMARKS)
+    if args.only:
+        names = [name.strip() for name in args.only.split(',') if name.strip()]
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    report = run_suite(names, quick=args.quick)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    save_results(report, output)
+    print(f"\nResults written to {output}")
+
+    status = 0
+    baseline_path = resolve_baseline(args.compare)
+    if baseline_path and os.path.exists(baseline_path) and not args.save_baseline:
+        baseline = load_results(baseline_path)
+        rows = compare_results(baseline, report, args.threshold)
+        print_comparison(rows, baseline)
+        if any(row[-1] for row in rows):
+            print(f"\nRegressions above {args.threshold:.0%} found")
+            status = 1
+    elif args.compare:
+        print(f"\nNo baseline found at {baseline_path}")
+        status = 2
+
+    if args.save_baseline:
+        save_results(report, BASELINE_PATH)
+        print(f"Baseline updated: {BASELINE_PATH}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+``get_trending_events`` at 1k, 10k and 100k synthetic events, full list and
+first page.
+
+    python -m benchmarks.trending_feed
+"""
+import argparse
+
+from benchmarks.common import print_results, setup_django, time_call
+from benchmarks.event_serialization import seed_events
+
+SIZES = (1000, 10000, 100000)
+QUICK_SIZES = (1000, 10000)
+
+
+def run(quick=False):
+    from django.test import Client
+    from django.urls import reverse
+    from events.models import GlobalEvent
+
+    client = Client()
+    url = reverse('get_trending_events')
+
+    def fetch(query=''):
+        response = client.get(url + query)
+        assert response.status_code == 200
+        return b''.join(response.streaming_content)
+
+    GlobalEvent.objects.all().delete()
+    results = {}
+    seeded = 0
+    for size in QUICK_SIZES if quick else SIZES:
+        # Grow the table instead of reseeding from scratch
+        seed_events(size - seeded)
+        seeded = size
+        repeat = 3 if size >= 100000 else 5
+        results[f'trending_feed[events={size},full]'] = time_call(fetch, repeat)
+        results[f'trending_feed[events={size},limit=50]'] = time_call(lambda: fetch('?limit=50'), repeat)
+    print_results('Trending events feed', results)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--quick', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.quick)
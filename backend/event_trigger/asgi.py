@@ -3,6 +3,10 @@ ASGI config for event_trigger project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with an ASGI server, e.g. ``uvicorn event_trigger.asgi:application``.
+The events API is then served by the async views in ``events.async_views``
+(set EVENTS_ASYNC_VIEWS=false to keep the sync views).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "event_trigger.settings")
+os.environ.setdefault("EVENTS_ASYNC_VIEWS", "true")
 
 application = get_asgi_application()
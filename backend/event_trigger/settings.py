@@ -11,8 +11,10 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,6 +25,8 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
 ]
+# Next-page cursor of the trending feed and content cache status
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "X-Content-Cache"]
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -63,6 +67,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "events.middleware.RequestTimingMiddleware",
 ]
 
 ROOT_URLCONF = "event_trigger.urls"
@@ -85,16 +90,76 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "event_trigger.wsgi.application"
 
+# Serve the trending feed, event detail and content generation endpoints from
+# events.async_views; event_trigger/asgi.py turns this on by default
+EVENTS_ASYNC_VIEWS = os.getenv("EVENTS_ASYNC_VIEWS", "false").lower() == "true"
+# Encode the read-only event endpoints with orjson (when installed). Faster, but
+# not byte-identical to DRF's JSONRenderer: some floats print differently
+# (1e16 vs 1e+16) and NaN/inf become null instead of raising
+EVENTS_JSON_ORJSON = os.getenv("EVENTS_JSON_ORJSON", "false").lower() == "true"
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DATABASE_PROFILE selects the backend:
+#   sqlite    single-file database in WAL mode, tuned for concurrent API reads
+#             while ingestion writes (the default)
+#   postgres  PostgreSQL through a psycopg connection pool (needs psycopg[pool])
+# `python -m benchmarks.db_stress` runs a concurrent read/write stress test
+# against either profile.
+
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "sqlite")
+
+if DATABASE_PROFILE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            # Keep connections open between requests instead of reconnecting each time
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # Seconds a writer waits for the lock before "database is locked"
+                "timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "20")),
+                # Take the write lock when a transaction starts; a deferred
+                # transaction that later upgrades to a write fails immediately
+                # instead of waiting out the busy timeout
+                "transaction_mode": "IMMEDIATE",
+                # WAL lets readers run alongside the writer; NORMAL only syncs
+                # at checkpoints, which is durable across application crashes
+                "init_command": (
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=NORMAL;"
+                    f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))};"
+                    "PRAGMA temp_store=MEMORY;"
+                ),
+            },
+        }
     }
-}
+elif DATABASE_PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB", "event_trigger"),
+            "USER": os.getenv("POSTGRES_USER", "postgres"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+            "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            # Pooled connections are reused across requests; Django requires
+            # CONN_MAX_AGE = 0 when the pool is enabled
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", "2")),
+                    "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", "20")),
+                    "timeout": int(os.getenv("POSTGRES_POOL_TIMEOUT", "10")),
+                },
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}; use 'sqlite' or 'postgres'")
 
 
 # Password validation
@@ -133,6 +198,65 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Content generation (events.content / events.jobs)
+# Set CONTENT_MODEL_BACKEND=fake to use the local stand-in model instead of Gemini
+
+CONTENT_MODEL_BACKEND = os.getenv("CONTENT_MODEL_BACKEND", "gemini")
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash-latest")
+FAKE_CONTENT_MODEL_DELAY = float(os.getenv("FAKE_CONTENT_MODEL_DELAY", "0"))
+FAKE_CONTENT_MODEL_TOKEN_DELAY = float(os.getenv("FAKE_CONTENT_MODEL_TOKEN_DELAY", "0"))
+CONTENT_JOB_WORKERS = int(os.getenv("CONTENT_JOB_WORKERS", "4"))
+# Shared pool for prompts run alongside the caller's own; a generation or a
+# stream holds one thread, so size it for the expected concurrency
+CONTENT_PROMPT_THREADS = int(os.getenv("CONTENT_PROMPT_THREADS", str(max(8, 2 * CONTENT_JOB_WORKERS))))
+# Longest a content stream waits on its pooled prompt before reporting it failed
+CONTENT_STREAM_TIMEOUT_SECONDS = int(os.getenv("CONTENT_STREAM_TIMEOUT_SECONDS", "120"))
+# A running job older than this is treated as abandoned by a dead worker and
+# requeued when workers start; keep it well above the slowest generation
+CONTENT_JOB_TIMEOUT_SECONDS = int(os.getenv("CONTENT_JOB_TIMEOUT_SECONDS", "900"))
+
+# Generated content is cached per normalized event, prompt version and model
+CONTENT_CACHE_ENABLED = os.getenv("CONTENT_CACHE_ENABLED", "true").lower() == "true"
+CONTENT_CACHE_LEASE_SECONDS = int(os.getenv("CONTENT_CACHE_LEASE_SECONDS", "120"))
+CONTENT_CACHE_POLL_SECONDS = 0.25
+# Cache hits are counted in memory and written to GeneratedContent.hits this often
+CONTENT_CACHE_HIT_FLUSH_SECONDS = float(os.getenv("CONTENT_CACHE_HIT_FLUSH_SECONDS", "30"))
+
+# Generated social posts are ranked by the engagement model (events.scoring):
+# "local" loads it in this process, "remote" makes one /ml/predict_batch call
+# to ML_SERVICE_URL per generation, "off" disables ranking
+POST_SCORING_BACKEND = os.getenv("POST_SCORING_BACKEND", "local")
+ML_MODEL_PATH = os.getenv("ML_MODEL_PATH", str(BASE_DIR / "ml" / "models" / "model_20250722_212611.joblib"))
+ML_SERVICE_URL = os.getenv("ML_SERVICE_URL", "http://127.0.0.1:5007")
+ML_SERVICE_TIMEOUT = float(os.getenv("ML_SERVICE_TIMEOUT", "10"))
+# Keep-alive connections to ML_SERVICE_URL shared by every scoring thread
+ML_SERVICE_POOL_SIZE = int(os.getenv("ML_SERVICE_POOL_SIZE", str(CONTENT_JOB_WORKERS)))
+
+# Retention (events.retention / manage.py archive_events): events dated further
+# in the past than their horizon move to the ArchivedEvent table. Per-type
+# horizons override the default, e.g. expired weather alerts go after a day.
+EVENT_RETENTION_DAYS = int(os.getenv("EVENT_RETENTION_DAYS", "7"))
+EVENT_RETENTION_DAYS_BY_TYPE = json.loads(
+    os.getenv("EVENT_RETENTION_DAYS_BY_TYPE", '{"Weather Change": 1}')
+)
+EVENT_ARCHIVE_BATCH_SIZE = int(os.getenv("EVENT_ARCHIVE_BATCH_SIZE", "500"))
+
+# Logging: JSON lines written from a background thread (telemetry.logs), so
+# request threads never block on stderr. Per-item records in hot loops are
+# sampled at LOG_ITEM_SAMPLE_RATE; per-request summaries are always written.
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "structured": {"class": "telemetry.logs.AsyncStreamHandler"},
+    },
+    "root": {
+        "handlers": ["structured"],
+        "level": os.getenv("LOG_LEVEL", "INFO").upper(),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
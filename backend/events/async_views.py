@@ -0,0 +1,127 @@
+"""
+Async versions of the read and generation endpoints, served under ASGI.
+
+These are plain Django async views rather than DRF ``@api_view`` functions,
+which only run synchronously. They use the async ORM and await the LLM
+client, so a process can hold hundreds of slow generation requests without a
+thread per request. Responses match the sync views in ``views.py``.
+
+``urls.py`` routes the endpoints here when ``EVENTS_ASYNC_VIEWS`` is on,
+which ``event_trigger/asgi.py`` does by default.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+
+from events.models import GlobalEvent
+from telemetry import stage, timed_aiter
+
+from .content import content_model_configured
+from .content_cache import ContentGenerationTimeout, aget_or_generate_content
+from .scoring import with_ranked_posts
+from .serializers import (
+    GlobalEventSerializer, aevent_rows_to_dicts, astream_json_array, encode_json, event_rows_to_dicts
+)
+from .trending import (
+    FeedQueryError, aiter_event_rows, arank_events, paginate, parse_feed_params, ranking_time, upcoming_events
+)
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(encode_json(data), status=status, content_type='application/json')
+
+
+def negotiation_error(request):
+    """The response DRF's content negotiation gives a JSON-only view, or None if JSON is acceptable."""
+    url_format = request.GET.get('format')
+    if url_format is not None and url_format != 'json':
+        return json_response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if not request.accepts('application/json'):
+        return json_response(
+            {'detail': 'Could not satisfy the request Accept header.'}, status=status.HTTP_406_NOT_ACCEPTABLE
+        )
+    return None
+
+
+@require_GET
+async def get_trending_events(request):
+    error = negotiation_error(request)
+    if error is not None:
+        return error
+    try:
+        options = parse_feed_params(request.GET)
+    except FeedQueryError as e:
+        return json_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    now = ranking_time(options['cursor'])
+    candidates = upcoming_events(now, options['event_types'], options['location'])
+    ranked = await arank_events(candidates, now, options['min_score'])
+    page, next_cursor = paginate(ranked, options['cursor'], options['limit'], now)
+
+    page_ids = [pk for _, pk in page]
+    rows = aiter_event_rows(page_ids, options['fields'])
+    body = astream_json_array(aevent_rows_to_dicts(rows, options['fields']))
+    response = StreamingHttpResponse(
+        timed_aiter(body, 'events', 'trending_events', 'serialize'),
+        content_type='application/json'
+    )
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@require_GET
+async def get_event(request, event_id):
+    error = negotiation_error(request)
+    if error is not None:
+        return error
+    fields = GlobalEventSerializer.Meta.fields
+    with stage('events', 'get_event', 'query'):
+        row = await GlobalEvent.objects.filter(id=event_id).values_list(*fields).afirst()
+    if row is None:
+        return json_response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+    with stage('events', 'get_event', 'serialize'):
+        event = next(event_rows_to_dicts([row], fields))
+        payload = encode_json(event)
+    return HttpResponse(payload, content_type='application/json')
+
+
+@csrf_exempt
+@require_POST
+async def generate_content(request):
+    try:
+        event = json.loads(request.body or b'{}').get('event')
+    except (ValueError, AttributeError):
+        return json_response({'error': 'Request body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    if not event:
+        return json_response({'error': 'Event data is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not content_model_configured():
+        return json_response(
+            {'error': 'GEMINI_API_KEY not configured'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    try:
+        result, cached = await aget_or_generate_content(event)
+        # Scoring is CPU-bound model work, so it runs off the event loop
+        result = await sync_to_async(with_ranked_posts, thread_sensitive=False)(result)
+    except ContentGenerationTimeout as e:
+        return json_response({'error': str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+    except Exception as api_error:
+        logger.exception('Content generation failed')
+        return json_response(
+            {'error': f'Content generation failed: {str(api_error)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    response = json_response(result)
+    response['X-Content-Cache'] = 'hit' if cached else 'miss'
+    return response
@@ -0,0 +1,306 @@
+"""
+Prompt building and LLM access for event content generation.
+
+The generative model client is created once per process and shared by the
+request handlers and the background job workers. ``CONTENT_MODEL_BACKEND =
+'fake'`` swaps Gemini for ``FakeContentModel`` in tests and offline runs.
+
+``agenerate_event_content`` is the asyncio counterpart used by the async
+views: it awaits the client's ``generate_content_async`` so a slow generation
+holds no thread while it waits on the network.
+"""
+import asyncio
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+# Bump whenever the prompt templates change so cached generations are not reused
+PROMPT_VERSION = 1
+
+
+class ContentGenerationError(Exception):
+    """Raised when the model fails to produce usable content."""
+
+
+class ContentModelUnavailable(ContentGenerationError):
+    """Raised when the configured model backend cannot be used."""
+
+
+def build_social_prompt(event):
+    return f"""Create 5 engaging social media posts for the following event:
+            Title: {event.get('title', 'No title provided')}
+            Description: {event.get('description', 'No description provided')}
+
+            For each post:
+            1. Include relevant hashtags
+            2. Use appropriate emojis
+            3. Keep it engaging and concise
+            4. Add a call-to-action
+            5. Format each post clearly with a number (1-5)
+
+            Make the posts diverse - some emotional, some informative, some urgent."""
+
+
+def build_video_prompt(event):
+    return f"""Create a compelling 60-second video script for the following event:
+            Title: {event.get('title', 'No title provided')}
+            Description: {event.get('description', 'No description provided')}
+
+            Include:
+            1. Opening hook (5-10 seconds)
+            2. Main message and key points (40-45 seconds)
+            3. Strong call-to-action (5-10 seconds)
+            4. Visual descriptions and transitions
+            5. Background music/mood suggestions
+
+            Format it with clear sections and timing indicators."""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeContentModel:
+    """Local stand-in for ``genai.GenerativeModel`` that never leaves the process.
+
+    Produces deterministic text derived from the prompt after an optional delay,
+    so tests and load runs exercise the real code paths without network calls.
+    With ``stream=True`` it yields the text word by word, ``token_delay`` apart.
+    ``generate_content_async`` waits with ``asyncio.sleep`` instead of blocking.
+    """
+
+    model_name = 'fake'
+
+    def __init__(self, delay=0.0, token_delay=0.0):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls += 1
+        if stream:
+            return self._stream(self.render(prompt))
+        if self.delay:
+            time.sleep(self.delay)
+        return FakeResponse(self.render(prompt))
+
+    async def generate_content_async(self, prompt):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return FakeResponse(self.render(prompt))
+
+    def _stream(self, text):
+        for token in re.findall(r'\S+\s*', text):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield FakeResponse(token)
+
+    @staticmethod
+    def render(prompt):
+        match = re.search(r'Title: (.*)', prompt)
+        title = match.group(1).strip() if match else 'Event'
+        tag = re.sub(r'\W+', '', title.title()) or 'Event'
+
+        if 'social media posts' in prompt:
+            return '\n\n'.join(
+                f"{i}. {title} is coming! 🎉 Post {i} of 5. Share it with a friend. #{tag} #Trending"
+                for i in range(1, 6)
+            )
+        return (
+            f"[0:00-0:10] HOOK: {title} is almost here.\n"
+            f"[0:10-0:50] MAIN: Why {title} matters.\n"
+            f"[0:50-1:00] CTA: Follow for more. #{tag}"
+        )
+
+
+_model = None
+_model_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def content_model_configured():
+    """Whether the configured backend has what it needs to run."""
+    return settings.CONTENT_MODEL_BACKEND == 'fake' or bool(os.getenv('GEMINI_API_KEY'))
+
+
+def get_content_model():
+    """Return the process-wide generative model, creating it on first use."""
+    global _model
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            if settings.CONTENT_MODEL_BACKEND == 'fake':
+                _model = FakeContentModel(
+                    delay=settings.FAKE_CONTENT_MODEL_DELAY,
+                    token_delay=settings.FAKE_CONTENT_MODEL_TOKEN_DELAY
+                )
+            else:
+                api_key = os.getenv('GEMINI_API_KEY')
+                if not api_key:
+                    raise ContentModelUnavailable('GEMINI_API_KEY not configured')
+
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                _model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
+    return _model
+
+
+def reset_content_model():
+    """Drop the cached model so the next call picks up new settings."""
+    global _model
+    with _model_lock:
+        _model = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.CONTENT_PROMPT_THREADS,
+                    thread_name_prefix='content-prompt'
+                )
+    return _executor
+
+
+def _response_text(response, label):
+    if not response or not hasattr(response, 'text'):
+        raise ContentGenerationError(f'Failed to generate {label} content')
+    return response.text
+
+
+def _run_prompt(model, prompt, label):
+    return _response_text(model.generate_content(prompt), label)
+
+
+async def _arun_prompt(model, prompt, label):
+    return _response_text(await model.generate_content_async(prompt), label)
+
+
+def generate_event_content(event, model=None):
+    """Run the social post and video script prompts concurrently.
+
+    Returns ``{'socialMedia': ..., 'videoScript': ...}``.
+    """
+    model = model or get_content_model()
+    social_prompt = build_social_prompt(event)
+
+    # Only the social prompt goes to the shared pool; the video prompt runs on
+    # the calling thread. Each generation holds at most one pool thread, and
+    # if the pool is saturated (or the caller is itself a pool thread) the
+    # queued prompt is taken back and run here instead of waiting on it.
+    social = _get_executor().submit(_run_prompt, model, social_prompt, 'social media')
+    try:
+        video = _run_prompt(model, build_video_prompt(event), 'video script')
+    except BaseException:
+        social.cancel()
+        raise
+    if social.cancel():
+        social_text = _run_prompt(model, social_prompt, 'social media')
+    else:
+        social_text = social.result()
+
+    return {
+        'socialMedia': social_text,
+        'videoScript': video,
+    }
+
+
+async def agenerate_event_content(event, model=None):
+    """Async ``generate_event_content``: both prompts are awaited concurrently."""
+    model = model or get_content_model()
+    social, video = await asyncio.gather(
+        _arun_prompt(model, build_social_prompt(event), 'social media'),
+        _arun_prompt(model, build_video_prompt(event), 'video script'),
+    )
+    return {
+        'socialMedia': social,
+        'videoScript': video,
+    }
+
+
+def _stream_chunks(model, prompt, field, stop=None):
+    parts = []
+    try:
+        for chunk in model.generate_content(prompt, stream=True):
+            if stop is not None and stop.is_set():
+                return
+            text = getattr(chunk, 'text', '')
+            if text:
+                parts.append(text)
+                yield 'delta', field, text
+        yield 'done', field, ''.join(parts)
+    except Exception as e:
+        yield 'error', field, str(e)
+
+
+def _stream_prompt(model, prompt, field, events, stop):
+    for item in _stream_chunks(model, prompt, field, stop):
+        events.put(item)
+
+
+def stream_event_content(event, model=None):
+    """Stream both prompts concurrently, interleaving their output.
+
+    Yields ``(kind, field, text)`` tuples: ``delta`` for each partial chunk as
+    it arrives, then ``done`` with the full text (or ``error`` with the
+    message) once per field.
+
+    As in ``generate_event_content`` only the social prompt goes to the shared
+    pool; the video prompt streams on the calling thread, and the social
+    chunks queued meanwhile are yielded between its chunks. A social prompt
+    still queued when the video finishes is taken back and streamed here, and
+    one already running is waited on for at most
+    ``CONTENT_STREAM_TIMEOUT_SECONDS``. Closing the generator stops reading
+    from the model; the pool thread exits at its next chunk.
+    """
+    model = model or get_content_model()
+    events = queue.Queue()
+    stop = threading.Event()
+    deadline = time.monotonic() + settings.CONTENT_STREAM_TIMEOUT_SECONDS
+
+    social_prompt = build_social_prompt(event)
+    social = _get_executor().submit(_stream_prompt, model, social_prompt, 'socialMedia', events, stop)
+    social_finished = False
+    try:
+        for item in _stream_chunks(model, build_video_prompt(event), 'videoScript'):
+            yield item
+            while not social_finished:
+                try:
+                    kind, field, text = events.get_nowait()
+                except queue.Empty:
+                    break
+                social_finished = kind != 'delta'
+                yield kind, field, text
+
+        if not social_finished and social.cancel():
+            yield from _stream_chunks(model, social_prompt, 'socialMedia')
+            return
+        while not social_finished:
+            try:
+                kind, field, text = events.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                yield 'error', 'socialMedia', (
+                    f'Timed out after {settings.CONTENT_STREAM_TIMEOUT_SECONDS}s waiting for the model'
+                )
+                return
+            social_finished = kind != 'delta'
+            yield kind, field, text
+    finally:
+        stop.set()
+        social.cancel()
@@ -0,0 +1,485 @@
+"""
+Deduplicating cache for generated event content.
+
+Generations are stored in ``GeneratedContent`` keyed by the normalized event
+payload, the prompt template version and the model name, so they survive
+restarts and are shared by every worker process.
+
+Concurrent identical requests coalesce into one generation: inside a process
+followers wait on the leader's future, and across processes the leader holds
+a ``pending`` row that other processes poll until it is ready (or until the
+lease goes stale, in which case they take it over). The leader renews its
+lease every third of ``CONTENT_CACHE_LEASE_SECONDS`` while it generates, so
+only a leader that died loses the key. A follower that waits a full lease
+for a live leader gets ``ContentGenerationTimeout``. The async views use
+``aget_or_generate_content``, which follows the same protocol without
+blocking the event loop, and the streaming endpoint uses
+``stream_or_generate_content``, which leads or follows like any other request.
+
+Cache hits are counted in memory and written to ``GeneratedContent.hits`` at
+most every ``CONTENT_CACHE_HIT_FLUSH_SECONDS``, so a hit is a single read and
+never queues behind the lease and job writers.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager, closing, contextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .content import (
+    PROMPT_VERSION, ContentGenerationError, agenerate_event_content, generate_event_content, get_content_model,
+    stream_event_content,
+)
+from .models import GeneratedContent
+
+logger = logging.getLogger(__name__)
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_CLAIMED = object()
+
+_unflushed_hits = Counter()  # GeneratedContent pk -> hits not yet written
+_hits_lock = threading.Lock()
+_hits_flushed_at = time.monotonic()
+
+
+class ContentGenerationTimeout(ContentGenerationError):
+    """Raised when another request's generation of the same event took longer than a lease."""
+
+
+def normalize_event(event):
+    """Reduce an event payload to the fields the prompts use, whitespace-normalized."""
+    return {
+        'title': ' '.join(str(event.get('title') or 'No title provided').split()),
+        'description': ' '.join(str(event.get('description') or 'No description provided').split()),
+    }
+
+
+def content_model_name(model):
+    return getattr(model, 'model_name', None) or settings.GEMINI_MODEL_NAME
+
+
+def content_cache_key(event, model_name, prompt_version=None):
+    if prompt_version is None:
+        prompt_version = PROMPT_VERSION
+    normalized = normalize_event(event)
+    key_source = json.dumps(
+        [normalized['title'].casefold(), normalized['description'].casefold(), prompt_version, model_name],
+        ensure_ascii=False, separators=(',', ':')
+    )
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+def get_or_generate_content(event, model=None):
+    """Return ``(result, cached)`` for ``event``, generating it at most once.
+
+    ``cached`` is True when the content came from the cache or from a
+    generation another request already had in flight.
+    """
+    model = model or get_content_model()
+    if not settings.CONTENT_CACHE_ENABLED:
+        return generate_event_content(event, model=model), False
+
+    model_name = content_model_name(model)
+    key = content_cache_key(event, model_name)
+
+    cached = _lookup(key)
+    if cached is not None:
+        return cached, True
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not leader:
+        return _follow(key, future)
+
+    try:
+        result, cached = _generate_with_lease(key, event, model, model_name)
+        future.set_result(result)
+        return result, cached
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _follow(key, future):
+    try:
+        return future.result(timeout=settings.CONTENT_CACHE_LEASE_SECONDS), True
+    except FutureTimeoutError:
+        return _follower_timed_out(key, _lookup(key))
+
+
+def _follower_timed_out(key, cached):
+    # The leader may have finished just after the deadline
+    if cached is not None:
+        return cached, True
+    raise ContentGenerationTimeout(
+        f'Content for this event is still being generated after {settings.CONTENT_CACHE_LEASE_SECONDS}s'
+    )
+
+
+def _lookup(key):
+    entry = GeneratedContent.objects.filter(
+        cache_key=key, status=GeneratedContent.STATUS_READY
+    ).only('social_media', 'video_script').first()
+    if entry is None:
+        return None
+    if _count_hit(entry.pk):
+        flush_cache_hits()
+    return entry.as_result()
+
+
+def _count_hit(pk):
+    """Count a hit in memory. True when the counts are due to be written."""
+    with _hits_lock:
+        _unflushed_hits[pk] += 1
+        return time.monotonic() - _hits_flushed_at >= settings.CONTENT_CACHE_HIT_FLUSH_SECONDS
+
+
+def flush_cache_hits():
+    """Write the hits counted since the last flush to ``GeneratedContent.hits``."""
+    global _hits_flushed_at
+    with _hits_lock:
+        hits = dict(_unflushed_hits)
+        _unflushed_hits.clear()
+        _hits_flushed_at = time.monotonic()
+    if not hits:
+        return
+    with transaction.atomic():
+        for pk, count in hits.items():
+            GeneratedContent.objects.filter(pk=pk).update(hits=F('hits') + count)
+
+
+def _claim_lease(key, event, model_name):
+    """Try to become the process generating ``key``.
+
+    Returns ``_CLAIMED`` when this caller now owns the pending row, the
+    finished result when another process completed it, or None to wait.
+    """
+    lease = timedelta(seconds=settings.CONTENT_CACHE_LEASE_SECONDS)
+
+    while True:
+        try:
+            with transaction.atomic():
+                GeneratedContent.objects.create(
+                    cache_key=key,
+                    model_name=model_name,
+                    prompt_version=PROMPT_VERSION,
+                    event=normalize_event(event),
+                )
+            return _CLAIMED
+        except IntegrityError:
+            pass
+
+        # Another process owns the key: wait for its result or for the lease to expire
+        entry = GeneratedContent.objects.filter(cache_key=key).first()
+        if entry is not None:
+            break
+
+    if entry.status == GeneratedContent.STATUS_READY:
+        return _lookup(key) or entry.as_result()
+    if timezone.now() - entry.updated_at > lease:
+        taken = GeneratedContent.objects.filter(
+            pk=entry.pk, status=GeneratedContent.STATUS_PENDING, updated_at=entry.updated_at
+        ).update(updated_at=timezone.now())
+        if taken:
+            return _CLAIMED
+    return None
+
+
+def _renew_interval():
+    return settings.CONTENT_CACHE_LEASE_SECONDS / 3
+
+
+def _renew_lease(key):
+    """Push back the pending row's expiry; False once the row is gone or ready."""
+    return bool(GeneratedContent.objects.filter(
+        cache_key=key, status=GeneratedContent.STATUS_PENDING
+    ).update(updated_at=timezone.now()))
+
+
+@contextmanager
+def _keep_lease(key):
+    """Renew ``key``'s lease from a background thread until the block exits."""
+    stop = threading.Event()
+
+    def renew():
+        try:
+            while not stop.wait(_renew_interval()):
+                try:
+                    if not _renew_lease(key):
+                        return
+                except Exception as e:
+                    logger.warning('Content lease renewal failed', extra={'key': key, 'error': str(e)})
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=renew, name='content-lease', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _wait_for_lease(key, event, model_name):
+    """Poll until this process holds ``key`` (``_CLAIMED``) or another process's result is ready."""
+    while True:
+        outcome = _claim_lease(key, event, model_name)
+        if outcome is not None:
+            return outcome
+        time.sleep(settings.CONTENT_CACHE_POLL_SECONDS)
+
+
+def _release_lease(key):
+    # Drop the pending row so the next request can retry
+    GeneratedContent.objects.filter(cache_key=key, status=GeneratedContent.STATUS_PENDING).delete()
+
+
+def _generate_with_lease(key, event, model, model_name):
+    outcome = _wait_for_lease(key, event, model_name)
+    if outcome is not _CLAIMED:
+        return outcome, True
+
+    try:
+        with _keep_lease(key):
+            result = generate_event_content(event, model=model)
+    except BaseException:
+        _release_lease(key)
+        raise
+
+    GeneratedContent.objects.filter(cache_key=key).update(**_ready_fields(result))
+    return result, False
+
+
+def _ready_fields(result):
+    return {
+        'status': GeneratedContent.STATUS_READY,
+        'social_media': result['socialMedia'],
+        'video_script': result['videoScript'],
+        'updated_at': timezone.now(),
+    }
+
+
+async def aget_or_generate_content(event, model=None):
+    """Async ``get_or_generate_content`` for the async views.
+
+    Shares the in-flight table with the sync path, so async and threaded
+    requests for the same event still coalesce into one generation.
+    """
+    model = model or get_content_model()
+    if not settings.CONTENT_CACHE_ENABLED:
+        return await agenerate_event_content(event, model=model), False
+
+    model_name = content_model_name(model)
+    key = content_cache_key(event, model_name)
+
+    cached = await _alookup(key)
+    if cached is not None:
+        return cached, True
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not leader:
+        # Shielded so a timeout or a disconnected client never cancels the leader's future
+        try:
+            result = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout=settings.CONTENT_CACHE_LEASE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            return _follower_timed_out(key, await _alookup(key))
+        return result, True
+
+    try:
+        result, cached = await _agenerate_with_lease(key, event, model, model_name)
+        future.set_result(result)
+        return result, cached
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+async def _alookup(key):
+    entry = await GeneratedContent.objects.filter(
+        cache_key=key, status=GeneratedContent.STATUS_READY
+    ).only('social_media', 'video_script').afirst()
+    if entry is None:
+        return None
+    if _count_hit(entry.pk):
+        await sync_to_async(flush_cache_hits)()
+    return entry.as_result()
+
+
+@asynccontextmanager
+async def _akeep_lease(key):
+    """Async ``_keep_lease``: renews from a task on the running loop."""
+    async def renew():
+        while True:
+            await asyncio.sleep(_renew_interval())
+            try:
+                if not await sync_to_async(_renew_lease)(key):
+                    return
+            except Exception as e:
+                logger.warning('Content lease renewal failed', extra={'key': key, 'error': str(e)})
+
+    task = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+
+async def _agenerate_with_lease(key, event, model, model_name):
+    # The claim runs in a transaction, which the async ORM does not support yet
+    claim = sync_to_async(_claim_lease)
+    while True:
+        outcome = await claim(key, event, model_name)
+        if outcome is _CLAIMED:
+            break
+        if outcome is not None:
+            return outcome, True
+        await asyncio.sleep(settings.CONTENT_CACHE_POLL_SECONDS)
+
+    try:
+        async with _akeep_lease(key):
+            result = await agenerate_event_content(event, model=model)
+    except BaseException:
+        await GeneratedContent.objects.filter(
+            cache_key=key, status=GeneratedContent.STATUS_PENDING
+        ).adelete()
+        raise
+
+    await GeneratedContent.objects.filter(cache_key=key).aupdate(**_ready_fields(result))
+    return result, False
+
+
+def stream_or_generate_content(event, model=None):
+    """Streaming ``get_or_generate_content``.
+
+    Yields ``(kind, field, text)`` tuples as ``stream_event_content`` does and
+    returns ``cached``. Content that is cached, or that another request
+    already has in flight, is replayed as one ``delta`` and ``done`` per
+    field. Otherwise the stream is the leader: it holds the in-flight slot and
+    the pending row's lease while it streams, and marks the row ready only if
+    both fields succeeded.
+    """
+    model = model or get_content_model()
+    if not settings.CONTENT_CACHE_ENABLED:
+        yield from stream_event_content(event, model=model)
+        return False
+
+    model_name = content_model_name(model)
+    key = content_cache_key(event, model_name)
+
+    cached = _lookup(key)
+    if cached is not None:
+        yield from _replay(cached)
+        return True
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not leader:
+        try:
+            result, _ = _follow(key, future)
+        except Exception as e:
+            for field in ('socialMedia', 'videoScript'):
+                yield 'error', field, str(e)
+            return False
+        yield from _replay(result)
+        return True
+
+    try:
+        outcome = _wait_for_lease(key, event, model_name)
+        if outcome is _CLAIMED:
+            result = yield from _stream_with_lease(key, event, model)
+            cached = False
+        else:
+            result = outcome
+            yield from _replay(result)
+            cached = True
+    except BaseException as e:
+        # A client that disconnects closes the stream with GeneratorExit
+        future.set_exception(
+            e if isinstance(e, Exception) else ContentGenerationError('The content stream was closed')
+        )
+        raise
+    else:
+        if result is None:
+            future.set_exception(ContentGenerationError('Streamed content generation failed'))
+        else:
+            future.set_result(result)
+        return cached
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _replay(result):
+    for field, text in result.items():
+        yield 'delta', field, text
+        yield 'done', field, text
+
+
+def _stream_with_lease(key, event, model):
+    """Stream a generation for the claimed ``key``; return the result, or None if a field failed."""
+    result = {}
+    failed = False
+    try:
+        with _keep_lease(key), closing(stream_event_content(event, model=model)) as stream:
+            for kind, field, text in stream:
+                if kind == 'done':
+                    result[field] = text
+                elif kind == 'error':
+                    failed = True
+                yield kind, field, text
+    except BaseException:
+        _release_lease(key)
+        raise
+
+    if failed:
+        _release_lease(key)
+        return None
+    GeneratedContent.objects.filter(cache_key=key).update(**_ready_fields(result))
+    return result
+
+
+def prewarm_content(events, model=None):
+    """Generate and cache content for ``events``. Returns the number generated."""
+    generated = 0
+    for event in events:
+        _, cached = get_or_generate_content(event, model=model)
+        if not cached:
+            generated += 1
+    return generated
@@ -0,0 +1,127 @@
+"""
+Database-backed job queue for event content generation.
+
+Requests enqueue a ``ContentJob`` row and return immediately; a pool of
+worker threads (``manage.py run_content_workers``) claims queued rows and
+runs the prompts on the shared model client through the content cache.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .content_cache import get_or_generate_content
+from .models import ContentJob
+from .scoring import with_ranked_posts
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_content_job(event):
+    """Queue content generation for ``event`` and return the job."""
+    payload = {
+        'title': event.get('title', 'No title provided'),
+        'description': event.get('description', 'No description provided'),
+    }
+    return ContentJob.objects.create(event=payload)
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running, or return None."""
+    while True:
+        job_id = (
+            ContentJob.objects.filter(status=ContentJob.STATUS_QUEUED)
+            .order_by('id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        # Single conditional UPDATE so two workers cannot claim the same row;
+        # if another worker won the race, look for the next queued job
+        claimed = ContentJob.objects.filter(
+            id=job_id, status=ContentJob.STATUS_QUEUED
+        ).update(status=ContentJob.STATUS_RUNNING, started_at=timezone.now())
+        if claimed:
+            return ContentJob.objects.get(id=job_id)
+
+
+def run_job(job, model=None):
+    """Generate content for a claimed job and store the outcome."""
+    try:
+        result, _ = get_or_generate_content(job.event, model=model)
+    except Exception as e:
+        logger.exception('Content job %s failed', job.id)
+        job.status = ContentJob.STATUS_FAILED
+        job.error = str(e)
+    else:
+        job.status = ContentJob.STATUS_SUCCEEDED
+        job.result = with_ranked_posts(result)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def run_pending_jobs(model=None):
+    """Drain the queue in the calling thread. Returns the number of jobs run."""
+    count = 0
+    while (job := claim_next_job()) is not None:
+        run_job(job, model=model)
+        count += 1
+    return count
+
+
+def requeue_stale_jobs(timeout=None, now=None):
+    """Put jobs left running by a dead worker process back on the queue.
+
+    Only jobs started more than ``timeout`` seconds ago (default
+    ``CONTENT_JOB_TIMEOUT_SECONDS``) count as abandoned, so a job that a live
+    worker in another process is still running is left alone.
+    """
+    if timeout is None:
+        timeout = settings.CONTENT_JOB_TIMEOUT_SECONDS
+    cutoff = (now or timezone.now()) - timedelta(seconds=timeout)
+    return ContentJob.objects.filter(status=ContentJob.STATUS_RUNNING, started_at__lt=cutoff).update(
+        status=ContentJob.STATUS_QUEUED, started_at=None
+    )
+
+
+class ContentWorkerPool:
+    """Fixed pool of threads that poll the queue and run jobs."""
+
+    def __init__(self, workers=4, poll_interval=0.5):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f'content-worker-{index}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self):
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                job = claim_next_job()
+                if job is not None:
+                    run_job(job)
+            except Exception:
+                logger.exception('Content worker error')
+                job = None
+
+            if job is None:
+                self._stop.wait(self.poll_interval)
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from events.retention import archive_expired_events, expired_events
+
+class Command(BaseCommand):
+    help = 'Move events past their retention horizon from GlobalEvent to ArchivedEvent in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EVENT_ARCHIVE_BATCH_SIZE)
+        parser.add_argument(
+            '--sleep', type=float, default=0.0,
+            help='Seconds to pause between batches so other writers get the lock'
+        )
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--max-seconds', type=float, help='Stop after roughly this many seconds')
+        parser.add_argument(
+            '--days', type=int,
+            help=f'Default retention horizon in days (default: {settings.EVENT_RETENTION_DAYS}); '
+                 'per-type horizons still apply'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the expired events')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = expired_events(default_days=options['days']).count()
+            self.stdout.write(f'{count} events are past their retention horizon')
+            return
+
+        report = archive_expired_events(
+            batch_size=options['batch_size'],
+            pause=options['sleep'],
+            max_batches=options['max_batches'],
+            max_seconds=options['max_seconds'],
+            default_days=options['days'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {report['moved']} events in {report['batches']} batches "
+            f"({report['seconds']:.2f}s, {report['rows_per_second']:.0f} rows/s)"
+        ))
+        if report['remaining']:
+            self.stdout.write(self.style.WARNING(f"{report['remaining']} expired events remain; run again to continue"))
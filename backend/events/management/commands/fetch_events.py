@@ -1,35 +1,76 @@
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 from events.models import GlobalEvent
 from events.utils import fetch_trending_events
+from telemetry import stage
 
 class Command(BaseCommand):
     help = 'Fetch trending events from APIs and save to database'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--warm-content', type=int, default=0, metavar='N',
+            help='Pre-generate cached content for the top N trending events'
+        )
+
     def handle(self, *args, **kwargs):
         # Fetch events from APIs
-        events = fetch_trending_events()
+        with stage('events', 'fetch_events', 'fetch') as fetch_timer:
+            events = fetch_trending_events()
 
         # Iterate through fetched events and save to the database
-        for event in events:
-            # Use get_or_create with date to avoid duplicates of same event on same date
-            obj, created = GlobalEvent.objects.get_or_create(
-                title=event['title'],
-                date=event['date'],
-                defaults={
-                    'description': event['description'],
-                    'location': event['location'],
-                    'event_type': event.get('event_type', ''),
-                    'trending_score': event['trending_score']
-                }
-            )
-            
-            if created:
-                self.stdout.write(
-                    self.style.SUCCESS(f'Added new event: {event["title"]} on {event["date"]}')
-                )
-            else:
-                self.stdout.write(
-                    self.style.WARNING(f'Event already exists: {event["title"]} on {event["date"]}')
+        added = 0
+        verbose = kwargs['verbosity'] >= 2
+        with stage('events', 'fetch_events', 'upsert') as upsert_timer:
+            for event in events:
+                # Use get_or_create with date to avoid duplicates of same event on same date
+                obj, created = GlobalEvent.objects.get_or_create(
+                    title=event['title'],
+                    date=event['date'],
+                    defaults={
+                        'description': event['description'],
+                        'location': event['location'],
+                        'event_type': event.get('event_type', ''),
+                        'trending_score': event['trending_score']
+                    }
                 )
+                added += created
+
+                # Per-event lines only with -v 2; the summary below covers the normal run
+                if verbose:
+                    if created:
+                        self.stdout.write(
+                            self.style.SUCCESS(f'Added new event: {event["title"]} on {event["date"]}')
+                        )
+                    else:
+                        self.stdout.write(
+                            self.style.WARNING(f'Event already exists: {event["title"]} on {event["date"]}')
+                        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully processed {len(events)} events ({added} added, {len(events) - added} already existed)'
+        ))
+        if fetch_timer.elapsed is not None:
+            self.stdout.write(
+                f'Timings: fetch {fetch_timer.elapsed:.2f}s, upsert {upsert_timer.elapsed:.2f}s'
+            )
+
+        if kwargs['warm_content']:
+            self.warm_content(kwargs['warm_content'])
+
+    def warm_content(self, top_n):
+        from events.content import content_model_configured
+        from events.content_cache import prewarm_content
+        from events.trending import rank_events, upcoming_events
+
+        if not content_model_configured():
+            self.stdout.write(self.style.WARNING('Skipping content warm-up: GEMINI_API_KEY not configured'))
+            return
 
-        self.stdout.write(self.style.SUCCESS('Successfully processed events'))
+        now = timezone.now()
+        top_ids = [pk for _, pk in rank_events(upcoming_events(now), now)[:top_n]]
+        events = GlobalEvent.objects.filter(pk__in=top_ids).values('title', 'description')
+        generated = prewarm_content(events)
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed content cache for top {len(top_ids)} events ({generated} newly generated)'
+        ))
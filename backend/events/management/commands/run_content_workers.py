@@ -0,0 +1,34 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from events.jobs import ContentWorkerPool, requeue_stale_jobs
+
+class Command(BaseCommand):
+    help = 'Run background workers that process queued content generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.CONTENT_JOB_WORKERS)
+        parser.add_argument('--poll-interval', type=float, default=0.5)
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(
+                f'Requeued {requeued} jobs running for over {settings.CONTENT_JOB_TIMEOUT_SECONDS}s'
+            ))
+
+        pool = ContentWorkerPool(workers=options['workers'], poll_interval=options['poll_interval'])
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+
+        pool.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {options['workers']} content workers"))
+        try:
+            stopped.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stdout.write('Stopping workers...')
+            pool.stop()
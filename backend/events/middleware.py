@@ -0,0 +1,49 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from telemetry import enabled, registry
+
+
+class RequestTimingMiddleware:
+    """Record the time each view takes to return its response.
+
+    Streamed bodies are produced after this returns; views that stream time
+    their body separately with ``telemetry.timed_iter``. Supports both sync
+    and async stacks, so under ASGI the async views are not pushed onto a
+    thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not enabled():
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, start)
+        return response
+
+    async def __acall__(self, request):
+        if not enabled():
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, start)
+        return response
+
+    @staticmethod
+    def _observe(request, start):
+        match = getattr(request, 'resolver_match', None)
+        operation = match.url_name if match and match.url_name else 'unmatched'
+        registry.observe('events', operation, 'request', time.perf_counter() - start)
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0004_alter_globalevent_event_type"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="globalevent",
+            name="date",
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
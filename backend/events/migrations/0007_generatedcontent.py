@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0006_contentjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeneratedContent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cache_key", models.CharField(max_length=64, unique=True)),
+                ("model_name", models.CharField(max_length=255)),
+                ("prompt_version", models.PositiveIntegerField()),
+                ("event", models.JSONField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "Pending"), ("ready", "Ready")],
+                        default="pending",
+                        max_length=16,
+                    ),
+                ),
+                ("social_media", models.TextField(blank=True, default="")),
+                ("video_script", models.TextField(blank=True, default="")),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
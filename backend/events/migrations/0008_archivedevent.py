@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0007_generatedcontent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event_id", models.BigIntegerField(unique=True)),
+                ("title", models.CharField(max_length=255)),
+                ("description", models.TextField()),
+                ("location", models.CharField(max_length=255)),
+                ("event_type", models.CharField(blank=True, max_length=255, null=True)),
+                ("date", models.DateTimeField()),
+                ("trending_score", models.FloatField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -7,7 +7,7 @@ class GlobalEvent(models.Model):
     description = models.TextField(default="No description")
     location = models.CharField(max_length=255, default="Unknown")
     event_type = models.CharField(max_length=255, null=True, blank=True)
-    date = models.DateTimeField()
+    date = models.DateTimeField(db_index=True)
     trending_score = models.FloatField()
 
     def __str__(self):
@@ -19,20 +19,103 @@ class GlobalEvent(models.Model):
 
     def get_event_priority_score(self):
         """Return an adjusted score based on event type and proximity."""
-        base_score = self.trending_score
-        
+        return self.compute_priority_score(
+            self.trending_score, self.event_type, self.date, timezone.now()
+        )
+
+    @staticmethod
+    def compute_priority_score(trending_score, event_type, date, now):
+        """Priority score from raw column values, so callers can rank rows
+        fetched with ``values_list()`` without building model instances."""
+        base_score = trending_score
+
         # Only consider upcoming events
-        if not self.is_upcoming():
+        if not (now <= date <= now + timedelta(days=30)):
             return 0  # Past events get 0 priority
-            
+
         # Calculate days until event
-        days_until = (self.date - timezone.now()).days
-        
+        days_until = (date - now).days
+
         # Boost score based on proximity (closer events get higher scores)
         proximity_boost = max(0, 30 - days_until) * 2  # Up to 60 point boost for events today
-        
+
         # Event type boost
-        if self.event_type in ['Holiday', 'Weather']:
+        if event_type in ['Holiday', 'Weather']:
             base_score += 20  # Reduced from 50 to 20
-            
+
         return base_score + proximity_boost
+
+
+class ArchivedEvent(models.Model):
+    """Expired GlobalEvent moved out of the hot table by ``archive_events``.
+
+    Keeps every column but only the unique index on the original id, so the
+    archive stays cheap to append to.
+    """
+    event_id = models.BigIntegerField(unique=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    location = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=255, null=True, blank=True)
+    date = models.DateTimeField()
+    trending_score = models.FloatField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.title} ({self.date:%Y-%m-%d})"
+
+
+class ContentJob(models.Model):
+    """Queued content generation request, processed by run_content_workers."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    event = models.JSONField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event.get('title', 'Event')} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+
+class GeneratedContent(models.Model):
+    """Cached generation for one normalized event, prompt version and model."""
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_READY, 'Ready'),
+    ]
+
+    cache_key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=255)
+    prompt_version = models.PositiveIntegerField()
+    event = models.JSONField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    social_media = models.TextField(blank=True, default='')
+    video_script = models.TextField(blank=True, default='')
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.event.get('title', 'Event')} [{self.model_name} v{self.prompt_version}]"
+
+    def as_result(self):
+        return {'socialMedia': self.social_media, 'videoScript': self.video_script}
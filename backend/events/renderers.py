@@ -0,0 +1,32 @@
+from rest_framework.renderers import BaseRenderer
+
+from .serializers import encode_json
+
+
+def ndjson_line(message):
+    return encode_json(message) + b'\n'
+
+
+def sse_message(message):
+    # The message type doubles as the SSE event name
+    return b'event: ' + message.get('type', 'message').encode() + b'\ndata: ' + encode_json(message) + b'\n\n'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON; one message per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ndjson_line(data)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Server-sent events. Non-streamed responses are sent as one ``error`` event."""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_message({'type': 'error', **data})
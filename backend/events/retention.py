@@ -0,0 +1,99 @@
+"""
+Retention for ``GlobalEvent``: expired events move to ``ArchivedEvent``.
+
+An event expires once its date is further in the past than the horizon for
+its type (``EVENT_RETENTION_DAYS``, overridden per type by
+``EVENT_RETENTION_DAYS_BY_TYPE``). The feed never shows such events, since
+their priority score is 0, so moving them only shrinks the hot table and its
+date index.
+
+Rows move in primary key order, one short transaction per batch, so the
+write lock is only held for a single batch and ingestion and API requests
+interleave with a long archival run. The run can be bounded by batch count
+or duration and resumed later; archiving an already archived id is a no-op.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from telemetry import stage
+
+from .models import ArchivedEvent, GlobalEvent
+
+ARCHIVED_FIELDS = ('id', 'title', 'description', 'location', 'event_type', 'date', 'trending_score')
+
+
+def retention_cutoffs(now, default_days=None, days_by_type=None):
+    """Return the default cutoff and ``{event_type: cutoff}`` for ``now``."""
+    if default_days is None:
+        default_days = settings.EVENT_RETENTION_DAYS
+    if days_by_type is None:
+        days_by_type = settings.EVENT_RETENTION_DAYS_BY_TYPE
+    return (
+        now - timedelta(days=default_days),
+        {event_type: now - timedelta(days=days) for event_type, days in days_by_type.items()},
+    )
+
+
+def expired_events(now=None, default_days=None, days_by_type=None):
+    """Queryset of events past their retention horizon."""
+    default_cutoff, type_cutoffs = retention_cutoffs(now or timezone.now(), default_days, days_by_type)
+    condition = Q(date__lt=default_cutoff) & ~Q(event_type__in=list(type_cutoffs))
+    for event_type, cutoff in type_cutoffs.items():
+        condition |= Q(event_type=event_type, date__lt=cutoff)
+    return GlobalEvent.objects.filter(condition)
+
+
+def archive_batch(queryset, batch_size):
+    """Move up to ``batch_size`` rows of ``queryset`` into the archive. Returns the count moved."""
+    with transaction.atomic():
+        rows = list(queryset.order_by('pk').values_list(*ARCHIVED_FIELDS)[:batch_size])
+        if not rows:
+            return 0
+        ArchivedEvent.objects.bulk_create(
+            [ArchivedEvent(event_id=row[0], **dict(zip(ARCHIVED_FIELDS[1:], row[1:]))) for row in rows],
+            ignore_conflicts=True,
+        )
+        GlobalEvent.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_expired_events(now=None, batch_size=None, pause=0.0, max_batches=None, max_seconds=None,
+                           default_days=None, days_by_type=None):
+    """Archive expired events batch by batch.
+
+    ``pause`` sleeps between batches to leave room for other writers;
+    ``max_batches`` and ``max_seconds`` bound one run. Returns a report with
+    the rows moved, batches, elapsed seconds and rows moved per second.
+    """
+    batch_size = batch_size or settings.EVENT_ARCHIVE_BATCH_SIZE
+    queryset = expired_events(now, default_days, days_by_type)
+
+    moved = batches = 0
+    start = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        with stage('events', 'archive_events', 'batch'):
+            count = archive_batch(queryset, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        if count < batch_size:
+            break
+        if max_seconds is not None and time.perf_counter() - start >= max_seconds:
+            break
+        if pause:
+            time.sleep(pause)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'moved': moved,
+        'batches': batches,
+        'seconds': elapsed,
+        'rows_per_second': moved / elapsed if elapsed > 0 else 0.0,
+        'remaining': queryset.count(),
+    }
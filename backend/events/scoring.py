@@ -0,0 +1,155 @@
+"""
+Split generated social media text into its numbered posts and rank them by
+predicted engagement.
+
+``POST_SCORING_BACKEND`` selects where the engagement model runs:
+
+``local``
+    ``PostPerformancePredictor`` is loaded once per process and every post of
+    a generation is scored in a single batched pass.
+``remote``
+    one ``/ml/predict_batch`` call to ``ML_SERVICE_URL`` per generation. Each
+    thread has its own session; they share one keep-alive pool of
+    ``ML_SERVICE_POOL_SIZE`` connections.
+``off``
+    no ranking; responses carry only the raw generated text.
+
+Scoring failures never fail the generation: the posts come back in their
+original order with no prediction.
+"""
+import logging
+import re
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from django.core import checks
+
+logger = logging.getLogger(__name__)
+
+# "1. Text", "2) Text", "**Post 3:** Text" at the start of a line
+POST_MARKER = re.compile(r'^[ \t]*(?:\*\*)?(?:Post[ \t]*)?(\d{1,2})[.):](?:\*\*)?[ \t]*', re.IGNORECASE | re.MULTILINE)
+CATEGORY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+_predictor = None
+_predictor_lock = threading.Lock()
+_sessions = threading.local()
+_adapter = None
+_adapter_lock = threading.Lock()
+
+
+def parse_social_posts(text):
+    """Return ``[{'number': n, 'text': post}, ...]`` for the numbered posts in ``text``.
+
+    Text without numbering is treated as a single post.
+    """
+    text = text or ''
+    markers = list(POST_MARKER.finditer(text))
+    posts = []
+    for marker, following in zip(markers, markers[1:] + [None]):
+        body = text[marker.end():following.start() if following else len(text)].strip()
+        if body:
+            posts.append({'number': int(marker.group(1)), 'text': body})
+    if not posts and text.strip():
+        posts.append({'number': 1, 'text': text.strip()})
+    return posts
+
+
+def get_post_predictor():
+    """Return the process-wide engagement predictor, loading the model on first use."""
+    global _predictor
+    if _predictor is not None:
+        return _predictor
+
+    with _predictor_lock:
+        if _predictor is None:
+            from ml.train import PostPerformancePredictor
+
+            predictor = PostPerformancePredictor(emoji_mode='lean')
+            predictor.load_model(settings.ML_MODEL_PATH)
+            _predictor = predictor
+    return _predictor
+
+
+def _score_local(posts):
+    results = get_post_predictor().predict_many([post['text'] for post in posts])
+    return [(result['category'], result['confidence']) for result in results]
+
+
+def _get_session():
+    """Return this thread's session; ``requests.Session`` is not safe to share across threads."""
+    global _adapter
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        with _adapter_lock:
+            if _adapter is None:
+                _adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.ML_SERVICE_POOL_SIZE)
+        session = requests.Session()
+        session.mount('http://', _adapter)
+        session.mount('https://', _adapter)
+        _sessions.session = session
+    return session
+
+
+def _score_remote(posts):
+    response = _get_session().post(
+        f"{settings.ML_SERVICE_URL.rstrip('/')}/ml/predict_batch",
+        json={'posts': [{'id': index, 'content': post['text']} for index, post in enumerate(posts)]},
+        timeout=settings.ML_SERVICE_TIMEOUT,
+    )
+    response.raise_for_status()
+    by_id = {item['id']: item for item in response.json()['predictions']}
+    return [(by_id[index]['prediction'], by_id[index]['confidence']) for index in range(len(posts))]
+
+
+SCORERS = {
+    'local': _score_local,
+    'remote': _score_remote,
+}
+
+
+def rank_social_posts(text):
+    """Parse ``text`` and return its posts, best predicted engagement first.
+
+    Each post has ``rank``, ``number`` (its position in the generated text),
+    ``text``, ``prediction`` and ``confidence``.
+    """
+    posts = parse_social_posts(text)
+    try:
+        scorer = SCORERS.get(settings.POST_SCORING_BACKEND)
+        if scorer is None:
+            raise ValueError(f'Unknown POST_SCORING_BACKEND {settings.POST_SCORING_BACKEND!r}')
+        scores = scorer(posts) if posts else []
+    except Exception as e:
+        logger.warning('Post scoring failed', extra={'backend': settings.POST_SCORING_BACKEND, 'error': str(e)})
+        scores = [(None, None)] * len(posts)
+
+    for post, (prediction, confidence) in zip(posts, scores):
+        post['prediction'] = prediction
+        post['confidence'] = confidence
+    posts.sort(key=lambda post: (
+        CATEGORY_RANK.get(post['prediction'], len(CATEGORY_RANK)), -(post['confidence'] or 0), post['number']
+    ))
+    for rank, post in enumerate(posts, 1):
+        post['rank'] = rank
+    return posts
+
+
+@checks.register()
+def check_scoring_backend(app_configs, **kwargs):
+    """Report an unknown ``POST_SCORING_BACKEND`` at startup rather than on first use."""
+    if settings.POST_SCORING_BACKEND == 'off' or settings.POST_SCORING_BACKEND in SCORERS:
+        return []
+    return [checks.Error(
+        f'Unknown POST_SCORING_BACKEND {settings.POST_SCORING_BACKEND!r}.',
+        hint=f"Use one of: {', '.join([*SCORERS, 'off'])}.",
+        id='events.E001',
+    )]
+
+
+def with_ranked_posts(result):
+    """Add ``rankedPosts`` to a generation result unless scoring is off."""
+    if settings.POST_SCORING_BACKEND == 'off':
+        return result
+    return {**result, 'rankedPosts': rank_social_posts(result['socialMedia'])}
@@ -1,7 +1,113 @@
+import json
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import GlobalEvent
 
+try:
+    import orjson
+except ImportError:  # orjson is optional and only used with EVENTS_JSON_ORJSON
+    orjson = None
+
 class GlobalEventSerializer(serializers.ModelSerializer):
     class Meta:
         model = GlobalEvent
         fields = ['id', 'title', 'description', 'location', 'event_type', 'date', 'trending_score']
+
+
+# Fast path for read-only endpoints. Builds the same representation as
+# GlobalEventSerializer directly from ``values_list()`` tuples, skipping the
+# per-instance field machinery of ModelSerializer.
+
+def _datetime_representation():
+    # Mirrors rest_framework.fields.DateTimeField.to_representation for ISO 8601,
+    # resolving the current timezone once per batch instead of once per row
+    current_timezone = timezone.get_current_timezone()
+    if current_timezone.utcoffset(None) == timedelta(0):
+        current_timezone = dt_timezone.utc
+
+    def convert(value):
+        if not value:
+            return None
+        if value.tzinfo is not current_timezone:
+            value = value.astimezone(current_timezone)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+def _float_representation():
+    return lambda value: None if value is None else float(value)
+
+
+FIELD_REPRESENTATIONS = {
+    'date': _datetime_representation,
+    'trending_score': _float_representation,
+}
+
+
+def event_row_converter(fields):
+    """Return a function mapping one ``values_list(*fields)`` row to a GlobalEventSerializer-shaped dict."""
+    converters = [(index, FIELD_REPRESENTATIONS[name]()) for index, name in enumerate(fields)
+                  if name in FIELD_REPRESENTATIONS]
+
+    def convert_row(row):
+        if converters:
+            row = list(row)
+            for index, convert in converters:
+                row[index] = convert(row[index])
+        return dict(zip(fields, row))
+
+    return convert_row
+
+
+def event_rows_to_dicts(rows, fields):
+    """Yield GlobalEventSerializer-shaped dicts for ``values_list(*fields)`` rows."""
+    convert_row = event_row_converter(fields)
+    for row in rows:
+        yield convert_row(row)
+
+
+async def aevent_rows_to_dicts(rows, fields):
+    """``event_rows_to_dicts`` over an async iterable of rows."""
+    convert_row = event_row_converter(fields)
+    async for row in rows:
+        yield convert_row(row)
+
+
+def encode_json(data):
+    """Encode ``data`` to the same bytes rest_framework's JSONRenderer produces.
+
+    With ``EVENTS_JSON_ORJSON`` the output is equivalent JSON but not always
+    the same bytes (see the setting).
+    """
+    if orjson is not None and settings.EVENTS_JSON_ORJSON:
+        rendered = orjson.dumps(data)
+    else:
+        rendered = json.dumps(data, ensure_ascii=False, allow_nan=False,
+                              separators=(',', ':')).encode('utf-8')
+    # JSONRenderer escapes these two so the output is also valid JavaScript
+    return rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def stream_json_array(items):
+    """Yield a JSON array chunk by chunk, one encoded item at a time."""
+    yield b'['
+    for index, item in enumerate(items):
+        yield encode_json(item) if index == 0 else b',' + encode_json(item)
+    yield b']'
+
+
+async def astream_json_array(items):
+    """``stream_json_array`` over an async iterable of items."""
+    yield b'['
+    first = True
+    async for item in items:
+        yield encode_json(item) if first else b',' + encode_json(item)
+        first = False
+    yield b']'
@@ -1,3 +1,801 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+import telemetry
+
+from . import async_views, scoring, views
+from .content import FakeContentModel, generate_event_content, reset_content_model, stream_event_content
+from .content_cache import (
+    ContentGenerationTimeout, _renew_lease, aget_or_generate_content, content_cache_key, flush_cache_hits,
+    get_or_generate_content,
+)
+from .jobs import claim_next_job, enqueue_content_job, requeue_stale_jobs, run_pending_jobs
+from .models import ArchivedEvent, ContentJob, GeneratedContent, GlobalEvent
+from .retention import archive_expired_events, expired_events
+from .scoring import check_scoring_backend, parse_social_posts, rank_social_posts
+from .serializers import GlobalEventSerializer, encode_json, event_rows_to_dicts, orjson
+from .views import content_stream_messages
+
+
+def make_event(days_ahead, trending_score=50, **kwargs):
+    defaults = {
+        'title': f'Event in {days_ahead} days',
+        'description': 'A long description ' * 20,
+        'location': 'India',
+        'event_type': 'Festival',
+    }
+    defaults.update(kwargs)
+    return GlobalEvent.objects.create(
+        date=timezone.now() + timedelta(days=days_ahead, hours=1),
+        trending_score=trending_score,
+        **defaults,
+    )
+
+
+def body(response):
+    return json.loads(response.getvalue())
+
+
+class TrendingEventsFeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('get_trending_events')
+        self.soon = make_event(1, trending_score=60, title='Soon')
+        self.holiday = make_event(10, event_type='Holiday', title='Holiday', location='Mumbai')
+        self.later = make_event(20, title='Later')
+        self.past = make_event(-3, title='Past')
+        self.far = make_event(45, title='Far')
+
+    def test_default_response_is_full_ranked_list(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        events = body(response)
+        self.assertEqual([e['title'] for e in events], ['Soon', 'Holiday', 'Later'])
+        self.assertIn('description', events[0])
+        self.assertNotIn('X-Next-Cursor', response)
+
+    def test_cursor_pagination_walks_every_event_once(self):
+        titles = []
+        params = {'limit': 2}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            titles.extend(e['title'] for e in body(response))
+            if 'X-Next-Cursor' not in response:
+                break
+            params = {'limit': 2, 'cursor': response['X-Next-Cursor']}
+        self.assertEqual(titles, ['Soon', 'Holiday', 'Later'])
+
+    def test_later_pages_are_ranked_at_the_first_page_time(self):
+        make_event(10 + 4 / 24, event_type='Sports', title='A')  # 90 on both days
+        make_event(20, trending_score=69, event_type='Sports', title='B')  # 89, then 91 a day closer
+        first_time = timezone.now()
+        params = {'event_type': 'Sports', 'limit': 1}
+        with mock.patch('django.utils.timezone.now', return_value=first_time):
+            first = self.client.get(self.url, params)
+        # Two hours later B's proximity boost has crossed a day boundary and it outranks A
+        with mock.patch('django.utils.timezone.now', return_value=first_time + timedelta(hours=2)):
+            second = self.client.get(self.url, {**params, 'cursor': first['X-Next-Cursor']})
+        self.assertEqual([e['title'] for e in body(first) + body(second)], ['A', 'B'])
+        self.assertNotIn('X-Next-Cursor', second)
+
+    def test_fields_selects_columns(self):
+        response = self.client.get(self.url, {'fields': 'title,id', 'limit': 1})
+        self.assertEqual(body(response), [{'id': self.soon.id, 'title': 'Soon'}])
+
+    def test_filters(self):
+        response = self.client.get(self.url, {'event_type': 'Holiday'})
+        self.assertEqual([e['title'] for e in body(response)], ['Holiday'])
+
+        response = self.client.get(self.url, {'location': 'mumbai'})
+        self.assertEqual([e['title'] for e in body(response)], ['Holiday'])
+
+        min_score = self.later.get_event_priority_score() + 1
+        response = self.client.get(self.url, {'min_score': min_score})
+        self.assertEqual([e['title'] for e in body(response)], ['Soon', 'Holiday'])
+
+    def test_invalid_params_are_rejected(self):
+        for params in ({'limit': 0}, {'limit': 'x'}, {'fields': 'title,secret'},
+                       {'cursor': '!!'}, {'min_score': 'high'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class FastSerializationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        make_event(2, title='Diwali \u2728', description='Lights\u2028and \u201csweets\u201d', location='Delhi')
+        make_event(5, event_type=None, trending_score=72.5)
+        make_event(7, title='Tab\there', description='Line\nbreak "quoted" \\ slash')
+
+    def drf_bytes(self, events):
+        return JSONRenderer().render(GlobalEventSerializer(events, many=True).data)
+
+    def test_trending_feed_matches_drf_output(self):
+        ranked = sorted(GlobalEvent.objects.all(), key=lambda e: e.get_event_priority_score(), reverse=True)
+        response = self.client.get(reverse('get_trending_events'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.getvalue(), self.drf_bytes(ranked))
+
+    def test_floats_match_drf_output(self):
+        data = {'scores': [1e16, 1.5e-7, 0.1, 1e300, -0.0, 72.5, 2.0 ** 60], 'count': 10 ** 18}
+        self.assertEqual(encode_json(data), JSONRenderer().render(data))
+        for value in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({'score': value})
+            with self.assertRaises(ValueError):
+                encode_json({'score': value})
+
+    @skipUnless(orjson, 'orjson is not installed')
+    @override_settings(EVENTS_JSON_ORJSON=True)
+    def test_orjson_encodes_the_same_json(self):
+        ranked = sorted(GlobalEvent.objects.all(), key=lambda e: e.get_event_priority_score(), reverse=True)
+        response = self.client.get(reverse('get_trending_events'))
+        self.assertEqual(body(response), json.loads(self.drf_bytes(ranked)))
+
+    def test_only_json_is_offered(self):
+        url = reverse('get_trending_events')
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT='text/html').status_code, 406)
+        self.assertEqual(self.client.get(url, {'format': 'api'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'format': 'json'}, HTTP_ACCEPT='text/html, */*').status_code, 200)
+
+    def test_event_detail_matches_drf_output(self):
+        for event in GlobalEvent.objects.all():
+            response = self.client.get(reverse('get_event', args=[event.id]))
+            self.assertEqual(response.content, JSONRenderer().render(GlobalEventSerializer(event).data))
+
+    def test_rows_follow_active_timezone(self):
+        fields = GlobalEventSerializer.Meta.fields
+        with timezone.override('Asia/Kolkata'):
+            rows = GlobalEvent.objects.order_by('id').values_list(*fields)
+            events = GlobalEvent.objects.order_by('id')
+            self.assertEqual(list(event_rows_to_dicts(rows, fields)),
+                             GlobalEventSerializer(events, many=True).data)
+
+    def test_missing_event_is_404(self):
+        response = self.client.get(reverse('get_event', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CONTENT_MODEL_BACKEND='fake', FAKE_CONTENT_MODEL_DELAY=0)
+class ContentJobTests(TestCase):
+    event = {'title': 'Diwali', 'description': 'Festival of lights'}
+
+    def setUp(self):
+        self.client = APIClient()
+        reset_content_model()
+        self.addCleanup(reset_content_model)
+
+    def test_submit_then_poll(self):
+        response = self.client.post(reverse('submit_content_job'), {'event': self.event}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['jobId']
+        self.assertEqual(response.json()['status'], 'queued')
+        self.assertEqual(response['Location'], reverse('get_content_job', args=[job_id]))
+
+        self.assertEqual(run_pending_jobs(), 1)
+
+        job = self.client.get(reverse('get_content_job', args=[job_id])).json()
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertIn('Diwali', job['socialMedia'])
+        self.assertIn('Diwali', job['videoScript'])
+
+    def test_failed_job_reports_error(self):
+        job = enqueue_content_job(self.event)
+        broken = mock.Mock(model_name='broken')
+        broken.generate_content.side_effect = RuntimeError('quota exceeded')
+        run_pending_jobs(model=broken)
+
+        payload = self.client.get(reverse('get_content_job', args=[job.id])).json()
+        self.assertEqual(payload['status'], 'failed')
+        self.assertIn('quota exceeded', payload['error'])
+
+    def test_prompts_run_concurrently(self):
+        model = FakeContentModel(delay=0.2)
+        start = time.perf_counter()
+        result = generate_event_content(self.event, model=model)
+        self.assertLess(time.perf_counter() - start, 0.35)
+        self.assertEqual(model.calls, 2)
+        self.assertEqual(set(result), {'socialMedia', 'videoScript'})
+
+    def test_generation_inside_a_saturated_pool_does_not_deadlock(self):
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        with mock.patch('events.content._executor', pool):
+            # The caller holds the pool's only thread, so the queued prompt is run inline
+            future = pool.submit(generate_event_content, self.event, FakeContentModel())
+            result = future.result(timeout=5)
+        self.assertEqual(set(result), {'socialMedia', 'videoScript'})
+
+    def test_claim_is_exclusive(self):
+        enqueue_content_job(self.event)
+        self.assertIsNotNone(claim_next_job())
+        self.assertIsNone(claim_next_job())
+
+    @override_settings(CONTENT_JOB_TIMEOUT_SECONDS=60)
+    def test_only_jobs_past_the_timeout_are_requeued(self):
+        enqueue_content_job(self.event)
+        job = claim_next_job()
+        # A job a live worker just claimed stays running
+        self.assertEqual(requeue_stale_jobs(), 0)
+        self.assertIsNone(claim_next_job())
+
+        ContentJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(claim_next_job().id, job.id)
+
+    def test_synchronous_endpoint_uses_shared_model(self):
+        response = self.client.post(reverse('generate-content'), {'event': self.event}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('socialMedia', response.json())
+
+    def test_missing_event_is_rejected(self):
+        response = self.client.post(reverse('submit_content_job'), {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CONTENT_MODEL_BACKEND='fake', FAKE_CONTENT_MODEL_DELAY=0, CONTENT_CACHE_ENABLED=True)
+class ContentCacheTests(TestCase):
+    event = {'title': 'Diwali', 'description': 'Festival of lights'}
+
+    def setUp(self):
+        self.model = FakeContentModel()
+        # Drop hits other tests counted but never flushed
+        flush_cache_hits()
+
+    def test_identical_events_generate_once(self):
+        first, cached = get_or_generate_content(self.event, model=self.model)
+        self.assertFalse(cached)
+        second, cached = get_or_generate_content(
+            {'title': '  diwali ', 'description': 'Festival  of lights'}, model=self.model
+        )
+        self.assertTrue(cached)
+        self.assertEqual(first, second)
+        self.assertEqual(self.model.calls, 2)
+        flush_cache_hits()
+        self.assertEqual(GeneratedContent.objects.get().hits, 1)
+
+    @override_settings(CONTENT_CACHE_HIT_FLUSH_SECONDS=3600)
+    def test_hits_are_counted_without_writing(self):
+        get_or_generate_content(self.event, model=self.model)
+        flush_cache_hits()
+        # One read per hit and no writes until the counts are flushed
+        with self.assertNumQueries(3):
+            for _ in range(3):
+                get_or_generate_content(self.event, model=self.model)
+        self.assertEqual(GeneratedContent.objects.get().hits, 0)
+        flush_cache_hits()
+        self.assertEqual(GeneratedContent.objects.get().hits, 3)
+
+    def test_prompt_version_and_model_are_part_of_the_key(self):
+        get_or_generate_content(self.event, model=self.model)
+        with mock.patch('events.content_cache.PROMPT_VERSION', 2):
+            _, cached = get_or_generate_content(self.event, model=self.model)
+        self.assertFalse(cached)
+
+        other_model = FakeContentModel()
+        other_model.model_name = 'fake-2'
+        _, cached = get_or_generate_content(self.event, model=other_model)
+        self.assertFalse(cached)
+
+    def test_concurrent_requests_coalesce(self):
+        calls = []
+
+        def slow_generate(key, event, model, model_name):
+            calls.append(key)
+            time.sleep(0.2)
+            return {'socialMedia': 'posts', 'videoScript': 'script'}, False
+
+        with mock.patch('events.content_cache._lookup', return_value=None), \
+                mock.patch('events.content_cache._generate_with_lease', side_effect=slow_generate):
+            with ThreadPoolExecutor(max_workers=5) as pool:
+                results = list(pool.map(
+                    lambda _: get_or_generate_content(self.event, model=self.model), range(5)
+                ))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([cached for _, cached in results].count(False), 1)
+        self.assertTrue(all(result == results[0][0] for result, _ in results))
+
+    @override_settings(CONTENT_CACHE_LEASE_SECONDS=0.05)
+    def test_follower_of_a_slow_leader_times_out(self):
+        key = content_cache_key(self.event, 'fake')
+        # A leader in this process that never finishes
+        with mock.patch.dict('events.content_cache._inflight', {key: Future()}):
+            with self.assertRaises(ContentGenerationTimeout):
+                get_or_generate_content(self.event, model=self.model)
+
+            # ...unless it finished just after the deadline
+            GeneratedContent.objects.create(
+                cache_key=key, model_name='fake', prompt_version=1, event=self.event,
+                status=GeneratedContent.STATUS_READY, social_media='posts', video_script='script'
+            )
+            self.assertEqual(get_or_generate_content(self.event, model=self.model)[1], True)
+
+    def test_failed_generation_releases_the_key(self):
+        broken = mock.Mock(model_name='broken')
+        broken.generate_content.side_effect = RuntimeError('quota exceeded')
+        with self.assertRaises(RuntimeError):
+            get_or_generate_content(self.event, model=broken)
+        self.assertFalse(GeneratedContent.objects.exists())
+
+    def test_stale_pending_lease_is_taken_over(self):
+        key = content_cache_key(self.event, 'fake')
+        GeneratedContent.objects.create(
+            cache_key=key, model_name='fake', prompt_version=1, event=self.event
+        )
+        GeneratedContent.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+        result, cached = get_or_generate_content(self.event, model=self.model)
+        self.assertFalse(cached)
+        self.assertEqual(GeneratedContent.objects.get().status, GeneratedContent.STATUS_READY)
+        self.assertIn('Diwali', result['socialMedia'])
+
+    @override_settings(CONTENT_CACHE_LEASE_SECONDS=0.3)
+    def test_lease_is_renewed_while_generating(self):
+        renewals = []
+        with mock.patch('events.content_cache._renew_lease', side_effect=lambda key: renewals.append(key) or True):
+            get_or_generate_content(self.event, model=FakeContentModel(delay=0.35))
+        self.assertGreaterEqual(len(renewals), 2)
+
+    @override_settings(CONTENT_CACHE_LEASE_SECONDS=0.3)
+    async def test_async_lease_is_renewed_while_generating(self):
+        renewals = []
+        with mock.patch('events.content_cache._renew_lease', side_effect=lambda key: renewals.append(key) or True):
+            await aget_or_generate_content(self.event, model=FakeContentModel(delay=0.35))
+        self.assertGreaterEqual(len(renewals), 2)
+        self.assertEqual(set(renewals), {content_cache_key(self.event, 'fake')})
+
+    def test_renewing_a_lease_pushes_back_its_expiry(self):
+        key = content_cache_key(self.event, 'fake')
+        GeneratedContent.objects.create(cache_key=key, model_name='fake', prompt_version=1, event=self.event)
+        GeneratedContent.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertTrue(_renew_lease(key))
+        self.assertLess(timezone.now() - GeneratedContent.objects.get().updated_at, timedelta(minutes=1))
+
+        GeneratedContent.objects.update(status=GeneratedContent.STATUS_READY)
+        self.assertFalse(_renew_lease(key))
+
+    def test_endpoint_reports_cache_status(self):
+        reset_content_model()
+        self.addCleanup(reset_content_model)
+        client = APIClient()
+        url = reverse('generate-content')
+        self.assertEqual(client.post(url, {'event': self.event}, format='json')['X-Content-Cache'], 'miss')
+        self.assertEqual(client.post(url, {'event': self.event}, format='json')['X-Content-Cache'], 'hit')
+
+    def test_fetch_events_can_prewarm_top_events(self):
+        reset_content_model()
+        self.addCleanup(reset_content_model)
+        for days in (1, 2, 3):
+            make_event(days, title=f'Event {days}')
+
+        with mock.patch('events.management.commands.fetch_events.fetch_trending_events', return_value=[]):
+            call_command('fetch_events', warm_content=2, stdout=StringIO())
+
+        self.assertEqual(
+            sorted(GeneratedContent.objects.values_list('event__title', flat=True)),
+            ['Event 1', 'Event 2']
+        )
+
+
+@override_settings(CONTENT_MODEL_BACKEND='fake', FAKE_CONTENT_MODEL_TOKEN_DELAY=0.002)
+class ContentStreamTests(TestCase):
+    event = {'title': 'Diwali', 'description': 'Festival of lights'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('generate-content-stream')
+        reset_content_model()
+        self.addCleanup(reset_content_model)
+
+    def stream(self, **extra):
+        response = self.client.post(self.url, {'event': self.event}, format='json', **extra)
+        self.assertEqual(response.status_code, 200)
+        return response, [json.loads(line) for line in response.getvalue().splitlines() if line]
+
+    def test_ndjson_stream_interleaves_both_generations(self):
+        response, messages = self.stream()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        fields = [m['field'] for m in messages if m['type'] == 'delta']
+        first_social_done = next(i for i, m in enumerate(messages)
+                                 if m['type'] == 'done' and m['field'] == 'socialMedia')
+        self.assertIn('videoScript', fields[:first_social_done])
+
+        complete = messages[-1]
+        self.assertEqual(complete['type'], 'complete')
+        self.assertFalse(complete['cached'])
+        streamed = ''.join(m['text'] for m in messages if m['type'] == 'delta' and m['field'] == 'socialMedia')
+        self.assertEqual(streamed, complete['socialMedia'])
+        self.assertIn('1. Diwali', complete['socialMedia'])
+
+    def test_completed_stream_fills_the_cache(self):
+        self.stream()
+        _, messages = self.stream()
+        self.assertTrue(messages[-1]['cached'])
+        _, cached = get_or_generate_content(self.event)
+        self.assertTrue(cached)
+
+    def test_server_sent_events(self):
+        response = self.client.post(self.url, {'event': self.event}, format='json',
+                                    HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.getvalue().decode()
+        self.assertTrue(body.startswith('event: delta\ndata: {'))
+        self.assertIn('event: complete\n', body)
+
+    def test_model_errors_are_reported_per_field(self):
+        def failing_stream(prompt, stream=False):
+            if 'video script' in prompt:
+                raise RuntimeError('quota exceeded')
+            return FakeContentModel().generate_content(prompt, stream=True)
+
+        model = mock.Mock(model_name='fake', generate_content=failing_stream)
+        messages = list(content_stream_messages(self.event, model))
+        errors = [m for m in messages if m['type'] == 'error']
+        self.assertEqual([m['field'] for m in errors], ['videoScript'])
+        self.assertIn('socialMedia', messages[-1])
+        self.assertFalse(GeneratedContent.objects.exists())
+
+    def test_stream_follows_a_generation_in_flight(self):
+        model = FakeContentModel()
+        key = content_cache_key(self.event, 'fake')
+        leader = Future()
+        leader.set_result({'socialMedia': '1. Shared post', 'videoScript': 'Shared script'})
+        with mock.patch.dict('events.content_cache._inflight', {key: leader}):
+            messages = list(content_stream_messages(self.event, model))
+        self.assertEqual(model.calls, 0)
+        self.assertTrue(messages[-1]['cached'])
+        self.assertEqual(messages[-1]['videoScript'], 'Shared script')
+
+    def test_stream_waits_for_another_processes_pending_row(self):
+        model = FakeContentModel()
+        row = GeneratedContent.objects.create(
+            cache_key=content_cache_key(self.event, 'fake'), model_name='fake', prompt_version=1, event=self.event
+        )
+
+        def other_leader_finishes(seconds):
+            GeneratedContent.objects.filter(pk=row.pk).update(
+                status=GeneratedContent.STATUS_READY, social_media='1. Theirs', video_script='Theirs'
+            )
+
+        with mock.patch('events.content_cache.time.sleep', side_effect=other_leader_finishes):
+            messages = list(content_stream_messages(self.event, model))
+        self.assertEqual(model.calls, 0)
+        self.assertTrue(messages[-1]['cached'])
+        self.assertEqual(GeneratedContent.objects.get().video_script, 'Theirs')
+
+    @override_settings(CONTENT_STREAM_TIMEOUT_SECONDS=0.1)
+    def test_stalled_pooled_prompt_times_out(self):
+        started, release = threading.Event(), threading.Event()
+        threads = {}
+
+        def generate(prompt, stream=False):
+            field = 'videoScript' if 'video script' in prompt else 'socialMedia'
+            threads[field] = threading.current_thread()
+            if field == 'socialMedia':
+                started.set()
+                release.wait(5)
+            else:
+                started.wait(5)
+            return FakeContentModel().generate_content(prompt, stream=True)
+
+        self.addCleanup(release.set)
+        model = mock.Mock(model_name='fake', generate_content=generate)
+        items = list(stream_event_content(self.event, model))
+        self.assertEqual(items[-1][:2], ('error', 'socialMedia'))
+        self.assertIn('Timed out', items[-1][2])
+        # The video prompt streamed on the calling thread
+        self.assertIs(threads['videoScript'], threading.current_thread())
+
+
+@override_settings(CONTENT_MODEL_BACKEND='fake', FAKE_CONTENT_MODEL_DELAY=0.2, CONTENT_CACHE_ENABLED=True,
+                   POST_SCORING_BACKEND='off')
+class AsyncViewTests(TestCase):
+    event = {'title': 'Diwali', 'description': 'Festival of lights'}
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.soon = make_event(1, trending_score=60, title='Soon')
+        make_event(10, event_type='Holiday', title='Holiday')
+        make_event(20, title='Later')
+        reset_content_model()
+        self.addCleanup(reset_content_model)
+
+    async def read(self, response):
+        return json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+
+    async def test_trending_feed_matches_sync_view(self):
+        params = {'limit': 2, 'fields': 'id,title,date,trending_score'}
+        def sync_view():
+            response = APIClient().get(reverse('get_trending_events'), params)
+            return body(response), response['X-Next-Cursor']
+
+        # Both views rank at the same time, which their cursors carry
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            expected, expected_cursor = await sync_to_async(sync_view)()
+            response = await async_views.get_trending_events(self.factory.get('/', params))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await self.read(response), expected)
+        self.assertEqual(response['X-Next-Cursor'], expected_cursor)
+
+        response = await async_views.get_trending_events(self.factory.get('/', {'limit': 0}))
+        self.assertEqual(response.status_code, 400)
+        response = await async_views.get_trending_events(self.factory.get('/', headers={'Accept': 'text/html'}))
+        self.assertEqual(response.status_code, 406)
+        response = await async_views.get_trending_events(self.factory.get('/', {'format': 'api'}))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_get_event(self):
+        response = await async_views.get_event(self.factory.get('/'), self.soon.id)
+        self.assertEqual(json.loads(response.content)['title'], 'Soon')
+        response = await async_views.get_event(self.factory.get('/'), 0)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_generate_content_uses_the_cache(self):
+        def post(event):
+            return self.factory.post('/', {'event': event}, content_type='application/json')
+
+        response = await async_views.generate_content(post(self.event))
+        self.assertEqual(response['X-Content-Cache'], 'miss')
+        self.assertIn('1. Diwali', json.loads(response.content)['socialMedia'])
+        response = await async_views.generate_content(post(self.event))
+        self.assertEqual(response['X-Content-Cache'], 'hit')
+
+        response = await async_views.generate_content(post(None))
+        self.assertEqual(response.status_code, 400)
+
+        timeout = ContentGenerationTimeout('still being generated')
+        with mock.patch('events.async_views.aget_or_generate_content', side_effect=timeout):
+            response = await async_views.generate_content(post(self.event))
+        self.assertEqual(response.status_code, 504)
+        with mock.patch('events.views.get_or_generate_content', side_effect=timeout):
+            response = await sync_to_async(views.generate_content)(post(self.event))
+        self.assertEqual(response.status_code, 504)
+
+    async def test_concurrent_generations_share_one_thread(self):
+        requests = [
+            self.factory.post('/', {'event': {'title': f'Event {i}'}}, content_type='application/json')
+            for i in range(20)
+        ]
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(async_views.generate_content(r) for r in requests))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual({r.status_code for r in responses}, {200})
+        # Twenty generations of 0.2s each overlap instead of queueing
+        self.assertLess(elapsed, 2.0)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.upcoming = make_event(2, title='Upcoming')
+        self.recent = make_event(-3, title='Recent holiday', event_type='Holiday')
+        self.old = [make_event(-10 - i, title=f'Old {i}') for i in range(5)]
+        self.old_alert = make_event(-2, title='Old alert', event_type='Weather Change')
+        self.untyped = make_event(-20, title='Untyped', event_type=None)
+
+    def test_expired_events_respect_per_type_horizons(self):
+        with self.settings(EVENT_RETENTION_DAYS=7, EVENT_RETENTION_DAYS_BY_TYPE={'Weather Change': 1}):
+            titles = set(expired_events().values_list('title', flat=True))
+        self.assertEqual(titles, {f'Old {i}' for i in range(5)} | {'Old alert', 'Untyped'})
+
+        with self.settings(EVENT_RETENTION_DAYS=7, EVENT_RETENTION_DAYS_BY_TYPE={}):
+            self.assertNotIn('Old alert', expired_events().values_list('title', flat=True))
+
+    def test_archive_moves_rows_in_batches(self):
+        with self.settings(EVENT_RETENTION_DAYS=7, EVENT_RETENTION_DAYS_BY_TYPE={'Weather Change': 1}):
+            report = archive_expired_events(batch_size=3, max_batches=2)
+            self.assertEqual((report['moved'], report['batches'], report['remaining']), (6, 2, 1))
+            report = archive_expired_events(batch_size=3)
+
+        self.assertEqual((report['moved'], report['remaining']), (1, 0))
+        self.assertEqual(
+            sorted(GlobalEvent.objects.values_list('title', flat=True)), ['Recent holiday', 'Upcoming']
+        )
+        archived = ArchivedEvent.objects.get(event_id=self.old[0].id)
+        self.assertEqual((archived.title, archived.date), (self.old[0].title, self.old[0].date))
+        self.assertEqual(ArchivedEvent.objects.count(), 7)
+
+    def test_command_reports_throughput(self):
+        out = StringIO()
+        call_command('archive_events', '--days', '7', '--batch-size', '2', stdout=out)
+        self.assertRegex(out.getvalue(), r'Archived 7 events in 4 batches \(.*rows/s\)')
+        self.assertEqual(GlobalEvent.objects.count(), 2)
+
+
+@override_settings(CONTENT_MODEL_BACKEND='fake', FAKE_CONTENT_MODEL_DELAY=0, POST_SCORING_BACKEND='local')
+class PostScoringTests(TestCase):
+    def setUp(self):
+        reset_content_model()
+        self.addCleanup(reset_content_model)
+
+    def test_parse_numbered_posts(self):
+        text = 'Here are your posts:\n\n1. First post #one\n\n**Post 2:** Second\nstill second\n3) Third'
+        self.assertEqual(parse_social_posts(text), [
+            {'number': 1, 'text': 'First post #one'},
+            {'number': 2, 'text': 'Second\nstill second'},
+            {'number': 3, 'text': 'Third'},
+        ])
+        self.assertEqual(parse_social_posts('Just one post'), [{'number': 1, 'text': 'Just one post'}])
+
+    def test_posts_are_ranked_by_category_then_confidence(self):
+        predictor = mock.Mock()
+        predictor.predict_many.return_value = [
+            {'category': 'low', 'confidence': 90.0},
+            {'category': 'high', 'confidence': 55.0},
+            {'category': 'medium', 'confidence': 70.0},
+            {'category': 'high', 'confidence': 80.0},
+        ]
+        with mock.patch('events.scoring.get_post_predictor', return_value=predictor):
+            ranked = rank_social_posts('1. a\n2. b\n3. c\n4. d')
+
+        predictor.predict_many.assert_called_once_with(['a', 'b', 'c', 'd'])
+        self.assertEqual([(p['rank'], p['number']) for p in ranked], [(1, 4), (2, 2), (3, 3), (4, 1)])
+
+    def test_remote_scoring_uses_a_session_per_thread(self):
+        def post(session, url, json, timeout):
+            sessions.append(session)
+            return mock.Mock(json=lambda: {'predictions': [
+                {'id': item['id'], 'prediction': 'high', 'confidence': 60.0} for item in json['posts']
+            ]})
+
+        sessions = []
+        with self.settings(POST_SCORING_BACKEND='remote'), \
+                mock.patch('requests.Session.post', autospec=True, side_effect=post):
+            other = threading.Thread(target=rank_social_posts, args=('1. a',))
+            other.start()
+            other.join()
+            ranked = rank_social_posts('1. a\n2. b')
+            rank_social_posts('1. c')
+
+        self.assertEqual([p['prediction'] for p in ranked], ['high', 'high'])
+        self.assertIs(sessions[-1], sessions[-2])
+        self.assertIsNot(sessions[0], sessions[1])
+        # Every thread's session draws from the one connection pool
+        self.assertEqual({id(s.get_adapter('http://ml')) for s in sessions}, {id(scoring._adapter)})
+        self.assertEqual(scoring._adapter._pool_maxsize, settings.ML_SERVICE_POOL_SIZE)
+
+    def test_scoring_failure_keeps_original_order(self):
+        with mock.patch('events.scoring.get_post_predictor', side_effect=RuntimeError('model missing')):
+            ranked = rank_social_posts('1. a\n2. b')
+        self.assertEqual([(p['number'], p['prediction']) for p in ranked], [(1, None), (2, None)])
+
+    def test_unknown_backend_is_reported_not_raised(self):
+        with self.settings(POST_SCORING_BACKEND='gpu'):
+            ranked = rank_social_posts('1. a\n2. b')
+            errors = check_scoring_backend(None)
+        self.assertEqual([(p['number'], p['prediction']) for p in ranked], [(1, None), (2, None)])
+        self.assertEqual([error.id for error in errors], ['events.E001'])
+        self.assertEqual(check_scoring_backend(None), [])
+
+    def test_generate_content_returns_ranked_posts(self):
+        response = APIClient().post(
+            reverse('generate-content'), {'event': {'title': 'Diwali'}}, format='json'
+        )
+        ranked = response.json()['rankedPosts']
+        self.assertEqual(len(ranked), 5)
+        self.assertTrue(all(p['prediction'] in ('low', 'medium', 'high') for p in ranked))
+        self.assertEqual(sorted(p['number'] for p in ranked), [1, 2, 3, 4, 5])
+
+        with self.settings(POST_SCORING_BACKEND='off'):
+            response = APIClient().post(
+                reverse('generate-content'), {'event': {'title': 'Diwali'}}, format='json'
+            )
+        self.assertNotIn('rankedPosts', response.json())
+
+
+class TelemetryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        telemetry.registry.clear()
+        self.addCleanup(telemetry.set_enabled, telemetry.enabled())
+        telemetry.set_enabled(True)
+        make_event(2, title='Soon')
+
+    def sample(self, text, operation, stage, suffix='count'):
+        prefix = f'app_stage_duration_seconds_{suffix}{{service="events",operation="{operation}",stage="{stage}"}} '
+        for line in text.splitlines():
+            if line.startswith(prefix):
+                return float(line[len(prefix):])
+        return None
+
+    def test_feed_stages_are_exposed_in_prometheus_format(self):
+        self.client.get(reverse('get_trending_events')).getvalue()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        text = response.content.decode()
+        self.assertIn('# TYPE app_stage_duration_seconds histogram', text)
+        for stage in ('query', 'score', 'serialize'):
+            self.assertEqual(self.sample(text, 'trending_events', stage), 1)
+        self.assertEqual(self.sample(text, 'get_trending_events', 'request'), 1)
+        self.assertIn(
+            'app_stage_duration_seconds_bucket{service="events",operation="trending_events",'
+            'stage="query",le="+Inf"} 1', text
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = telemetry.Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+        cumulative, total, count = histogram.snapshot()
+        self.assertEqual(cumulative, [1, 3, 4])
+        self.assertEqual(count, 4)
+        self.assertAlmostEqual(total, 6.05)
+
+    def test_disabled_telemetry_records_nothing(self):
+        telemetry.set_enabled(False)
+        self.client.get(reverse('get_trending_events')).getvalue()
+        with telemetry.stage('events', 'manual', 'block') as timer:
+            pass
+        self.assertIsNone(timer.elapsed)
+        self.assertEqual(telemetry.registry.items(), [])
+
+    def test_fetch_events_times_fetch_and_upsert(self):
+        fetched = [{
+            'title': 'Launch', 'date': timezone.now() + timedelta(days=3), 'description': 'New product',
+            'location': 'India', 'event_type': 'Product', 'trending_score': 70,
+        }]
+        with mock.patch('events.management.commands.fetch_events.fetch_trending_events', return_value=fetched):
+            out = StringIO()
+            call_command('fetch_events', stdout=out)
+
+        self.assertIn('Successfully processed 1 events (1 added, 0 already existed)', out.getvalue())
+        self.assertNotIn('Added new event', out.getvalue())
+        self.assertIn('Timings: fetch', out.getvalue())
+        text = telemetry.render_prometheus()
+        self.assertEqual(self.sample(text, 'fetch_events', 'fetch'), 1)
+        self.assertEqual(self.sample(text, 'fetch_events', 'upsert'), 1)
+
+    def test_async_handler_writes_json_lines_with_extra_fields(self):
+        stream = StringIO()
+        handler = telemetry.AsyncStreamHandler(stream)
+        logger = logging.getLogger('events.tests.structured')
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            logger.warning('Batch done in %d ms', 12, extra={'posts': 3})
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+        record = json.loads(stream.getvalue())
+        self.assertEqual(record['msg'], 'Batch done in 12 ms')
+        self.assertEqual(record['level'], 'WARNING')
+        self.assertEqual(record['posts'], 3)
+
+    def test_sampler_rates(self):
+        self.assertFalse(any(telemetry.Sampler(0)() for _ in range(100)))
+        self.assertTrue(all(telemetry.Sampler(1)() for _ in range(100)))
+
+
+class DatabaseProfileTests(TestCase):
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite profile only')
+    def test_sqlite_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.DATABASES['default']['OPTIONS']['timeout'] * 1000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        self.assertGreater(settings.DATABASES['default']['CONN_MAX_AGE'], 0)
@@ -0,0 +1,203 @@
+"""
+Ranking, filtering and cursor pagination for the trending events feed.
+
+Priority scores depend on the current time, so they cannot be pushed into an
+ORDER BY. Instead the feed ranks a narrow ``values_list()`` projection of the
+candidate rows and only loads the requested columns for the page it returns.
+
+The time a feed was first ranked at travels in its cursor, and later pages are
+ranked at that same time. Otherwise a proximity boost that changes at a day
+boundary, or an event leaving the window, between two requests would make the
+cursor skip or repeat events.
+"""
+import base64
+import bisect
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from telemetry import stage
+
+from .models import GlobalEvent
+from .serializers import GlobalEventSerializer
+
+MAX_PAGE_SIZE = 100
+ROW_FETCH_CHUNK = 500
+FEED_WINDOW = timedelta(days=30)
+EVENT_FIELDS = GlobalEventSerializer.Meta.fields
+SCORE_FIELDS = ('id', 'date', 'trending_score', 'event_type')
+
+
+class FeedQueryError(ValueError):
+    """Raised for malformed feed query parameters."""
+
+
+def upcoming_events(now, event_types=None, location=None):
+    """Queryset of events inside the feed window, with server-side filters."""
+    queryset = GlobalEvent.objects.filter(date__gte=now, date__lte=now + FEED_WINDOW)
+    if event_types:
+        queryset = queryset.filter(event_type__in=event_types)
+    if location:
+        queryset = queryset.filter(location__iexact=location)
+    return queryset
+
+
+def ranking_time(cursor):
+    """The ``now`` to rank at: the first page's, carried by its cursor, or the current time."""
+    return cursor[2] if cursor is not None else timezone.now()
+
+
+def rank_events(queryset, now, min_score=None):
+    """Return ``(score, id)`` pairs ordered by priority score, highest first.
+
+    Only the columns needed for scoring are read from the database. Events
+    with a zero score (or below ``min_score``) are dropped.
+    """
+    with stage('events', 'trending_events', 'query'):
+        rows = list(queryset.values_list(*SCORE_FIELDS))
+
+    with stage('events', 'trending_events', 'score'):
+        return score_rows(rows, now, min_score)
+
+
+async def arank_events(queryset, now, min_score=None):
+    """Async ``rank_events``; the rows are read with the async ORM."""
+    with stage('events', 'trending_events', 'query'):
+        rows = [row async for row in queryset.values_list(*SCORE_FIELDS)]
+
+    with stage('events', 'trending_events', 'score'):
+        return score_rows(rows, now, min_score)
+
+
+def score_rows(rows, now, min_score=None):
+    """Score and sort ``SCORE_FIELDS`` rows into ``(score, id)`` pairs."""
+    ranked = []
+    for pk, date, trending_score, event_type in rows:
+        score = GlobalEvent.compute_priority_score(trending_score, event_type, date, now)
+        if score <= 0 or (min_score is not None and score < min_score):
+            continue
+        ranked.append((score, pk))
+
+    # Ties keep primary key order, matching the old stable sort over the queryset
+    ranked.sort(key=_sort_key)
+    return ranked
+
+
+def _sort_key(item):
+    score, pk = item
+    return -score, pk
+
+
+def paginate(ranked, cursor=None, limit=None, now=None):
+    """Slice ranked ``(score, id)`` pairs after ``cursor``.
+
+    ``now`` is the time ``ranked`` was scored at; it is carried in the next
+    cursor. Returns the page and the cursor for the next page (``None`` on the
+    last one).
+    """
+    start = 0
+    if cursor is not None:
+        after_score, after_pk, _ = cursor
+        start = bisect.bisect_right(ranked, (-after_score, after_pk), key=_sort_key)
+
+    if limit is None:
+        return ranked[start:], None
+
+    page = ranked[start:start + limit]
+    next_cursor = None
+    if start + limit < len(ranked):
+        next_cursor = encode_cursor(page[-1], now)
+    return page, next_cursor
+
+
+def iter_event_rows(event_ids, fields, chunk_size=ROW_FETCH_CHUNK):
+    """Yield ``values_list(*fields)`` tuples for ``event_ids`` in the given order.
+
+    Rows are fetched in chunks so large pages stream without holding every
+    row (or exceeding SQLite's bound-parameter limit) at once.
+    """
+    for start in range(0, len(event_ids), chunk_size):
+        chunk = event_ids[start:start + chunk_size]
+        rows = GlobalEvent.objects.filter(pk__in=chunk).values_list('pk', *fields)
+        rows_by_id = {row[0]: row[1:] for row in rows}
+        for pk in chunk:
+            if pk in rows_by_id:
+                yield rows_by_id[pk]
+
+
+async def aiter_event_rows(event_ids, fields, chunk_size=ROW_FETCH_CHUNK):
+    """Async ``iter_event_rows``."""
+    for start in range(0, len(event_ids), chunk_size):
+        chunk = event_ids[start:start + chunk_size]
+        rows = GlobalEvent.objects.filter(pk__in=chunk).values_list('pk', *fields)
+        rows_by_id = {row[0]: row[1:] async for row in rows}
+        for pk in chunk:
+            if pk in rows_by_id:
+                yield rows_by_id[pk]
+
+
+def encode_cursor(item, now):
+    score, pk = item
+    payload = json.dumps([score, pk, now.isoformat()], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        score, pk, ranked_at = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        ranked_at = datetime.fromisoformat(ranked_at)
+        if timezone.is_naive(ranked_at):
+            raise ValueError('cursor time has no timezone')
+        return float(score), int(pk), ranked_at
+    except (binascii.Error, ValueError, TypeError):
+        raise FeedQueryError('Invalid cursor')
+
+
+def parse_feed_params(params):
+    """Validate the query string of the trending feed.
+
+    Supported parameters: ``limit``, ``cursor``, ``fields`` (comma separated),
+    ``event_type`` (comma separated), ``location`` and ``min_score``.
+    """
+    options = {
+        'limit': None,
+        'cursor': None,
+        'fields': list(EVENT_FIELDS),
+        'event_types': None,
+        'location': params.get('location') or None,
+        'min_score': None,
+    }
+
+    if params.get('limit'):
+        try:
+            limit = int(params['limit'])
+        except ValueError:
+            raise FeedQueryError('limit must be an integer')
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise FeedQueryError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+        options['limit'] = limit
+
+    if params.get('cursor'):
+        options['cursor'] = decode_cursor(params['cursor'])
+
+    if params.get('fields'):
+        fields = [name.strip() for name in params['fields'].split(',') if name.strip()]
+        unknown = [name for name in fields if name not in EVENT_FIELDS]
+        if unknown:
+            raise FeedQueryError(f"Unknown fields: {', '.join(unknown)}")
+        # Keep the canonical column order regardless of how they were requested
+        options['fields'] = [name for name in EVENT_FIELDS if name in fields]
+
+    if params.get('event_type'):
+        options['event_types'] = [name.strip() for name in params['event_type'].split(',') if name.strip()]
+
+    if params.get('min_score'):
+        try:
+            options['min_score'] = float(params['min_score'])
+        except ValueError:
+            raise FeedQueryError('min_score must be a number')
+
+    return options
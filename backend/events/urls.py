@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.urls import path
-from .views import get_trending_events
-from . import views
+from . import async_views, views
+
+# Under ASGI the read and generation endpoints are served by async views
+endpoints = async_views if settings.EVENTS_ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('api/trending-events/', get_trending_events, name='get_trending_events'),
-    path('api/trending-events/<int:event_id>/', views.get_event, name='get_event'),
-    path('api/generate-content/', views.generate_content, name='generate-content'),
+    path('api/trending-events/', endpoints.get_trending_events, name='get_trending_events'),
+    path('api/trending-events/<int:event_id>/', endpoints.get_event, name='get_event'),
+    path('api/generate-content/', endpoints.generate_content, name='generate-content'),
+    path('api/generate-content/stream/', views.generate_content_stream, name='generate-content-stream'),
+    path('api/content-jobs/', views.submit_content_job, name='submit_content_job'),
+    path('api/content-jobs/<int:job_id>/', views.get_content_job, name='get_content_job'),
+    path('metrics', views.metrics, name='metrics'),
 ]
@@ -1,7 +1,10 @@
+import logging
 import requests
 from datetime import datetime, timedelta
 from django.utils import timezone
 
+logger = logging.getLogger(__name__)
+
 # Example function to fetch global holidays using Calendarific API
 def fetch_global_holidays():
     holidays = []
@@ -46,7 +49,7 @@ def fetch_global_holidays():
                     "trending_score": 85  # Example score for holidays
                 })
     except Exception as e:
-        print(f"Error fetching holidays: {e}")
+        logger.warning('Error fetching holidays: %s', e)
 
     return holidays
 
@@ -71,7 +74,7 @@ def fetch_location_events(location):
                 "trending_score": 90
             })
     except Exception as e:
-        print(f"Error fetching weather events: {e}")
+        logger.warning('Error fetching weather events: %s', e)
 
     # Example for local events like festivals using Eventbrite API (optional)
     # You can fetch events based on the location using the Eventbrite API.
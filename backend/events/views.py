@@ -1,32 +1,60 @@
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from datetime import datetime
-from events.models import GlobalEvent
-from .serializers import GlobalEventSerializer
+from events.models import ContentJob, GlobalEvent
+from .serializers import GlobalEventSerializer, encode_json, event_rows_to_dicts, stream_json_array
 import pytz  # To handle timezone
 from rest_framework import status
-import google.generativeai as genai
 from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+import logging
 import os
-from django.utils import timezone
+from contextlib import closing
+from django.urls import reverse
+from .content import content_model_configured, get_content_model
+from .content_cache import ContentGenerationTimeout, get_or_generate_content, stream_or_generate_content
+from .jobs import enqueue_content_job
+from .scoring import with_ranked_posts
+from .renderers import EventStreamRenderer, NDJSONRenderer, ndjson_line, sse_message
+from .trending import (
+    FeedQueryError, iter_event_rows, paginate, parse_feed_params, rank_events, ranking_time, upcoming_events
+)
+from telemetry import PROMETHEUS_CONTENT_TYPE, render_prometheus, stage, timed_iter
 
+logger = logging.getLogger(__name__)
+
+# The read-only event endpoints stream pre-encoded JSON, so JSON is the only
+# renderer offered: other ?format= values get a 404, other Accept types a 406
 @api_view(['GET'])
+@renderer_classes([JSONRenderer])
 def get_trending_events(request):
-    # Fetch only upcoming events
-    upcoming_events = GlobalEvent.objects.filter(
-        date__gte=timezone.now(),
-        date__lte=timezone.now() + timezone.timedelta(days=30)
-    )
+    try:
+        options = parse_feed_params(request.query_params)
+    except FeedQueryError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Fetch only upcoming events, filtered server-side
+    now = ranking_time(options['cursor'])
+    candidates = upcoming_events(now, options['event_types'], options['location'])
 
-    # Sort events by priority score (which now includes proximity)
-    sorted_events = sorted(upcoming_events, key=lambda x: x.get_event_priority_score(), reverse=True)
-    
-    # Filter out events with 0 priority (past events)
-    active_events = [event for event in sorted_events if event.get_event_priority_score() > 0]
+    # Rank by priority score (which includes proximity); past events score 0 and are dropped
+    ranked = rank_events(candidates, now, options['min_score'])
+    page, next_cursor = paginate(ranked, options['cursor'], options['limit'], now)
 
-    # Serialize the events
-    serializer = GlobalEventSerializer(active_events, many=True)
-    return Response(serializer.data)
+    # Load only the requested columns for the events on this page and
+    # stream them straight from the value tuples; the serialize stage also
+    # covers the chunked page-row fetches interleaved with encoding
+    page_ids = [pk for _, pk in page]
+    rows = iter_event_rows(page_ids, options['fields'])
+    body = stream_json_array(event_rows_to_dicts(rows, options['fields']))
+    response = StreamingHttpResponse(
+        timed_iter(body, 'events', 'trending_events', 'serialize'),
+        content_type='application/json'
+    )
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
 
 @api_view(['POST'])
 def generate_content(request):
@@ -35,81 +63,132 @@ def generate_content(request):
         if not event:
             return Response({'error': 'Event data is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Configure Gemini API
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
+        if not content_model_configured():
             return Response(
                 {'error': 'GEMINI_API_KEY not configured'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash-latest')
-
         try:
-            # Generate social media posts
-            social_prompt = f"""Create 5 engaging social media posts for the following event:
-            Title: {event.get('title', 'No title provided')}
-            Description: {event.get('description', 'No description provided')}
-            
-            For each post:
-            1. Include relevant hashtags
-            2. Use appropriate emojis
-            3. Keep it engaging and concise
-            4. Add a call-to-action
-            5. Format each post clearly with a number (1-5)
-            
-            Make the posts diverse - some emotional, some informative, some urgent."""
-            
-            social_response = model.generate_content(social_prompt)
-            if not social_response or not hasattr(social_response, 'text'):
-                raise Exception('Failed to generate social media content')
-
-            # Generate video script
-            video_prompt = f"""Create a compelling 60-second video script for the following event:
-            Title: {event.get('title', 'No title provided')}
-            Description: {event.get('description', 'No description provided')}
-            
-            Include:
-            1. Opening hook (5-10 seconds)
-            2. Main message and key points (40-45 seconds)
-            3. Strong call-to-action (5-10 seconds)
-            4. Visual descriptions and transitions
-            5. Background music/mood suggestions
-            
-            Format it with clear sections and timing indicators."""
-            
-            video_response = model.generate_content(video_prompt)
-            if not video_response or not hasattr(video_response, 'text'):
-                raise Exception('Failed to generate video script content')
-
-            return Response({
-                'socialMedia': social_response.text,
-                'videoScript': video_response.text
-            })
-            
+            # Identical events are served from the content cache; otherwise the social
+            # posts and video script are generated concurrently on the shared client
+            result, cached = get_or_generate_content(event)
+            response = Response(with_ranked_posts(result))
+            response['X-Content-Cache'] = 'hit' if cached else 'miss'
+            return response
+
+        except ContentGenerationTimeout as e:
+            return Response({'error': str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
         except Exception as api_error:
-            print(f"Gemini API Error: {str(api_error)}")  # Log the specific API error
+            logger.exception('Content generation failed')
             return Response(
                 {'error': f'Content generation failed: {str(api_error)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
     except Exception as e:
-        print(f"General Error: {str(e)}")  # Log the general error
+        logger.exception('Content generation request failed')
         return Response(
             {'error': f'Server error: {str(e)}'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['POST'])
+@renderer_classes([NDJSONRenderer, EventStreamRenderer, JSONRenderer])
+def generate_content_stream(request):
+    """Stream both generations as NDJSON lines (default) or server-sent events."""
+    event = request.data.get('event')
+    if not event or not isinstance(event, dict):
+        return Response({'error': 'Event data is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not content_model_configured():
+        return Response(
+            {'error': 'GEMINI_API_KEY not configured'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    encode = sse_message if request.accepted_renderer.format == 'sse' else ndjson_line
+    messages = content_stream_messages(event, get_content_model())
+    response = StreamingHttpResponse(
+        (encode(message) for message in messages),
+        content_type=request.accepted_renderer.media_type
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+def content_stream_messages(event, model):
+    """Yield stream messages: ``delta`` chunks, one ``done``/``error`` per field, then ``complete``."""
+    result = {}
+    with closing(stream_or_generate_content(event, model)) as stream:
+        while True:
+            try:
+                kind, field, text = next(stream)
+            except StopIteration as finished:
+                cached = finished.value
+                break
+            if kind == 'delta':
+                yield {'type': 'delta', 'field': field, 'text': text}
+            elif kind == 'done':
+                result[field] = text
+                yield {'type': 'done', 'field': field}
+            else:
+                logger.warning('Streamed content generation failed', extra={'field': field, 'error': text})
+                yield {'type': 'error', 'field': field, 'error': f'Content generation failed: {text}'}
+
+    if 'socialMedia' in result:
+        result = with_ranked_posts(result)
+    yield {'type': 'complete', 'cached': cached, **result}
+
+@api_view(['POST'])
+def submit_content_job(request):
+    event = request.data.get('event')
+    if not event or not isinstance(event, dict):
+        return Response({'error': 'Event data is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not content_model_configured():
+        return Response(
+            {'error': 'GEMINI_API_KEY not configured'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    job = enqueue_content_job(event)
+    response = Response(content_job_payload(job), status=status.HTTP_202_ACCEPTED)
+    response['Location'] = reverse('get_content_job', args=[job.id])
+    return response
+
 @api_view(['GET'])
-def get_event(request, event_id):
+def get_content_job(request, job_id):
     try:
-        event = GlobalEvent.objects.get(id=event_id)
-        serializer = GlobalEventSerializer(event)
-        return Response(serializer.data)
-    except GlobalEvent.DoesNotExist:
+        job = ContentJob.objects.get(id=job_id)
+    except ContentJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(content_job_payload(job))
+
+def content_job_payload(job):
+    payload = {'jobId': job.id, 'status': job.status}
+    if job.status == ContentJob.STATUS_SUCCEEDED:
+        payload.update(job.result)
+    elif job.status == ContentJob.STATUS_FAILED:
+        payload['error'] = f'Content generation failed: {job.error}'
+    return payload
+
+@api_view(['GET'])
+@renderer_classes([JSONRenderer])
+def get_event(request, event_id):
+    fields = GlobalEventSerializer.Meta.fields
+    with stage('events', 'get_event', 'query'):
+        row = GlobalEvent.objects.filter(id=event_id).values_list(*fields).first()
+    if row is None:
         return Response(
             {'error': 'Event not found'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    with stage('events', 'get_event', 'serialize'):
+        event = next(event_rows_to_dicts([row], fields))
+        payload = encode_json(event)
+    return HttpResponse(payload, content_type='application/json')
+
+def metrics(request):
+    # Prometheus scrape endpoint; plain Django view so DRF content negotiation stays out of it
+    return HttpResponse(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -110,6 +110,15 @@ def save_checkpoint(username, pagination_token, tweets_data):
     save_data_immediately(username, checkpoint, is_checkpoint=True)
     logger.debug(f"Saved checkpoint with {len(tweets_data)} tweets")
 
+def save_account_info(username, followers_count):
+    """Record the follower count fix_engagement.py normalizes this account's engagement by"""
+    os.makedirs('backend/ml/training_data', exist_ok=True)
+    filename = f'backend/ml/training_data/account_{username}.json'
+    with open(filename, 'w') as f:
+        json.dump({'username': username, 'followers_count': followers_count,
+                   'timestamp': datetime.now().isoformat()}, f, indent=2)
+    logger.debug(f"Saved account info to {filename}")
+
 def get_user_info(client, username):
     """Get user information using Twitter API v2"""
     try:
@@ -223,6 +232,7 @@ def collect_training_data(username, num_tweets=1000):
         followers_count = user.public_metrics['followers_count']
         
         logger.info(f"Collecting tweets for @{username} (Followers: {followers_count})")
+        save_account_info(username, followers_count)
         
         # Check for existing checkpoint
         checkpoint = load_checkpoint(username)
@@ -315,9 +325,16 @@ def collect_training_data(username, num_tweets=1000):
         raise
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Collect training tweets for one brand account')
+    parser.add_argument('username', nargs='?', default='gucci', help='Twitter account to collect (default: gucci)')
+    parser.add_argument('--num-tweets', type=int, default=1000)
+    args = parser.parse_args()
+
     try:
         # Collect data
-        df = collect_training_data('gucci')
+        df = collect_training_data(args.username.lstrip('@').lower(), args.num_tweets)
         print(f"Collected {len(df)} tweets for training")
         
         # Print some statistics
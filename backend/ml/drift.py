@@ -0,0 +1,233 @@
+"""
+Feature drift monitoring for live prediction traffic.
+
+Training writes a manifest next to each model (``manifest_<timestamp>.json``)
+with the training distribution of every feature in ``feature_columns`` as
+fixed bins (edges at the training deciles) and the training class mix.
+
+At serving time a ``DriftMonitor`` per model counts the features of every
+predicted post into the same bins, and the predicted classes into the class
+mix. An update is a bisect per feature, and memory is one small array per
+feature, whatever the traffic. Every ``interval`` seconds the live counts are
+compared with the manifest by population stability index (PSI). The result
+is logged, and the counts are then multiplied by ``decay``, so the live side
+tracks recent traffic rather than everything since startup. A PSI of 0.1 is
+commonly read as a moderate shift and 0.25 as a significant one.
+
+The time features describe when a request arrives (or is scheduled), so a
+live window shorter than a week always differs from the training spread.
+They are scored but, by default, never reported as drifted.
+
+Backfill a manifest for a model trained before manifests existed::
+
+    python -m ml.drift ml/models/model_20250722_212611.joblib ml/training_data/processed_features_gucci_fixed_v2.csv
+"""
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BINS = 10
+TIME_FEATURES = ('post_time_hour', 'post_time_day', 'is_weekend', 'is_business_hours')
+# Share used for empty bins so PSI stays finite
+MIN_SHARE = 1e-4
+
+
+def manifest_path(model_path):
+    """``manifest_<timestamp>.json`` beside ``model_<timestamp>.joblib``."""
+    directory, name = os.path.split(model_path)
+    timestamp = name[len('model_'):].replace('.joblib', '')
+    return os.path.join(directory, f'manifest_{timestamp}.json')
+
+
+def reference_profile(df, feature_columns, labels, bins=DEFAULT_BINS):
+    """Binned training distribution of each feature column and the class mix of ``labels``."""
+    features = {}
+    for column in feature_columns:
+        values = df[column].to_numpy(dtype=float)
+        edges = np.unique(np.quantile(values, np.arange(1, bins) / bins))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        features[column] = {'edges': edges.tolist(), 'counts': counts.tolist()}
+    classes = labels.value_counts()
+    return {
+        'rows': int(len(df)),
+        'features': features,
+        'classes': {str(name): int(count) for name, count in classes.items()},
+    }
+
+
+def write_manifest(model_path, profile, **info):
+    path = manifest_path(model_path)
+    with open(path, 'w') as f:
+        json.dump({'model': os.path.basename(model_path), **info, 'reference': profile}, f, indent=2)
+    return path
+
+
+def load_manifest(model_path):
+    """The model's manifest, or None if it has none."""
+    path = manifest_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def psi(expected, actual):
+    """Population stability index between two count vectors over the same bins."""
+    expected_total, actual_total = sum(expected), sum(actual)
+    if not expected_total or not actual_total:
+        return 0.0
+    score = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e / expected_total, MIN_SHARE)
+        a = max(a / actual_total, MIN_SHARE)
+        score += (a - e) * math.log(a / e)
+    return score
+
+
+class DriftMonitor:
+    """Live binned feature counts for one model, compared with its manifest."""
+
+    def __init__(self, name, manifest, interval=300.0, decay=0.5, threshold=0.25, min_samples=100,
+                 ignore=TIME_FEATURES):
+        self.name = name
+        self.model_file = manifest.get('model')
+        reference = manifest['reference']
+        self.features = [
+            (column, spec['edges'], spec['counts']) for column, spec in reference['features'].items()
+        ]
+        self.classes = sorted(reference['classes'])
+        self.reference_classes = [reference['classes'][name] for name in self.classes]
+        self.interval = interval
+        self.decay = decay
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.ignore = frozenset(ignore)
+
+        self._counts = [[0.0] * (len(edges) + 1) for _, edges, _ in self.features]
+        self._class_counts = [0.0] * len(self.classes)
+        self._class_index = {name: index for index, name in enumerate(self.classes)}
+        self._weight = 0.0  # decayed number of observations
+        self._observed = 0
+        self._lock = threading.Lock()
+        self._next_roll = time.monotonic() + interval
+        self.last_report = None
+
+    def observe(self, features, category):
+        """Count one prediction's features and class."""
+        bins = [bisect.bisect_right(edges, features[column]) for column, edges, _ in self.features]
+        with self._lock:
+            for counts, index in zip(self._counts, bins):
+                counts[index] += 1
+            class_index = self._class_index.get(category)
+            if class_index is not None:
+                self._class_counts[class_index] += 1
+            self._weight += 1
+            self._observed += 1
+            now = time.monotonic()
+            roll = now >= self._next_roll
+            if roll:
+                # Claim this roll so concurrent observers do not evaluate it too
+                self._next_roll = now + self.interval
+        if roll:
+            self.roll()
+
+    def evaluate(self):
+        """PSI of every feature and of the class mix against the manifest."""
+        with self._lock:
+            counts = [list(row) for row in self._counts]
+            class_counts = list(self._class_counts)
+            weight, observed = self._weight, self._observed
+
+        scores = {
+            column: round(psi(reference, live), 4)
+            for (column, _, reference), live in zip(self.features, counts)
+        }
+        class_total = sum(class_counts) or 1
+        reference_total = sum(self.reference_classes) or 1
+        class_psi = round(psi(self.reference_classes, class_counts), 4)
+        enough = weight >= self.min_samples
+        watched = {column: score for column, score in scores.items() if column not in self.ignore}
+        drifted = sorted(column for column, score in watched.items() if enough and score >= self.threshold)
+        if enough and class_psi >= self.threshold:
+            drifted.append('class_mix')
+        return {
+            'model': self.name,
+            'model_file': self.model_file,
+            'observed': observed,
+            'window_weight': round(weight, 1),
+            'enough_samples': enough,
+            'threshold': self.threshold,
+            'ignored': sorted(self.ignore),
+            'features': scores,
+            'class_mix': {
+                'psi': class_psi,
+                'live': {name: round(count / class_total, 4) for name, count in zip(self.classes, class_counts)},
+                'reference': {
+                    name: round(count / reference_total, 4) for name, count in zip(self.classes, self.reference_classes)
+                },
+            },
+            'max_feature_psi': max(watched.values(), default=0.0),
+            'drifted': drifted,
+        }
+
+    def roll(self):
+        """Evaluate, log and keep the report, then decay the live counts."""
+        report = self.evaluate()
+        report['evaluated_at'] = time.time()
+        with self._lock:
+            self._next_roll = time.monotonic() + self.interval
+            for counts in self._counts:
+                for index in range(len(counts)):
+                    counts[index] *= self.decay
+            self._class_counts = [count * self.decay for count in self._class_counts]
+            self._weight *= self.decay
+        self.last_report = report
+        if report['drifted']:
+            logger.warning('Feature drift detected', extra={
+                'model': self.name, 'drifted': report['drifted'], 'max_feature_psi': report['max_feature_psi']
+            })
+        else:
+            logger.info('Feature drift checked', extra={'model': self.name, 'max_feature_psi': report['max_feature_psi']})
+        return report
+
+
+def render_prometheus(monitors):
+    """Current PSI per model and feature in the Prometheus text format."""
+    lines = [
+        '# HELP ml_feature_drift_psi Population stability index of live features against the training manifest.',
+        '# TYPE ml_feature_drift_psi gauge',
+    ]
+    for monitor in monitors:
+        report = monitor.evaluate()
+        for column, score in report['features'].items():
+            lines.append(f'ml_feature_drift_psi{{model="{monitor.name}",feature="{column}"}} {score}')
+        lines.append(f'ml_feature_drift_psi{{model="{monitor.name}",feature="class_mix"}} {report["class_mix"]["psi"]}')
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    from ml.train import PostPerformancePredictor
+
+    parser = argparse.ArgumentParser(description='Write the drift manifest for a trained model')
+    parser.add_argument('model', help='model_<timestamp>.joblib')
+    parser.add_argument('data', help='Training CSV the model was fitted on')
+    args = parser.parse_args()
+
+    predictor = PostPerformancePredictor(emoji_mode='lean')
+    df = predictor.add_engineered_columns(pd.read_csv(args.data))
+    labels = df['engagement_rate'].apply(predictor.get_engagement_category)
+    path = write_manifest(
+        args.model, reference_profile(df, predictor.feature_columns, labels),
+        training_data=os.path.basename(args.data)
+    )
+    print(f'Wrote {path}')
@@ -1,26 +1,50 @@
 import pandas as pd
+import argparse
 import glob
+import json
 import os
 
+# Accounts collected before collect_training_data.py recorded follower counts
+KNOWN_FOLLOWERS = {'gucci': 7173222}
+
+parser = argparse.ArgumentParser(description="Recompute engagement rates from a brand's follower count")
+parser.add_argument('--brand', default='gucci', help='Account whose latest processed features are fixed')
+parser.add_argument('--followers', type=int,
+                    help='Follower count (default: training_data/account_<brand>.json from the collector)')
+args = parser.parse_args()
+brand = args.brand.lstrip('@').lower()
+
+followers = args.followers
+account_file = f'ml/training_data/account_{brand}.json'
+if followers is None and os.path.exists(account_file):
+    with open(account_file) as f:
+        followers = json.load(f)['followers_count']
+if followers is None:
+    followers = KNOWN_FOLLOWERS.get(brand)
+if not followers:
+    raise SystemExit(f"No follower count for {brand}; pass --followers or collect the account again")
+
 # Get the latest CSV file
-csv_files = glob.glob('ml/training_data/processed_features_gucci_*.csv')
+csv_files = glob.glob(f'ml/training_data/processed_features_{brand}_*.csv')
+if not csv_files:
+    raise SystemExit(f"No processed features for {brand}; run collect_training_data.py {brand} first")
 latest_file = sorted(csv_files)[-1]
 
-print(f"Fixing engagement rates in {latest_file}")
+print(f"Fixing engagement rates in {latest_file} ({followers} followers)")
 
 # Read the CSV
 df = pd.read_csv(latest_file)
 
 # Calculate total engagement and new engagement rate
 df['total_engagement'] = df['favorite_count'] + df['retweet_count'] + df['reply_count']
-df['engagement_rate'] = (df['total_engagement'] / 7173222) * 100  # Gucci's follower count
+df['engagement_rate'] = (df['total_engagement'] / followers) * 100
 
 # Save to new file
 timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
-new_file = f'ml/training_data/processed_features_gucci_{timestamp}_fixed.csv'
+new_file = f'ml/training_data/processed_features_{brand}_{timestamp}_fixed.csv'
 df.to_csv(new_file, index=False)
 
 print(f"\nOld engagement rates (first 5):")
 print(df['engagement_rate'].head().to_string())
 
-print(f"\nSaved fixed data to: {new_file}") 
\ No newline at end of file
+print(f"\nSaved fixed data to: {new_file}") 
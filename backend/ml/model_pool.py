@@ -0,0 +1,269 @@
+"""
+Per-brand engagement models behind a bounded, lazily loaded LRU pool.
+
+Brand models are trained by the same ``PostPerformancePredictor`` pipeline
+and live in ``<model_dir>/<brand>/`` (``python train.py --brand <brand>``);
+the newest ``model_*.joblib`` there, with its scaler, is the brand's model.
+A brand's model is loaded on its first request and kept while it stays
+among the ``capacity`` most recently used brands (and within ``max_bytes``,
+if set); the least recently used model is evicted to make room.
+
+Requests for a brand without a trained model, or with no brand at all, are
+served by the global model, which is never evicted. A brand whose model is
+missing (or fails to load) is remembered for ``miss_ttl`` seconds, so
+repeated requests for it skip the disk until then or until ``discard()``.
+Loads take a per-brand lock: a burst for one cold brand loads it once,
+while different brands load in parallel. ``stats()`` and
+``render_prometheus()`` report hits, misses, loads, evictions, fallbacks and
+the resident models' memory, measured once when each model is loaded.
+"""
+import glob
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    from telemetry import stage
+except ImportError:  # run as a script from ml/, outside the services
+    from contextlib import nullcontext
+
+    def stage(service, operation, name):
+        return nullcontext()
+
+try:
+    from ml.train import PostPerformancePredictor
+except ImportError:  # run as a script from ml/
+    from train import PostPerformancePredictor
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_MODEL = 'global'
+# Brand names become directory names, so keep them to a safe slug
+BRAND_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+COUNTERS = ('hits', 'misses', 'loads', 'evictions', 'fallbacks', 'load_errors')
+# Brands remembered as having no usable model; the oldest are forgotten first
+MAX_MISSING = 1024
+
+
+class InvalidBrand(ValueError):
+    pass
+
+
+def normalize_brand(brand):
+    """Return the lower-cased brand slug, or None for no brand.
+
+    ``GLOBAL_MODEL`` is reserved: responses and metrics use it to name the
+    global model, so no brand may share it.
+    """
+    if brand is None or brand == '':
+        return None
+    if not isinstance(brand, str):
+        raise InvalidBrand('brand must be a string')
+    slug = brand.strip().lstrip('@').lower()
+    if not BRAND_PATTERN.match(slug):
+        raise InvalidBrand(f'Invalid brand {brand!r}: use letters, digits, "_" or "-"')
+    if slug == GLOBAL_MODEL:
+        raise InvalidBrand(f'Invalid brand {brand!r}: {GLOBAL_MODEL!r} is reserved for the global model')
+    return slug
+
+
+def latest_model_file(directory):
+    """Newest ``model_*.joblib`` in ``directory``, or None."""
+    files = sorted(glob.glob(os.path.join(directory, 'model_*.joblib')))
+    return files[-1] if files else None
+
+
+def forest_nbytes(model):
+    """Bytes held by the node and value arrays of every tree in the forest."""
+    total = 0
+    for estimator in getattr(model, 'estimators_', []):
+        state = estimator.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    return total
+
+
+class BrandModelPool:
+    """Thread-safe LRU of per-brand predictors with the global model as fallback."""
+
+    def __init__(self, model_dir, global_predictor, capacity=8, max_bytes=0, emoji_mode='lean', on_load=None,
+                 miss_ttl=60.0):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.model_dir = model_dir
+        self.global_predictor = global_predictor
+        self._global_bytes = forest_nbytes(global_predictor.model)
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.emoji_mode = emoji_mode
+        # Called as on_load(brand, predictor) before a freshly loaded model serves requests
+        self.on_load = on_load
+        self.miss_ttl = miss_ttl
+        self._models = OrderedDict()  # brand -> (predictor, nbytes)
+        self._missing = OrderedDict()  # brand -> monotonic time its miss expires
+        self._resident_bytes = 0
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+        self._load_locks = {}  # brand -> [lock, threads using it]
+
+    def get(self, brand):
+        """Return ``(predictor, model_name)`` for ``brand``.
+
+        ``model_name`` is the brand, or ``GLOBAL_MODEL`` when the global model
+        serves the request. Raises ``InvalidBrand`` for a malformed name.
+        """
+        brand = normalize_brand(brand)
+        if brand is None:
+            return self.global_predictor, GLOBAL_MODEL
+
+        predictor = self._lookup(brand)
+        if predictor is None and not self._known_missing(brand):
+            with self._loading(brand):
+                # Another thread may have loaded it while we waited
+                predictor = self._lookup(brand, count=False)
+                if predictor is None and not self._known_missing(brand):
+                    predictor = self._load(brand)
+                    if predictor is None:
+                        self._remember_missing(brand)
+        if predictor is None:
+            self._count('fallbacks')
+            return self.global_predictor, GLOBAL_MODEL
+        return predictor, brand
+
+    def _lookup(self, brand, count=True):
+        with self._lock:
+            entry = self._models.get(brand)
+            if entry is not None:
+                self._models.move_to_end(brand)
+            if count:
+                self._counters['hits' if entry is not None else 'misses'] += 1
+        return entry[0] if entry is not None else None
+
+    def _known_missing(self, brand):
+        with self._lock:
+            expires = self._missing.get(brand)
+            if expires is None:
+                return False
+            if time.monotonic() < expires:
+                return True
+            del self._missing[brand]
+            return False
+
+    def _remember_missing(self, brand):
+        if self.miss_ttl <= 0:
+            return
+        with self._lock:
+            self._missing[brand] = time.monotonic() + self.miss_ttl
+            self._missing.move_to_end(brand)
+            while len(self._missing) > MAX_MISSING:
+                self._missing.popitem(last=False)
+
+    @contextmanager
+    def _loading(self, brand):
+        """Hold ``brand``'s load lock; the lock is dropped once no thread uses it."""
+        with self._lock:
+            entry = self._load_locks.get(brand)
+            if entry is None:
+                entry = self._load_locks[brand] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._load_locks[brand]
+
+    def _load(self, brand):
+        model_file = latest_model_file(os.path.join(self.model_dir, brand))
+        if model_file is None:
+            return None
+
+        predictor = PostPerformancePredictor(emoji_mode=self.emoji_mode)
+        try:
+            with stage('ml', 'brand_pool', 'load'):
+                predictor.load_model(model_file)
+        except Exception as e:
+            self._count('load_errors')
+            logger.warning('Brand model failed to load', extra={'brand': brand, 'model_file': model_file, 'error': str(e)})
+            return None
+
+        if self.on_load is not None:
+            self.on_load(brand, predictor)
+        nbytes = forest_nbytes(predictor.model)
+        with self._lock:
+            self._models[brand] = (predictor, nbytes)
+            self._resident_bytes += nbytes
+            self._counters['loads'] += 1
+            evicted = self._evict()
+        logger.info('Brand model loaded', extra={
+            'brand': brand, 'model_file': os.path.basename(model_file), 'bytes': nbytes, 'evicted': evicted
+        })
+        return predictor
+
+    def _evict(self):
+        # Called with self._lock held; the newest entry always stays
+        evicted = []
+        while len(self._models) > 1 and (
+            len(self._models) > self.capacity
+            or (self.max_bytes and self._resident_bytes > self.max_bytes)
+        ):
+            brand, (_, nbytes) = self._models.popitem(last=False)
+            self._resident_bytes -= nbytes
+            self._counters['evictions'] += 1
+            evicted.append(brand)
+        return evicted
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def discard(self, brand=None):
+        """Drop one brand's model or remembered miss (or all of them) so the next request checks disk again."""
+        with self._lock:
+            if brand is None:
+                self._models.clear()
+                self._missing.clear()
+                self._resident_bytes = 0
+            else:
+                brand = normalize_brand(brand)
+                self._missing.pop(brand, None)
+                entry = self._models.pop(brand, None)
+                if entry is not None:
+                    self._resident_bytes -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'capacity': self.capacity,
+                'max_bytes': self.max_bytes,
+                'resident_models': len(self._models),
+                'resident_bytes': self._resident_bytes,
+                'missing_brands': len(self._missing),
+                'global_bytes': self._global_bytes,
+                'brands': {brand: nbytes for brand, (_, nbytes) in self._models.items()},
+            }
+
+    def render_prometheus(self):
+        """Pool counters and memory gauges in the Prometheus text format."""
+        stats = self.stats()
+        lines = []
+        for name in COUNTERS:
+            metric = f'ml_brand_pool_{name}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric} {stats[name]}']
+        lines += [
+            '# TYPE ml_brand_pool_resident_models gauge',
+            f"ml_brand_pool_resident_models {stats['resident_models']}",
+            '# TYPE ml_brand_pool_capacity gauge',
+            f"ml_brand_pool_capacity {stats['capacity']}",
+            '# HELP ml_brand_pool_model_bytes Forest node and value array bytes of each resident model.',
+            '# TYPE ml_brand_pool_model_bytes gauge',
+            f"ml_brand_pool_model_bytes{{brand=\"{GLOBAL_MODEL}\"}} {stats['global_bytes']}",
+        ]
+        lines += [f'ml_brand_pool_model_bytes{{brand="{brand}"}} {nbytes}' for brand, nbytes in stats['brands'].items()]
+        return '\n'.join(lines) + '\n'
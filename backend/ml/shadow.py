@@ -0,0 +1,151 @@
+"""
+Shadow scoring of a candidate model on live prediction traffic.
+
+The serving predictor hands every forest pass to ``ShadowScorer.submit``
+through its ``scored_observer`` hook, with the feature rows it already
+extracted and scaled. A background thread scores the same matrix with the
+candidate, so the client never waits for it. If the candidate was trained
+with a different scaler (a full retrain rather than an incremental update),
+only the cheap scaling step is repeated. The same applies to a candidate
+fitted on a different column layout: its matrix is selected from the
+extracted rows. Feature extraction is never redone.
+
+Passes are queued up to ``max_pending``; when the candidate falls behind,
+passes are dropped and counted rather than queued without bound.
+``sample_rate`` mirrors only a fraction of passes. ``stats()`` reports the
+agreement rate, the primary → candidate confusion counts and both models'
+forest latency. The latencies are also recorded as ``ml/shadow`` stage
+histograms.
+"""
+import logging
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from telemetry import registry
+except ImportError:  # run as a script from ml/, outside the services
+    registry = None
+
+logger = logging.getLogger(__name__)
+
+
+def scalers_match(first, second):
+    """True when both fitted StandardScalers transform identically."""
+    return all(
+        np.array_equal(getattr(first, name, None), getattr(second, name, None))
+        for name in ('mean_', 'scale_')
+    )
+
+
+class ShadowScorer:
+    def __init__(self, primary, candidate, name, sample_rate=1.0, max_pending=64):
+        self.primary = primary
+        self.candidate = candidate
+        self.name = name
+        self.sample_rate = sample_rate
+        # Columns in the order the candidate was fitted on; older models differ from feature_columns
+        self.columns = list(getattr(candidate.scaler, 'feature_names_in_', candidate.feature_columns))
+        self.same_columns = self.columns == list(primary.feature_columns)
+        self.same_scaler = self.same_columns and scalers_match(primary.scaler, candidate.scaler)
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._counts = {'passes': 0, 'rows': 0, 'agreed': 0, 'dropped': 0, 'errors': 0}
+        self._seconds = {'primary': 0.0, 'candidate': 0.0}
+        self._confusion = {}  # (primary class, candidate class) -> rows
+        self._thread = threading.Thread(target=self._run, name=f'shadow-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, rows, X, X_scaled, categories, forest_seconds):
+        """Queue a scored pass of the primary model; never blocks."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((rows, X, X_scaled, categories, forest_seconds))
+        except queue.Full:
+            with self._lock:
+                self._counts['dropped'] += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._score(*item)
+            except Exception as e:
+                with self._lock:
+                    self._counts['errors'] += 1
+                logger.warning('Shadow scoring failed', extra={'candidate': self.name, 'error': str(e)})
+            finally:
+                self._queue.task_done()
+
+    def _score(self, rows, X, X_scaled, categories, primary_seconds):
+        if not self.same_columns:
+            X = pd.DataFrame(rows)[self.columns]
+            if X.columns.is_unique:
+                X_scaled = self.candidate.scaler.transform(X)
+            else:
+                # Some early models repeat columns, which transform() rejects by name; scale positionally
+                scaler = self.candidate.scaler
+                X_scaled = (X.to_numpy(dtype=float) - scaler.mean_) / scaler.scale_
+        elif not self.same_scaler:
+            X_scaled = self.candidate.scaler.transform(X)
+        start = time.perf_counter()
+        probabilities = self.candidate.model.predict_proba(X_scaled)
+        candidate_seconds = time.perf_counter() - start
+        candidate_categories = self.candidate.model.classes_[probabilities.argmax(axis=1)]
+
+        if registry is not None:
+            registry.observe('ml', 'shadow', 'primary_forest', primary_seconds)
+            registry.observe('ml', 'shadow', 'candidate_forest', candidate_seconds)
+        with self._lock:
+            self._counts['passes'] += 1
+            self._counts['rows'] += len(categories)
+            self._seconds['primary'] += primary_seconds
+            self._seconds['candidate'] += candidate_seconds
+            for primary, candidate in zip(categories, candidate_categories):
+                key = (str(primary), str(candidate))
+                self._confusion[key] = self._confusion.get(key, 0) + 1
+                if primary == candidate:
+                    self._counts['agreed'] += 1
+
+    def join(self):
+        """Wait until every queued pass has been scored."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            counts, seconds = dict(self._counts), dict(self._seconds)
+            confusion = dict(self._confusion)
+        passes, rows = counts['passes'], counts['rows']
+        confusion_table = {}
+        for (primary, candidate), count in sorted(confusion.items()):
+            confusion_table.setdefault(primary, {})[candidate] = count
+        return {
+            'candidate': self.name,
+            'same_columns': self.same_columns,
+            'same_scaler': self.same_scaler,
+            'sample_rate': self.sample_rate,
+            'pending': self._queue.qsize(),
+            **counts,
+            'agreement_rate': round(counts['agreed'] / rows, 4) if rows else None,
+            'primary_forest_ms': round(seconds['primary'] / passes * 1000, 3) if passes else None,
+            'candidate_forest_ms': round(seconds['candidate'] / passes * 1000, 3) if passes else None,
+            'latency_ratio': round(seconds['candidate'] / seconds['primary'], 3) if seconds['primary'] else None,
+            'confusion': confusion_table,
+        }
+
+    def render_prometheus(self):
+        """Shadow counters in the Prometheus text format."""
+        stats = self.stats()
+        label = f'candidate="{self.name}"'
+        lines = []
+        for name in ('passes', 'rows', 'agreed', 'dropped', 'errors'):
+            metric = f'ml_shadow_{name}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric}{{{label}}} {stats[name]}']
+        lines += ['# TYPE ml_shadow_pending gauge', f"ml_shadow_pending{{{label}}} {stats['pending']}"]
+        return '\n'.join(lines) + '\n'
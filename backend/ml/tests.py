@@ -0,0 +1,482 @@
+"""
+Tests for the engagement model serving code, run from ``backend/``::
+
+    python -m unittest ml.tests
+
+They load the committed production model once and use small synthetic
+models where a specific class layout or column set is needed.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import warnings
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from ml.drift import DriftMonitor, psi, reference_profile
+from ml.model_pool import GLOBAL_MODEL, BrandModelPool, InvalidBrand, latest_model_file
+from ml.shadow import ShadowScorer
+from ml.train import WEEKDAYS, PostPerformancePredictor
+
+# The ML service's routes import as ``routes.*`` from backend/src, as in ml_server.py
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+from routes import batch_formats  # noqa: E402
+from routes.batch_formats import msgpack  # noqa: E402
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MODEL_PATH = os.path.join(MODEL_DIR, 'model_20250722_212611.joblib')
+TRAINING_DIR = os.path.join(os.path.dirname(MODEL_DIR), 'training_data')
+SCHEDULED = datetime(2025, 7, 22, 18, 30)
+POSTS = [
+    'New collection just dropped 🔥 #Gucci #Fashion shop now at https://gucci.com',
+    'Flat 20% off this weekend only, $199 #sale',
+    'Tag a friend who would wear this 👜 @gucci',
+    'Our craftsmanship, one stitch at a time.',
+    '',
+]
+
+predictor = None
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence load_model's progress output and scikit-learn's pickle version warning."""
+    with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+        warnings.simplefilter('ignore')
+        yield
+
+
+def load_predictor(path=MODEL_PATH, emoji_mode='lean'):
+    loaded = PostPerformancePredictor(emoji_mode=emoji_mode)
+    with quiet():
+        loaded.load_model(path)
+    return loaded
+
+
+def setUpModule():
+    global predictor
+    predictor = load_predictor()
+
+
+class PredictionTests(unittest.TestCase):
+    def test_batch_matches_single_predictions(self):
+        batch = predictor.predict_many(POSTS, has_image=True, scheduled_time=SCHEDULED)
+        singles = [predictor.predict(post, True, SCHEDULED) for post in POSTS]
+        self.assertEqual(
+            [(r['category'], round(r['confidence'], 9)) for r in batch],
+            [(r['category'], round(r['confidence'], 9)) for r in singles],
+        )
+        self.assertEqual(batch[0]['feature_importance'], dict(singles[0]['feature_importance']))
+        self.assertEqual(predictor.predict_many([]), [])
+
+    def test_rows_with_mixed_flags_match_single_predictions(self):
+        rows = [
+            predictor.features_for(POSTS[0], False, SCHEDULED),
+            predictor.features_for(POSTS[0], True, datetime(2025, 7, 26, 9)),
+        ]
+        batch = predictor.predict_rows(rows)
+        self.assertEqual(batch[0]['category'], predictor.predict(POSTS[0], False, SCHEDULED)['category'])
+        self.assertAlmostEqual(
+            batch[1]['confidence'], predictor.predict(POSTS[0], True, datetime(2025, 7, 26, 9))['confidence']
+        )
+
+
+class ScheduleTests(unittest.TestCase):
+    def test_every_weekly_slot_is_scored_once(self):
+        slots = predictor.predict_schedule(POSTS[0], has_image=True, top_k=7 * 24)
+        self.assertEqual(len(slots), 168)
+        self.assertEqual(len({(slot['weekday'], slot['hour']) for slot in slots}), 168)
+        self.assertEqual({slot['day'] for slot in slots}, set(WEEKDAYS))
+
+        # Ranked by P(high), and each slot agrees with a single prediction at that time
+        highs = [slot['high_probability'] for slot in slots]
+        self.assertEqual(highs, sorted(highs, reverse=True))
+        best = slots[0]
+        scheduled = datetime(2025, 7, 21 + best['weekday'], best['hour'])  # 2025-07-21 is a Monday
+        single = predictor.predict(POSTS[0], True, scheduled)
+        self.assertEqual(single['category'], best['prediction'])
+        self.assertAlmostEqual(single['confidence'], best['confidence'])
+
+        self.assertEqual(len(predictor.predict_schedule(POSTS[0], top_k=5)), 5)
+
+    def test_model_without_a_high_class_ranks_by_medium(self):
+        model = mock.Mock(classes_=np.array(['low', 'medium']))
+        medium = np.linspace(0.1, 0.9, 168)
+        model.predict_proba.return_value = np.column_stack([1 - medium, medium])
+        with mock.patch.object(predictor, 'model', model):
+            slots = predictor.predict_schedule(POSTS[0], top_k=3)
+        self.assertEqual([slot['high_probability'] for slot in slots], [0.0, 0.0, 0.0])
+        # The last slot of the week (Sunday 23:00) has the highest P(medium)
+        self.assertEqual((slots[0]['day'], slots[0]['hour'], slots[0]['prediction']), ('Sunday', 23, 'medium'))
+
+
+class IncrementalTrainingTests(unittest.TestCase):
+    data = os.path.join(TRAINING_DIR, 'processed_features_gucci_fixed_v2.csv')
+    previous = os.path.join(TRAINING_DIR, 'processed_features_gucci_20250722_043912.csv')
+
+    def train(self, model_dir=None, previous=previous, **kwargs):
+        incremental = PostPerformancePredictor(emoji_mode='lean', model_dir=model_dir)
+        with quiet():
+            report = incremental.train_incremental(MODEL_PATH, self.data, previous, **kwargs)
+        return incremental, report
+
+    def test_new_trees_are_added_and_old_ones_retired(self):
+        with tempfile.TemporaryDirectory() as model_dir:
+            incremental, report = self.train(model_dir, new_trees=10, retire_trees=5, compare_full=False)
+            saved = sorted(os.listdir(model_dir))
+
+            base_trees = len(predictor.model.estimators_)
+            self.assertEqual(report['trees'], {'base': base_trees, 'added': 10, 'retired': 5, 'total': base_trees + 5})
+            self.assertEqual(len(incremental.model.estimators_), base_trees + 5)
+            self.assertEqual(incremental.model.n_estimators, base_trees + 5)
+            # Retiring drops the oldest trees; the kept base trees are unchanged
+            np.testing.assert_array_equal(
+                incremental.model.estimators_[0].tree_.threshold, predictor.model.estimators_[5].tree_.threshold
+            )
+            # The base scaler is kept so the remaining base trees stay valid
+            np.testing.assert_array_equal(incremental.scaler.mean_, predictor.scaler.mean_)
+            self.assertGreater(report['new_rows'], 0)
+            self.assertNotIn('full_retrain', report)
+
+            # The saved model, scaler and manifest load back like any other model
+            self.assertEqual(
+                {name.split('_')[0] for name in saved}, {'model', 'scaler', 'manifest', 'incremental'}
+            )
+            reloaded = load_predictor(os.path.join(model_dir, report['model_file']))
+            self.assertIsNotNone(reloaded.manifest)
+            self.assertEqual(
+                reloaded.predict(POSTS[0], True, SCHEDULED)['category'],
+                incremental.predict(POSTS[0], True, SCHEDULED)['category'],
+            )
+
+    def test_full_retrain_comparison(self):
+        _, report = self.train(new_trees=5, save=False)
+        self.assertIn('macro_f1', report['full_retrain'])
+        self.assertIsInstance(report['full_refit_recommended'], bool)
+
+    def test_invalid_updates_are_refused(self):
+        with self.assertRaisesRegex(ValueError, 'Cannot retire'):
+            self.train(new_trees=1, retire_trees=10_000, save=False)
+        # Every row of the update was already in the base model's data
+        with self.assertRaisesRegex(ValueError, 'nothing to learn from'):
+            self.train(previous=self.data, save=False)
+
+
+class BrandModelPoolTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.model_dir = tmp.name
+        self.loaded = []
+        for brand in ('gucci', 'prada', 'dior'):
+            self.add_brand_model(brand)
+
+    def add_brand_model(self, brand):
+        directory = os.path.join(self.model_dir, brand)
+        os.makedirs(directory)
+        for name in ('model_20250722_212611.joblib', 'scaler_20250722_212611.joblib'):
+            os.symlink(os.path.join(MODEL_DIR, name), os.path.join(directory, name))
+
+    def pool(self, **kwargs):
+        self.enterContext(quiet())
+        return BrandModelPool(self.model_dir, predictor, on_load=lambda brand, _: self.loaded.append(brand), **kwargs)
+
+    def test_least_recently_used_brand_is_evicted(self):
+        pool = self.pool(capacity=2)
+        gucci, name = pool.get('gucci')
+        self.assertEqual(name, 'gucci')
+        self.assertIsNot(gucci, predictor)
+        pool.get('prada')
+        self.assertIs(pool.get('@Gucci ')[0], gucci)  # a hit, and now the most recent
+        pool.get('dior')
+
+        stats = pool.stats()
+        self.assertEqual(sorted(stats['brands']), ['dior', 'gucci'])
+        self.assertEqual((stats['loads'], stats['evictions'], stats['hits']), (3, 1, 1))
+        self.assertEqual(self.loaded, ['gucci', 'prada', 'dior'])
+        self.assertEqual(stats['resident_bytes'], sum(stats['brands'].values()))
+
+        # An evicted brand is loaded again on its next request
+        self.assertEqual(pool.get('prada')[1], 'prada')
+        self.assertEqual(pool.stats()['loads'], 4)
+
+    def test_byte_budget_keeps_only_the_newest_model(self):
+        pool = self.pool(capacity=8, max_bytes=1)
+        pool.get('gucci')
+        pool.get('prada')
+        self.assertEqual(list(pool.stats()['brands']), ['prada'])
+
+    def test_model_sizes_are_measured_once_at_load(self):
+        pool = self.pool()
+        pool.get('gucci')
+        with mock.patch('ml.model_pool.forest_nbytes') as measure:
+            stats = pool.stats()
+            pool.render_prometheus()
+        measure.assert_not_called()
+        self.assertGreater(stats['global_bytes'], 0)
+        self.assertGreater(stats['brands']['gucci'], 0)
+
+    def test_unknown_and_missing_brands_fall_back_to_the_global_model(self):
+        pool = self.pool()
+        self.assertEqual(pool.get(None), (predictor, GLOBAL_MODEL))
+        self.assertEqual(pool.get(''), (predictor, GLOBAL_MODEL))
+        with self.assertRaises(InvalidBrand):
+            pool.get('../gucci')
+        with self.assertRaises(InvalidBrand):
+            pool.get('@Global')
+
+        with mock.patch('ml.model_pool.latest_model_file', wraps=latest_model_file) as lookup:
+            for _ in range(3):
+                self.assertEqual(pool.get('chanel'), (predictor, GLOBAL_MODEL))
+            # The miss is remembered, so only the first request looked on disk
+            self.assertEqual(lookup.call_count, 1)
+            self.assertEqual(pool.stats()['fallbacks'], 3)
+
+            # A model trained later is picked up once the miss is discarded
+            self.add_brand_model('chanel')
+            self.assertEqual(pool.get('chanel')[1], GLOBAL_MODEL)
+            pool.discard('chanel')
+            self.assertEqual(pool.get('chanel')[1], 'chanel')
+
+    def test_remembered_miss_expires(self):
+        pool = self.pool(miss_ttl=0.05)
+        pool.get('chanel')
+        self.add_brand_model('chanel')
+        time.sleep(0.06)
+        self.assertEqual(pool.get('chanel')[1], 'chanel')
+
+    def test_concurrent_requests_for_a_cold_brand_load_it_once(self):
+        pool = self.pool()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda brand: pool.get(brand)[0], ['gucci'] * 6 + ['prada'] * 6))
+        self.assertEqual(len({id(result) for result in results}), 2)
+        self.assertEqual(pool.stats()['loads'], 2)
+        self.assertEqual(pool._load_locks, {})
+
+
+class DriftTests(unittest.TestCase):
+    def manifest(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({'content_length': rng.normal(120, 30, 2000), 'hashtag_count': rng.integers(0, 6, 2000)})
+        labels = pd.Series(rng.choice(['low', 'medium', 'high'], 2000))
+        return df, {'model': 'model_test.joblib', 'reference': reference_profile(df, list(df.columns), labels)}
+
+    def test_psi_is_zero_for_identical_distributions(self):
+        self.assertEqual(psi([10, 20, 30], [10, 20, 30]), 0.0)
+        self.assertAlmostEqual(psi([10, 20, 30], [20, 40, 60]), 0.0)
+        self.assertGreater(psi([10, 20, 30], [30, 20, 10]), 0.25)
+        self.assertEqual(psi([0, 0], [1, 2]), 0.0)
+
+    def test_shifted_traffic_is_reported_as_drifted(self):
+        df, manifest = self.manifest()
+        same = DriftMonitor('test', manifest, min_samples=100, ignore=())
+        shifted = DriftMonitor('test', manifest, min_samples=100, ignore=())
+        for row in df.head(1000).to_dict('records'):
+            same.observe(row, 'low')
+            shifted.observe({**row, 'content_length': row['content_length'] + 60}, 'low')
+
+        report = same.evaluate()
+        self.assertLess(report['features']['content_length'], 0.1)
+        self.assertNotIn('content_length', report['drifted'])
+        report = shifted.evaluate()
+        self.assertGreater(report['features']['content_length'], 0.25)
+        self.assertIn('content_length', report['drifted'])
+        self.assertNotIn('hashtag_count', report['drifted'])
+        # Every prediction was 'low', which is far from the training mix
+        self.assertIn('class_mix', report['drifted'])
+
+    def test_too_few_samples_or_ignored_features_are_not_reported(self):
+        df, manifest = self.manifest()
+        monitor = DriftMonitor('test', manifest, min_samples=100, ignore=('content_length',))
+        for row in df.head(50).to_dict('records'):
+            monitor.observe({**row, 'hashtag_count': 50}, 'low')
+        self.assertEqual(monitor.evaluate()['drifted'], [])
+
+    def test_only_one_observer_rolls_when_the_interval_elapses(self):
+        df, manifest = self.manifest()
+        monitor = DriftMonitor('test', manifest, interval=3600)
+        rows = df.head(64).to_dict('records')
+        monitor._next_roll = 0  # due now
+        evaluate = monitor.evaluate
+
+        def slow_evaluate():
+            # Keep the first roll in progress while the other observers arrive
+            time.sleep(0.05)
+            return evaluate()
+
+        with mock.patch.object(monitor, 'evaluate', side_effect=slow_evaluate), \
+                mock.patch.object(monitor, 'roll', wraps=monitor.roll) as roll:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda row: monitor.observe(row, 'low'), rows))
+        self.assertEqual(roll.call_count, 1)
+        self.assertLess(monitor.evaluate()['window_weight'], 64)
+
+
+class ShadowScoringTests(unittest.TestCase):
+    def shadow(self, candidate, **kwargs):
+        shadow = ShadowScorer(predictor, candidate, 'candidate', **kwargs)
+        predictor.scored_observer = shadow.submit
+        self.addCleanup(setattr, predictor, 'scored_observer', None)
+        return shadow
+
+    def test_identical_candidate_agrees_on_every_row(self):
+        shadow = self.shadow(load_predictor())
+        primary = predictor.predict_many(POSTS, True, SCHEDULED)
+        predictor.predict(POSTS[0], True, SCHEDULED)
+        shadow.join()
+
+        stats = shadow.stats()
+        self.assertTrue(stats['same_scaler'])
+        self.assertEqual((stats['passes'], stats['rows'], stats['agreed']), (2, 6, 6))
+        self.assertEqual(stats['agreement_rate'], 1.0)
+        self.assertEqual((stats['dropped'], stats['errors'], stats['pending']), (0, 0, 0))
+        expected = {}
+        for category in [result['category'] for result in primary] + [primary[0]['category']]:
+            expected.setdefault(category, {}).setdefault(category, 0)
+            expected[category][category] += 1
+        self.assertEqual(stats['confusion'], expected)
+        self.assertIn('ml_shadow_rows_total{candidate="candidate"} 6', shadow.render_prometheus())
+
+    def test_candidate_with_other_columns_and_scaler_is_scored_from_the_rows(self):
+        candidate = load_predictor(os.path.join(MODEL_DIR, 'model_20250722_205208.joblib'))
+        shadow = self.shadow(candidate)
+        self.assertFalse(shadow.same_columns)
+        predictor.predict_many(POSTS, True, SCHEDULED)
+        shadow.join()
+
+        stats = shadow.stats()
+        self.assertEqual((stats['rows'], stats['errors']), (len(POSTS), 0))
+        self.assertEqual(sum(sum(row.values()) for row in stats['confusion'].values()), len(POSTS))
+        self.assertEqual(stats['agreed'], sum(stats['confusion'].get(name, {}).get(name, 0) for name in stats['confusion']))
+
+    def test_passes_are_dropped_when_the_candidate_falls_behind(self):
+        release = threading.Event()
+        candidate = load_predictor()
+        predict_proba = candidate.model.predict_proba
+        candidate.model = mock.Mock(classes_=predictor.model.classes_)
+        candidate.model.predict_proba.side_effect = lambda X: release.wait(5) and predict_proba(X)
+        shadow = self.shadow(candidate, max_pending=2)
+
+        for _ in range(6):
+            predictor.predict(POSTS[0], True, SCHEDULED)
+        release.set()
+        shadow.join()
+        stats = shadow.stats()
+        # At most one pass in the worker and two queued; the rest are dropped
+        self.assertEqual(stats['passes'] + stats['dropped'], 6)
+        self.assertGreaterEqual(stats['dropped'], 3)
+
+    def test_sample_rate_zero_mirrors_nothing(self):
+        shadow = self.shadow(load_predictor(), sample_rate=0.0)
+        predictor.predict_many(POSTS, True, SCHEDULED)
+        shadow.join()
+        self.assertEqual(shadow.stats()['passes'], 0)
+        self.assertIsNone(shadow.stats()['agreement_rate'])
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class StreamFormatTests(unittest.TestCase):
+    posts = [{'id': index, 'content': post, 'has_image': index % 2 == 0} for index, post in enumerate(POSTS)]
+
+    def test_posts_split_across_reads_round_trip(self):
+        ndjson = b''.join(json.dumps(post).encode() + b'\n' for post in self.posts) + b'\n'
+        packed = b''.join(msgpack.packb(post) for post in self.posts)
+        with mock.patch.object(batch_formats, 'READ_SIZE', 7):
+            self.assertEqual(list(batch_formats.read_posts(io.BytesIO(ndjson), batch_formats.NDJSON)), self.posts)
+            self.assertEqual(list(batch_formats.read_posts(io.BytesIO(packed), batch_formats.MSGPACK)), self.posts)
+            # The last line needs no trailing newline
+            self.assertEqual(list(batch_formats.read_posts(io.BytesIO(b'{"id": 1}'), batch_formats.NDJSON)), [{'id': 1}])
+
+        for wire_format, decode in ((batch_formats.NDJSON, lambda body: [json.loads(line) for line in body.splitlines()]),
+                                    (batch_formats.MSGPACK, lambda body: list(msgpack.Unpacker(io.BytesIO(body))))):
+            self.assertEqual(decode(batch_formats.encode_records(self.posts, wire_format)), self.posts)
+
+    def test_invalid_line_names_its_number(self):
+        posts = batch_formats.read_posts(io.BytesIO(b'{"id": 1}\n\n{oops\n'), batch_formats.NDJSON)
+        self.assertEqual(next(posts), {'id': 1})
+        with self.assertRaisesRegex(ValueError, 'line 3'):
+            next(posts)
+
+    def test_media_types(self):
+        self.assertEqual(batch_formats.stream_format('application/x-ndjson'), batch_formats.NDJSON)
+        self.assertEqual(batch_formats.stream_format('application/vnd.msgpack'), batch_formats.MSGPACK)
+        self.assertIsNone(batch_formats.stream_format('application/json'))
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class StreamedBatchRouteTests(unittest.TestCase):
+    posts = StreamFormatTests.posts
+
+    @classmethod
+    def setUpClass(cls):
+        from flask import Flask
+        with quiet():
+            from routes import ml_routes  # loads the production model, as the server does
+        app = Flask(__name__)
+        app.register_blueprint(ml_routes.ml_routes, url_prefix='/ml')
+        cls.client, cls.routes = app.test_client(), ml_routes
+
+    def post(self, body, content_type, chunk=2, **headers):
+        response = self.client.post(
+            f'/ml/predict_batch?chunk={chunk}', data=body, content_type=content_type, headers=headers, buffered=False
+        )
+        self.assertEqual(response.status_code, 200)
+        bodies = [data for data in response.response if data]
+        response.close()
+        return response, bodies
+
+    def test_ndjson_is_scored_one_chunk_at_a_time(self):
+        body = b''.join(json.dumps(post).encode() + b'\n' for post in self.posts)
+        with mock.patch.object(self.routes.predictor, 'predict_rows', wraps=self.routes.predictor.predict_rows) as passes:
+            response, bodies = self.post(body, 'application/x-ndjson')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(response.headers['X-Model'], 'global')
+        # Five posts in chunks of two: three writes and three forest passes
+        self.assertEqual(len(bodies), 3)
+        self.assertEqual(passes.call_count, 3)
+
+        streamed = [json.loads(line) for data in bodies for line in data.splitlines()]
+        expected = self.client.post('/ml/predict_batch', json={'posts': self.posts}).json['predictions']
+        self.assertEqual(streamed, expected)
+        self.assertEqual([record['id'] for record in streamed], [0, 1, 2, 3, 4])
+
+    def test_msgpack_request_can_answer_in_ndjson(self):
+        body = b''.join(msgpack.packb(post) for post in self.posts)
+        response, bodies = self.post(body, 'application/msgpack', chunk=10)
+        self.assertEqual(response.mimetype, 'application/msgpack')
+        records = list(msgpack.Unpacker(io.BytesIO(b''.join(bodies))))
+        self.assertEqual([record['id'] for record in records], [0, 1, 2, 3, 4])
+
+        response, bodies = self.post(body, 'application/msgpack', chunk=10, Accept='application/x-ndjson')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in b''.join(bodies).splitlines()], records)
+
+    def test_bad_input_ends_the_stream_after_the_posts_before_it(self):
+        lines = [json.dumps(post).encode() for post in self.posts[:3]] + [b'{not json']
+        with self.assertLogs('routes.ml_routes', 'WARNING'):
+            _, bodies = self.post(b'\n'.join(lines), 'application/x-ndjson')
+        records = [json.loads(line) for data in bodies for line in data.splitlines()]
+        self.assertEqual([record.get('id') for record in records[:3]], [0, 1, 2])
+        self.assertEqual(records[3]['index'], 3)
+        self.assertIn('line 4', records[3]['error'])
+
+    def test_chunk_size_is_validated(self):
+        for chunk in ('0', 'x', str(10 ** 6)):
+            response = self.client.post(f'/ml/predict_batch?chunk={chunk}', data=b'', content_type='application/x-ndjson')
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
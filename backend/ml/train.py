@@ -3,15 +3,51 @@ import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
+import argparse
 import joblib
+import json
 import os
-import emoji
 import re
+import time
 from datetime import datetime
 
+try:
+    from telemetry import stage
+except ImportError:  # run as a script from ml/, outside the services
+    from contextlib import nullcontext
+
+    def stage(service, operation, name):
+        return nullcontext()
+
+try:
+    from ml.drift import load_manifest, reference_profile, write_manifest
+    from ml.emoji_lookup import count_emojis as count_emojis_lean
+except ImportError:  # run as a script from ml/
+    from drift import load_manifest, reference_profile, write_manifest
+    from emoji_lookup import count_emojis as count_emojis_lean
+
+# 'full' counts emojis against emoji.EMOJI_DATA; 'lean' uses the compact
+# code point table in emoji_lookup and never imports the emoji package.
+# Both give the same counts.
+EMOJI_MODES = ('full', 'lean')
+
+# Collected columns that identify a row across the collector's cumulative CSVs
+INCREMENTAL_KEY_COLUMNS = [
+    'content_length', 'hashtag_count', 'emoji_count', 'has_image', 'post_time_hour', 'post_time_day',
+    'mentions_count', 'urls_count', 'is_product_post', 'is_promotional', 'is_engagement_post', 'has_price',
+    'favorite_count', 'retweet_count', 'reply_count'
+]
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
 class PostPerformancePredictor:
-    def __init__(self):
+    def __init__(self, emoji_mode='full', model_dir=None):
+        if emoji_mode not in EMOJI_MODES:
+            raise ValueError(f"emoji_mode must be one of {EMOJI_MODES}, got {emoji_mode!r}")
+        self.emoji_mode = emoji_mode
+        self.count_emojis = count_emojis_lean if emoji_mode == 'lean' else self._count_emojis_full
+
         # Use RandomForest for classification
         self.model = RandomForestClassifier(
             n_estimators=200,
@@ -28,9 +64,24 @@ class PostPerformancePredictor:
             'has_hashtags', 'has_mentions', 'is_weekend', 'is_business_hours',
             'hashtag_with_image', 'length_per_hashtag'
         ]
-        self.model_path = os.path.join(os.path.dirname(__file__), 'models')
+        # Training distributions saved with the model, for drift monitoring
+        self.manifest = None
+        # Called as observer(features, category) after every predict/predict_many row
+        self.prediction_observer = None
+        # Called as observer(rows, X, X_scaled, categories, forest_seconds) after every forest pass
+        # of predict/predict_rows, with the feature matrix before and after scaling
+        self.scored_observer = None
+        # (model, features ranked by importance); feature_importances_ walks every tree
+        self._importance_cache = None
+        # Where train() writes; brand models go to models/<brand>/
+        self.model_path = model_dir or os.path.join(os.path.dirname(__file__), 'models')
         os.makedirs(self.model_path, exist_ok=True)
 
+    @staticmethod
+    def _count_emojis_full(content):
+        import emoji
+        return len([c for c in content if c in emoji.EMOJI_DATA])
+
     def load_model(self, model_path):
         """Load trained model and scaler"""
         try:
@@ -44,6 +95,7 @@ class PostPerformancePredictor:
             # Load model
             print(f"Loading model from: {model_path}")
             self.model = joblib.load(model_path)
+            self.manifest = load_manifest(model_path)
             
             # Load corresponding scaler with full timestamp
             scaler_path = os.path.join(base_dir, f'scaler_{timestamp}.joblib')
@@ -66,7 +118,7 @@ class PostPerformancePredictor:
         features = {
             'content_length': len(content),
             'hashtag_count': len(re.findall(r'#\w+', content)),
-            'emoji_count': len([c for c in content if c in emoji.EMOJI_DATA]),
+            'emoji_count': self.count_emojis(content),
             'mentions_count': len(re.findall(r'@\w+', content)),
             'urls_count': len(re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', content))
         }
@@ -125,6 +177,36 @@ class PostPerformancePredictor:
         }
         return weights
 
+    @staticmethod
+    def build_forest(n_estimators=300):
+        """The forest configuration used for full training runs"""
+        return RandomForestClassifier(
+            n_estimators=n_estimators, # Increased from 200
+            max_depth=6,               # Increased from 5
+            min_samples_split=4,       # Reduced from 5
+            class_weight='balanced',
+            random_state=42
+        )
+
+    @staticmethod
+    def add_engineered_columns(df):
+        """Vectorized add_engineered_features for a training DataFrame, in place"""
+        df['total_engagement'] = df['favorite_count'] + df['retweet_count'] + df['reply_count']
+        df['has_hashtags'] = (df['hashtag_count'] > 0).astype(int)
+        df['has_mentions'] = (df['mentions_count'] > 0).astype(int)
+        df['is_weekend'] = (df['post_time_day'] >= 5).astype(int)
+        df['is_business_hours'] = ((df['post_time_hour'] >= 9) & (df['post_time_hour'] <= 17)).astype(int)
+        df['hashtag_with_image'] = df['hashtag_count'] * df['has_image']
+        df['length_per_hashtag'] = df['content_length'] / (df['hashtag_count'] + 1)
+        return df
+
+    def apply_feature_weights(self, X_scaled):
+        """Multiply scaled training columns by their feature weights, in place"""
+        feature_weights = self.get_feature_weights()
+        for i, feature in enumerate(self.feature_columns):
+            X_scaled[:, i] *= feature_weights.get(feature, 1.0)
+        return X_scaled
+
     def train(self, training_data_path):
         """Train the model on collected data"""
         # Load the training data
@@ -145,13 +227,7 @@ class PostPerformancePredictor:
                       f"Hashtags: {example['hashtag_count']}, Likes: {example['favorite_count']}")
         
         # Add engineered features
-        df['total_engagement'] = df['favorite_count'] + df['retweet_count'] + df['reply_count']
-        df['has_hashtags'] = (df['hashtag_count'] > 0).astype(int)
-        df['has_mentions'] = (df['mentions_count'] > 0).astype(int)
-        df['is_weekend'] = (df['post_time_day'] >= 5).astype(int)
-        df['is_business_hours'] = ((df['post_time_hour'] >= 9) & (df['post_time_hour'] <= 17)).astype(int)
-        df['hashtag_with_image'] = df['hashtag_count'] * df['has_image']
-        df['length_per_hashtag'] = df['content_length'] / (df['hashtag_count'] + 1)
+        self.add_engineered_columns(df)
         
         # Get feature weights
         feature_weights = self.get_feature_weights()
@@ -171,19 +247,11 @@ class PostPerformancePredictor:
         X_test_scaled = self.scaler.transform(X_test)
         
         # Apply feature weights
-        for i, feature in enumerate(self.feature_columns):
-            weight = feature_weights.get(feature, 1.0)
-            X_train_scaled[:, i] *= weight
-            X_test_scaled[:, i] *= weight
+        self.apply_feature_weights(X_train_scaled)
+        self.apply_feature_weights(X_test_scaled)
         
         # Train the model with adjusted parameters
-        self.model = RandomForestClassifier(
-            n_estimators=300,          # Increased from 200
-            max_depth=6,               # Increased from 5
-            min_samples_split=4,       # Reduced from 5
-            class_weight='balanced',
-            random_state=42
-        )
+        self.model = self.build_forest()
         self.model.fit(X_train_scaled, y_train)
         
         # Print performance metrics
@@ -212,6 +280,11 @@ class PostPerformancePredictor:
         
         joblib.dump(self.model, os.path.join(self.model_path, model_filename))
         joblib.dump(self.scaler, os.path.join(self.model_path, scaler_filename))
+        write_manifest(
+            os.path.join(self.model_path, model_filename),
+            reference_profile(df, self.feature_columns, df['engagement_category']),
+            training_data=os.path.basename(training_data_path)
+        )
         
         # Save feature importance analysis (with weights applied)
         weighted_importance = self.model.feature_importances_ * [feature_weights.get(f, 1.0) for f in self.feature_columns]
@@ -236,69 +309,336 @@ class PostPerformancePredictor:
         
         return feature_importance.to_dict('records')
     
-    def predict(self, content, has_image=False, scheduled_time=None):
-        """Predict engagement category for new content"""
-        # Extract features
-        features = self.extract_features_from_content(content, scheduled_time)
+    def train_incremental(self, base_model_path, training_data_path, previous_data_path=None,
+                          new_trees=50, retire_trees=0, replay=0.25, compare_full=True, refit_margin=0.05,
+                          save=True):
+        """Add trees fitted on newly collected rows to an existing forest.
+
+        New rows are the rows of ``training_data_path`` that are not in
+        ``previous_data_path`` (the collector's CSVs are cumulative); without a
+        previous file every row counts as new. The base model's scaler is kept
+        so its trees stay valid. ``new_trees`` are fitted on the new rows plus
+        a ``replay`` fraction of older rows, which keeps every engagement class
+        represented; ``retire_trees`` of the oldest trees are then dropped.
+
+        20% of the new rows are held out. The base model, the updated model
+        and (with ``compare_full``) a full retrain on everything else are
+        scored on them, and a full refit is recommended when it beats the
+        incremental model's macro F1 by more than ``refit_margin``.
+        """
+        self.load_model(base_model_path)
+        base_model = self.model
+        base_trees = len(base_model.estimators_)
+        if retire_trees >= base_trees + new_trees:
+            raise ValueError(f"Cannot retire {retire_trees} of {base_trees + new_trees} trees")
+
+        df = self.add_engineered_columns(pd.read_csv(training_data_path))
+        df['engagement_category'] = df['engagement_rate'].apply(self.get_engagement_category)
+        new_mask = pd.Series(True, index=df.index)
+        if previous_data_path:
+            # Match on the collected columns; engagement_rate is rewritten by fix_engagement.py
+            key_columns = [column for column in INCREMENTAL_KEY_COLUMNS if column in df.columns]
+            previous = pd.read_csv(previous_data_path)[key_columns].drop_duplicates()
+            seen = df[key_columns].merge(previous, how='left', indicator=True)['_merge'] == 'both'
+            new_mask = ~seen.to_numpy()
+        new_rows, old_rows = df[new_mask], df[~new_mask]
+        print(f"{len(new_rows)} new rows, {len(old_rows)} already seen")
+        if len(new_rows) < 5:
+            raise ValueError(f"Only {len(new_rows)} new rows in {training_data_path}; nothing to learn from")
+
+        fit_new, holdout = train_test_split(new_rows, test_size=0.2, random_state=42)
+        fit_rows = fit_new
+        if replay and len(old_rows):
+            fit_rows = pd.concat([fit_new, old_rows.sample(frac=replay, random_state=42)])
+        missing = set(base_model.classes_) - set(fit_rows['engagement_category'])
+        if missing:
+            raise ValueError(f"New data lacks classes {sorted(missing)}; raise replay or run a full retrain")
+
+        X_fit = self.apply_feature_weights(self.scaler.transform(fit_rows[self.feature_columns]))
+        X_holdout = holdout[self.feature_columns]
+        y_holdout = holdout['engagement_category']
+
+        # Grow a copy so the loaded base model can still be scored
+        model = joblib.load(base_model_path)
+        model.set_params(warm_start=True, n_estimators=base_trees + new_trees)
+        start = time.perf_counter()
+        model.fit(X_fit, fit_rows['engagement_category'])
+        incremental_seconds = time.perf_counter() - start
+        if retire_trees:
+            model.estimators_ = model.estimators_[retire_trees:]
+        model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+
+        X_holdout_scaled = self.apply_feature_weights(self.scaler.transform(X_holdout))
+        report = {
+            'new_rows': len(new_rows),
+            'holdout_rows': len(holdout),
+            'fit_rows': len(fit_rows),
+            'trees': {'base': base_trees, 'added': new_trees, 'retired': retire_trees, 'total': len(model.estimators_)},
+            'base': self._holdout_scores(base_model, X_holdout_scaled, y_holdout),
+            'incremental': {**self._holdout_scores(model, X_holdout_scaled, y_holdout),
+                            'fit_seconds': round(incremental_seconds, 3)},
+        }
+
+        if compare_full:
+            full_rows = df.drop(index=holdout.index)
+            scaler = StandardScaler().fit(full_rows[self.feature_columns])
+            full_model = self.build_forest()
+            start = time.perf_counter()
+            full_model.fit(
+                self.apply_feature_weights(scaler.transform(full_rows[self.feature_columns])),
+                full_rows['engagement_category']
+            )
+            full_seconds = time.perf_counter() - start
+            report['full_retrain'] = {
+                **self._holdout_scores(full_model, self.apply_feature_weights(scaler.transform(X_holdout)), y_holdout),
+                'fit_seconds': round(full_seconds, 3),
+            }
+            gap = report['full_retrain']['macro_f1'] - report['incremental']['macro_f1']
+            report['full_refit_recommended'] = gap > refit_margin
+
+        print("\nHoldout scores on new rows:")
+        for name in ('base', 'incremental', 'full_retrain'):
+            if name in report:
+                scores = report[name]
+                timing = f", fit {scores['fit_seconds']:.2f}s" if 'fit_seconds' in scores else ''
+                print(f"{name}: accuracy {scores['accuracy']:.3f}, macro F1 {scores['macro_f1']:.3f}{timing}")
+        if report.get('full_refit_recommended'):
+            print(f"Full retrain beats the incremental model by more than {refit_margin} macro F1; run a full refit")
+
+        self.model = model
+        if save:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            joblib.dump(self.model, os.path.join(self.model_path, f'model_{timestamp}.joblib'))
+            joblib.dump(self.scaler, os.path.join(self.model_path, f'scaler_{timestamp}.joblib'))
+            write_manifest(
+                os.path.join(self.model_path, f'model_{timestamp}.joblib'),
+                reference_profile(df, self.feature_columns, df['engagement_category']),
+                training_data=os.path.basename(training_data_path)
+            )
+            with open(os.path.join(self.model_path, f'incremental_{timestamp}.json'), 'w') as f:
+                json.dump({'base_model': os.path.basename(base_model_path),
+                           'training_data': os.path.basename(training_data_path), **report}, f, indent=2)
+            report['model_file'] = f'model_{timestamp}.joblib'
+            print(f"Saved updated model as model_{timestamp}.joblib")
+        return report
+
+    @staticmethod
+    def _holdout_scores(model, X, y):
+        predicted = model.predict(X)
+        return {
+            'accuracy': round(float(accuracy_score(y, predicted)), 4),
+            'macro_f1': round(float(f1_score(y, predicted, average='macro', zero_division=0)), 4),
+        }
+
+    @staticmethod
+    def add_engineered_features(features, has_image):
+        """Add the image flag and the features derived from the raw counts, in place"""
         features['has_image'] = 1 if has_image else 0
-        
-        # Add engineered features
         features['has_hashtags'] = 1 if features['hashtag_count'] > 0 else 0
         features['has_mentions'] = 1 if features['mentions_count'] > 0 else 0
         features['is_weekend'] = 1 if features['post_time_day'] >= 5 else 0
         features['is_business_hours'] = 1 if 9 <= features['post_time_hour'] <= 17 else 0
         features['hashtag_with_image'] = features['hashtag_count'] * features['has_image']
         features['length_per_hashtag'] = features['content_length'] / (features['hashtag_count'] + 1)
-        
-        # Convert to DataFrame and select features
-        X = pd.DataFrame([features])[self.feature_columns]
-        
+        return features
+
+    def features_for(self, content, has_image=False, scheduled_time=None):
+        """The full feature row for one post"""
+        return self.add_engineered_features(self.extract_features_from_content(content, scheduled_time), has_image)
+
+    def predict(self, content, has_image=False, scheduled_time=None):
+        """Predict engagement category for new content"""
+        with stage('ml', 'predict', 'features'):
+            # Extract features
+            features = self.features_for(content, has_image, scheduled_time)
+
+            # Convert to DataFrame and select features
+            X = pd.DataFrame([features])[self.feature_columns]
+
         # Scale features
-        X_scaled = self.scaler.transform(X)
-        
-        # Get prediction and probabilities
-        category = self.model.predict(X_scaled)[0]
-        probabilities = self.model.predict_proba(X_scaled)[0]
-        
-        # Get feature importance for this prediction
-        feature_importance = dict(zip(
-            self.feature_columns,
-            self.model.feature_importances_
-        ))
-        
-        # Get top contributing features
-        top_features = sorted(
-            feature_importance.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:3]
-        
-        # Get confidence for the predicted category
-        category_index = {'low': 0, 'medium': 1, 'high': 2}[category]
+        with stage('ml', 'predict', 'scale'):
+            X_scaled = self.scaler.transform(X)
+
+        # Get probabilities; the forest's prediction is their argmax, so one pass covers both
+        with stage('ml', 'predict', 'forest'):
+            forest_start = time.perf_counter()
+            probabilities = self.model.predict_proba(X_scaled)[0]
+            forest_seconds = time.perf_counter() - forest_start
+            category_index = int(np.argmax(probabilities))
+            category = self.model.classes_[category_index]
+
+        # Get confidence for the predicted category; probability columns follow model.classes_
         confidence = float(probabilities[category_index]) * 100
 
+        if self.prediction_observer is not None:
+            self.prediction_observer(features, category)
+        if self.scored_observer is not None:
+            self.scored_observer([features], X, X_scaled, [category], forest_seconds)
+
         return {
             'category': category,  # Changed from predicted_category to match what the route expects
             'confidence': confidence,  # Single confidence score for the predicted category
-            'feature_importance': dict(top_features)  # Simplified feature importance format
+            'feature_importance': self.top_feature_importance()  # Simplified feature importance format
         }
 
+    def top_feature_importance(self, count=3):
+        """The model's most important features; the same for every prediction"""
+        cached = self._importance_cache
+        if cached is None or cached[0] is not self.model:
+            feature_importance = dict(zip(
+                self.feature_columns,
+                self.model.feature_importances_
+            ))
+            cached = self._importance_cache = (self.model, sorted(
+                feature_importance.items(),
+                key=lambda x: x[1],
+                reverse=True
+            ))
+        return dict(cached[1][:count])
+
+    def predict_many(self, contents, has_image=False, scheduled_time=None):
+        """Predict several posts with one scaler and one forest pass.
+
+        Returns one result per content, identical to calling ``predict`` on each.
+        """
+        if not contents:
+            return []
+
+        with stage('ml', 'predict_many', 'features'):
+            rows = [self.features_for(content, has_image, scheduled_time) for content in contents]
+        return self.predict_rows(rows, 'predict_many')
+
+    def predict_rows(self, rows, operation='predict_rows'):
+        """Predict already extracted feature rows (from ``features_for``) in one pass.
+
+        Each row may come from a different post, image flag and schedule.
+        Stages are recorded under ``operation``.
+        """
+        if not rows:
+            return []
+
+        with stage('ml', operation, 'matrix'):
+            X = pd.DataFrame(rows)[self.feature_columns]
+
+        with stage('ml', operation, 'scale'):
+            X_scaled = self.scaler.transform(X)
+
+        with stage('ml', operation, 'forest'):
+            forest_start = time.perf_counter()
+            probabilities = self.model.predict_proba(X_scaled)
+            forest_seconds = time.perf_counter() - forest_start
+            category_indexes = probabilities.argmax(axis=1)
+        categories = [self.model.classes_[index] for index in category_indexes]
+
+        if self.prediction_observer is not None:
+            for row, category in zip(rows, categories):
+                self.prediction_observer(row, category)
+        if self.scored_observer is not None:
+            self.scored_observer(rows, X, X_scaled, categories, forest_seconds)
+
+        feature_importance = self.top_feature_importance()
+        return [
+            {
+                'category': category,
+                'confidence': float(row[index]) * 100,
+                'feature_importance': dict(feature_importance),
+            }
+            for row, index, category in zip(probabilities, category_indexes, categories)
+        ]
+
+    def predict_schedule(self, content, has_image=False, top_k=5):
+        """Score every posting slot of the week for ``content`` in one forest pass.
+
+        Builds the 168-row (weekday x hour) feature matrix from a single
+        content feature extraction and returns the ``top_k`` slots, ranked by
+        the probability of high engagement. Hours use the same clock as
+        ``scheduled_time`` in ``predict``.
+        """
+        with stage('ml', 'best_times', 'features'):
+            features = self.extract_features_from_content(content)
+            self.add_engineered_features(features, has_image)
+
+            days = np.repeat(np.arange(7), 24)
+            hours = np.tile(np.arange(24), 7)
+            X = pd.DataFrame(
+                np.tile([features[column] for column in self.feature_columns], (len(days), 1)),
+                columns=self.feature_columns
+            )
+            X['post_time_day'] = days
+            X['post_time_hour'] = hours
+            X['is_weekend'] = (days >= 5).astype(int)
+            X['is_business_hours'] = ((hours >= 9) & (hours <= 17)).astype(int)
+
+        with stage('ml', 'best_times', 'scale'):
+            X_scaled = self.scaler.transform(X)
+
+        with stage('ml', 'best_times', 'forest'):
+            probabilities = self.model.predict_proba(X_scaled)
+
+        classes = list(self.model.classes_)
+        # A model trained on data without a class has no column for it
+        absent = np.zeros(len(probabilities))
+        high = probabilities[:, classes.index('high')] if 'high' in classes else absent
+        medium = probabilities[:, classes.index('medium')] if 'medium' in classes else absent
+        # Highest P(high) first, then P(medium); ties keep weekday/hour order
+        order = np.lexsort((-medium, -high))[:top_k]
+        predicted = probabilities.argmax(axis=1)
+
+        return [
+            {
+                'weekday': int(days[slot]),
+                'day': WEEKDAYS[days[slot]],
+                'hour': int(hours[slot]),
+                'prediction': classes[predicted[slot]],
+                'confidence': float(probabilities[slot, predicted[slot]]) * 100,
+                'high_probability': float(high[slot]) * 100,
+            }
+            for slot in order
+        ]
+
 if __name__ == "__main__":
-    predictor = PostPerformancePredictor()
+    parser = argparse.ArgumentParser(description='Train the post performance model')
+    parser.add_argument('--data', help='Training CSV (default: the latest processed_features_*.csv)')
+    parser.add_argument('--brand', help='Train a per-brand model into models/<brand>/ from that '
+                                        "account's processed_features_<brand>_*.csv")
+    parser.add_argument('--incremental', metavar='BASE_MODEL',
+                        help='Add trees to this model instead of retraining from scratch')
+    parser.add_argument('--previous-data', help='CSV the base model was trained on; its rows are not new')
+    parser.add_argument('--new-trees', type=int, default=50)
+    parser.add_argument('--retire-trees', type=int, default=0, help='Drop this many of the oldest trees')
+    parser.add_argument('--replay', type=float, default=0.25,
+                        help='Fraction of previously seen rows mixed into the new trees')
+    parser.add_argument('--no-compare', action='store_true', help='Skip the full retrain comparison')
+    args = parser.parse_args()
+
+    model_dir = None
+    file_prefix = 'processed_features_'
+    if args.brand:
+        brand = args.brand.lower()
+        model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', brand)
+        file_prefix = f'processed_features_{brand}_'
+    predictor = PostPerformancePredictor(model_dir=model_dir)
     
     # Train the model if training data exists
-    latest_training_file = None
+    latest_training_file = args.data
     training_data_dir = 'training_data'
     
-    if os.path.exists(training_data_dir):
-        files = [f for f in os.listdir(training_data_dir) if f.startswith('processed_features_')]
+    if latest_training_file is None and os.path.exists(training_data_dir):
+        files = [f for f in os.listdir(training_data_dir) if f.startswith(file_prefix)]
         if files:
             latest_training_file = os.path.join(
                 training_data_dir,
                 sorted(files)[-1]  # Get the most recent file
             )
     
-    if latest_training_file:
+    if latest_training_file and args.incremental:
+        print(f"Updating {args.incremental} with new rows from {latest_training_file}")
+        predictor.train_incremental(
+            args.incremental, latest_training_file, args.previous_data,
+            new_trees=args.new_trees, retire_trees=args.retire_trees, replay=args.replay,
+            compare_full=not args.no_compare
+        )
+    elif latest_training_file:
         print(f"Training model using {latest_training_file}")
         predictor.train(latest_training_file)
     else:
@@ -1,22 +1,51 @@
-from flask import Flask
+from flask import Flask, Response, g, request
 from flask_cors import CORS
-from routes.ml_routes import ml_routes
 import logging
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from telemetry import PROMETHEUS_CONTENT_TYPE, configure_logging, enabled, registry, render_prometheus
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# JSON log lines written from a background thread; level from LOG_LEVEL (default INFO).
+# Configured before the routes are imported so model loading is logged too.
+configure_logging()
 logger = logging.getLogger(__name__)
 
+from ml.drift import render_prometheus as render_drift
+from routes.ml_routes import brand_models, drift_monitors, ml_routes, shadow
+
 app = Flask(__name__)
 CORS(app)
 
 # Register blueprints with the correct URL prefix
 app.register_blueprint(ml_routes, url_prefix='/ml')  # Add url_prefix back
 
+@app.before_request
+def start_request_timer():
+    if enabled():
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        registry.observe('ml', request.endpoint or 'unmatched', 'request', time.perf_counter() - start)
+    return response
+
 @app.route('/test', methods=['GET'])
 def test():
     return {'message': 'ML server is running!'}
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus scrape endpoint for the stage timings recorded by telemetry.stage
+    # plus the brand model pool's cache and memory figures and the feature drift scores
+    body = render_prometheus() + brand_models.render_prometheus() + render_drift(list(drift_monitors.values()))
+    if shadow is not None:
+        body += shadow.render_prometheus()
+    return Response(body, content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     logger.info('Starting ML server on port 5007...')
     logger.info('Test the server at: http://localhost:5007/test')
@@ -0,0 +1,93 @@
+"""
+Streaming wire formats for ``/ml/predict_batch``.
+
+Besides a single JSON document, the endpoint accepts a stream of post
+objects as NDJSON (``application/x-ndjson``, one JSON object per line) or
+MessagePack (``application/msgpack``, concatenated maps). Posts are decoded
+lazily from the request body, and predictions are written back in the same
+framing, one chunk at a time.
+
+MessagePack needs the optional ``msgpack`` package; without it that format
+is refused with 415.
+"""
+import json
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; NDJSON and JSON still work
+    msgpack = None
+
+NDJSON = 'ndjson'
+MSGPACK = 'msgpack'
+MEDIA_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    MSGPACK: 'application/msgpack',
+}
+FORMAT_BY_MEDIA_TYPE = {
+    'application/x-ndjson': NDJSON,
+    'application/ndjson': NDJSON,
+    'application/jsonlines': NDJSON,
+    'application/msgpack': MSGPACK,
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+}
+READ_SIZE = 64 * 1024
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def stream_format(mimetype):
+    """The streaming format for a request or Accept media type, or None for plain JSON."""
+    wire_format = FORMAT_BY_MEDIA_TYPE.get(mimetype)
+    if wire_format == MSGPACK and msgpack is None:
+        raise UnsupportedFormat('MessagePack support requires the msgpack package')
+    return wire_format
+
+
+def response_format(accept_mimetypes, request_format):
+    """Honour an explicit Accept for the other streaming format; otherwise answer in kind."""
+    for mimetype, _ in accept_mimetypes:
+        if mimetype in FORMAT_BY_MEDIA_TYPE:
+            return stream_format(mimetype)
+    return request_format
+
+
+def read_posts(stream, wire_format):
+    """Yield post objects from a readable byte stream."""
+    if wire_format == MSGPACK:
+        unpacker = msgpack.Unpacker(raw=False)
+        while True:
+            data = stream.read(READ_SIZE)
+            if not data:
+                break
+            unpacker.feed(data)
+            yield from unpacker
+        return
+
+    # Read in blocks: iterating the WSGI input by line reads it a byte at a time
+    number, pending = 0, b''
+    while True:
+        data = stream.read(READ_SIZE)
+        lines = (pending + data).split(b'\n')
+        pending = lines.pop() if data else b''
+        for line in lines:
+            number += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f'Invalid JSON on line {number}: {e}') from None
+        if not data:
+            break
+
+
+def encode_records(records, wire_format):
+    """One chunk of records, framed for the response."""
+    if wire_format == MSGPACK:
+        packer = msgpack.Packer()
+        return b''.join(packer.pack(record) for record in records)
+    return ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records).encode()
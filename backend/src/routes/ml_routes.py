@@ -1,22 +1,42 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from itertools import islice
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from ml.drift import TIME_FEATURES, DriftMonitor
+from ml.model_pool import GLOBAL_MODEL, BrandModelPool, InvalidBrand
+from ml.shadow import ShadowScorer
 from ml.train import PostPerformancePredictor
+from routes.batch_formats import (
+    MEDIA_TYPES, UnsupportedFormat, encode_records, read_posts, response_format, stream_format
+)
+from telemetry import Sampler, stage, timed_iter
+import logging
 import os
+import time
 
 ml_routes = Blueprint('ml_routes', __name__)
+logger = logging.getLogger(__name__)
 
-# Initialize predictor
-predictor = PostPerformancePredictor()
+# /best_times scores every hour of every weekday
+SCHEDULE_SLOTS = 7 * 24
+DEFAULT_BEST_TIMES = 5
+
+# Streamed /predict_batch requests are scored and written back this many posts at a time
+BATCH_CHUNK_SIZE = int(os.getenv('ML_BATCH_CHUNK_SIZE', '1000'))
+MAX_BATCH_CHUNK_SIZE = 5000
+
+# Per-post records are sampled; each batch always gets one summary record
+item_sampler = Sampler()
+
+# Initialize predictor; serving uses the compact emoji table unless ML_EMOJI_MODE=full
+predictor = PostPerformancePredictor(emoji_mode=os.getenv('ML_EMOJI_MODE', 'lean'))
 base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 model_dir = os.path.join(base_dir, 'ml', 'models')
 model_path = os.path.join(model_dir, 'model_20250722_212611.joblib')
-print(f"Looking for model at: {model_path}")
+logger.info('Loading prediction model', extra={'model_path': model_path})
 
 # Verify paths
-print(f"Base directory: {base_dir}")
-print(f"Model directory: {model_dir}")
 if not os.path.exists(model_dir):
     raise FileNotFoundError(f"Model directory not found: {model_dir}")
 if not os.path.exists(model_path):
@@ -24,6 +44,57 @@ if not os.path.exists(model_path):
 if os.path.exists(model_path):
     predictor.load_model(model_path)
 
+# One drift monitor per model that has a training manifest, kept across pool evictions
+drift_monitors = {}
+
+def attach_drift_monitor(name, model_predictor):
+    if model_predictor.manifest is None:
+        logger.info('Model has no manifest; drift is not monitored', extra={'model': name})
+        return
+    monitor = drift_monitors.get(name)
+    if monitor is None or monitor.model_file != model_predictor.manifest.get('model'):
+        monitor = DriftMonitor(
+            name,
+            model_predictor.manifest,
+            interval=float(os.getenv('ML_DRIFT_INTERVAL', '300')),
+            decay=float(os.getenv('ML_DRIFT_DECAY', '0.5')),
+            threshold=float(os.getenv('ML_DRIFT_THRESHOLD', '0.25')),
+            min_samples=int(os.getenv('ML_DRIFT_MIN_SAMPLES', '100')),
+            ignore=[f for f in os.getenv('ML_DRIFT_IGNORE', ','.join(TIME_FEATURES)).split(',') if f],
+        )
+        drift_monitors[name] = monitor
+    model_predictor.prediction_observer = monitor.observe
+
+attach_drift_monitor(GLOBAL_MODEL, predictor)
+
+# A candidate model (ML_SHADOW_MODEL, a model file in ml/models or a path) scores the global
+# model's traffic in the background; it never changes a response
+shadow = None
+shadow_model = os.getenv('ML_SHADOW_MODEL')
+if shadow_model:
+    candidate = PostPerformancePredictor(emoji_mode=predictor.emoji_mode)
+    candidate.load_model(os.path.join(model_dir, shadow_model))
+    shadow = ShadowScorer(
+        predictor,
+        candidate,
+        os.path.basename(shadow_model),
+        sample_rate=float(os.getenv('ML_SHADOW_SAMPLE_RATE', '1.0')),
+        max_pending=int(os.getenv('ML_SHADOW_MAX_PENDING', '64')),
+    )
+    predictor.scored_observer = shadow.submit
+    logger.info('Shadow scoring enabled', extra={'candidate': shadow.name, 'same_scaler': shadow.same_scaler})
+
+# Per-brand models from ml/models/<brand>/, loaded on first use; the global model is the fallback
+brand_models = BrandModelPool(
+    model_dir,
+    predictor,
+    capacity=int(os.getenv('ML_BRAND_POOL_SIZE', '8')),
+    max_bytes=int(float(os.getenv('ML_BRAND_POOL_MAX_MB', '0')) * 1024 * 1024),
+    emoji_mode=predictor.emoji_mode,
+    on_load=attach_drift_monitor,
+    miss_ttl=float(os.getenv('ML_BRAND_POOL_MISS_TTL', '60')),
+)
+
 @ml_routes.route('/predict', methods=['POST'])
 def predict_performance():
     try:
@@ -35,75 +106,241 @@ def predict_performance():
         if not content:
             return jsonify({'error': 'Content is required'}), 400
 
-        prediction = predictor.predict(content, has_image, scheduled_time)
-        
-        return jsonify({
-            'status': 'success',
-            'prediction': prediction['category'],
-            'confidence': prediction['confidence'],
-            'feature_importance': prediction['feature_importance']
-        }), 200
+        try:
+            brand_predictor, model_name = brand_models.get(data.get('brand'))
+        except InvalidBrand as e:
+            return jsonify({'error': str(e)}), 400
+
+        prediction = brand_predictor.predict(content, has_image, scheduled_time)
+
+        with stage('ml', 'predict', 'serialize'):
+            response = jsonify({
+                'status': 'success',
+                'model': model_name,
+                'prediction': prediction['category'],
+                'confidence': prediction['confidence'],
+                'feature_importance': prediction['feature_importance']
+            })
+        return response, 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ml_routes.route('/best_times', methods=['POST'])
+def best_posting_times():
+    try:
+        data = request.json or {}
+        content = data.get('content')
+        has_image = data.get('has_image', False)
+
+        if not content:
+            return jsonify({'error': 'Content is required'}), 400
+
+        try:
+            top_k = int(data.get('top_k', DEFAULT_BEST_TIMES))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'top_k must be an integer'}), 400
+        if not 1 <= top_k <= SCHEDULE_SLOTS:
+            return jsonify({'error': f'top_k must be between 1 and {SCHEDULE_SLOTS}'}), 400
+
+        try:
+            brand_predictor, model_name = brand_models.get(data.get('brand'))
+        except InvalidBrand as e:
+            return jsonify({'error': str(e)}), 400
+
+        slots = brand_predictor.predict_schedule(content, has_image, top_k)
+
+        with stage('ml', 'best_times', 'serialize'):
+            response = jsonify({
+                'status': 'success',
+                'model': model_name,
+                'best_times': slots,
+                'slots_scored': SCHEDULE_SLOTS
+            })
+        return response, 200
 
     except Exception as e:
+        logger.exception('Best time prediction failed')
         return jsonify({'error': str(e)}), 500
 
+DEFAULT_PREDICTION = {'prediction': 'medium', 'confidence': 50, 'feature_importance': {}}
+
+def score_posts(model_predictor, posts, first_index=0):
+    """Predict ``posts`` in one forest pass.
+
+    Returns ``(predictions, empty, failed)``. Posts without content, or whose
+    features cannot be extracted, get the default prediction.
+    """
+    predictions = []
+    rows, scored = [], []
+    empty = failed = 0
+    for idx, post in enumerate(posts, first_index):
+        post_id = post.get('id') if isinstance(post, dict) else None
+        predictions.append({'id': post_id, **DEFAULT_PREDICTION})
+        try:
+            content = post.get('content')
+            if not content:
+                empty += 1
+                if item_sampler():
+                    logger.info('Empty content, using default prediction', extra={'post_id': post_id, 'index': idx})
+                continue
+            rows.append(model_predictor.features_for(content, post.get('has_image', False), post.get('scheduled_time')))
+            scored.append(len(predictions) - 1)
+        except Exception as e:
+            failed += 1
+            if item_sampler():
+                logger.warning('Post prediction failed', extra={'post_id': post_id, 'index': idx, 'error': str(e)})
+
+    for position, prediction in zip(scored, model_predictor.predict_rows(rows, 'predict_batch')):
+        predictions[position].update({
+            'prediction': prediction['category'],
+            'confidence': prediction['confidence'],
+            'feature_importance': prediction['feature_importance']
+        })
+        if item_sampler():
+            logger.info('Post predicted', extra={
+                'post_id': predictions[position]['id'], 'index': first_index + position,
+                'prediction': prediction['category']
+            })
+    return predictions, empty, failed
+
 @ml_routes.route('/predict_batch', methods=['POST'])
 def predict_batch_performance():
+    try:
+        wire_format = stream_format(request.mimetype)
+        if wire_format is not None:
+            return predict_batch_stream(wire_format)
+    except UnsupportedFormat as e:
+        return jsonify({'error': str(e)}), 415
+
     try:
         data = request.json
         if not data:
             return jsonify({'error': 'No JSON data received'}), 400
             
         posts = data.get('posts', [])
-        print(f"Received batch prediction request for {len(posts)} posts")
 
         if not posts:
             return jsonify({'error': 'Posts array is required'}), 400
 
-        predictions = []
-        for idx, post in enumerate(posts):
-            try:
-                content = post.get('content')
-                has_image = post.get('has_image', False)
-                scheduled_time = post.get('scheduled_time')
-                post_id = post.get('id')
-
-                print(f"Processing post {idx + 1}/{len(posts)} with ID: {post_id}")
-
-                if not content:
-                    print(f"Warning: Empty content for post ID: {post_id}")
-                    predictions.append({
-                        'id': post_id,
-                        'prediction': 'medium',
-                        'confidence': 50,
-                        'feature_importance': {}
-                    })
-                    continue
-
-                prediction = predictor.predict(content, has_image, scheduled_time)
-                predictions.append({
-                    'id': post_id,
-                    'prediction': prediction['category'],
-                    'confidence': prediction['confidence'],
-                    'feature_importance': prediction['feature_importance']
-                })
-                print(f"Successfully predicted for post ID: {post_id}")
-
-            except Exception as e:
-                print(f"Error processing post {idx + 1}: {str(e)}")
-                predictions.append({
-                    'id': post.get('id'),
-                    'prediction': 'medium',
-                    'confidence': 50,
-                    'feature_importance': {}
-                })
-
-        print(f"Completed batch prediction for {len(predictions)} posts")
-        return jsonify({
-            'status': 'success',
-            'predictions': predictions
-        }), 200
+        try:
+            brand_predictor, model_name = brand_models.get(data.get('brand'))
+        except InvalidBrand as e:
+            return jsonify({'error': str(e)}), 400
+
+        started = time.perf_counter()
+        predictions, empty, failed = score_posts(brand_predictor, posts)
+
+        logger.info('Batch prediction completed', extra={
+            'model': model_name,
+            'posts': len(posts),
+            'empty': empty,
+            'failed': failed,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        })
+        with stage('ml', 'predict_batch', 'serialize'):
+            response = jsonify({
+                'status': 'success',
+                'model': model_name,
+                'predictions': predictions
+            })
+        return response, 200
 
     except Exception as e:
-        print(f"Fatal error in batch prediction: {str(e)}")
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        logger.exception('Batch prediction failed')
+        return jsonify({'error': str(e)}), 500
+
+def predict_batch_stream(wire_format):
+    """NDJSON or MessagePack /predict_batch: posts in, predictions out, chunk by chunk.
+
+    Posts are read from the body as they arrive, scored ``chunk`` at a time
+    (query parameter, default ``ML_BATCH_CHUNK_SIZE``) and each chunk's
+    predictions are written before the next chunk is read, so memory is
+    bounded by the chunk rather than the batch. ``brand`` is a query
+    parameter. The response uses the request's format unless Accept names
+    the other one. Input that cannot be decoded ends the stream with an
+    ``{"error": ..., "index": ...}`` record.
+    """
+    try:
+        out_format = response_format(request.accept_mimetypes, wire_format)
+    except UnsupportedFormat as e:
+        return jsonify({'error': str(e)}), 415
+    try:
+        chunk_size = int(request.args.get('chunk', BATCH_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({'error': 'chunk must be an integer'}), 400
+    if not 1 <= chunk_size <= MAX_BATCH_CHUNK_SIZE:
+        return jsonify({'error': f'chunk must be between 1 and {MAX_BATCH_CHUNK_SIZE}'}), 400
+    try:
+        brand_predictor, model_name = brand_models.get(request.args.get('brand'))
+    except InvalidBrand as e:
+        return jsonify({'error': str(e)}), 400
+
+    stream = request.stream
+
+    def generate():
+        started = time.perf_counter()
+        posts = read_posts(stream, wire_format)
+        total = empty = failed = chunks = 0
+        try:
+            while True:
+                chunk, error = [], None
+                try:
+                    chunk.extend(islice(posts, chunk_size))
+                except Exception as e:
+                    error = e
+                if chunk:
+                    predictions, chunk_empty, chunk_failed = score_posts(brand_predictor, chunk, total)
+                    total += len(chunk)
+                    empty += chunk_empty
+                    failed += chunk_failed
+                    chunks += 1
+                    with stage('ml', 'predict_batch_stream', 'serialize'):
+                        body = encode_records(predictions, out_format)
+                    yield body
+                if error is not None:
+                    logger.warning('Streamed batch input rejected', extra={'index': total, 'error': str(error)})
+                    yield encode_records([{'error': str(error), 'index': total}], out_format)
+                    return
+                if len(chunk) < chunk_size:
+                    return
+        finally:
+            logger.info('Streamed batch prediction completed', extra={
+                'model': model_name,
+                'format': wire_format,
+                'posts': total,
+                'chunks': chunks,
+                'empty': empty,
+                'failed': failed,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            })
+
+    response = Response(
+        stream_with_context(timed_iter(generate(), 'ml', 'predict_batch_stream', 'stream')),
+        content_type=MEDIA_TYPES[out_format]
+    )
+    response.headers['X-Model'] = model_name
+    return response
+
+@ml_routes.route('/drift', methods=['GET'])
+def feature_drift():
+    # PSI of live features against each model's training manifest; ?model= picks one
+    name = request.args.get('model')
+    if name is not None and name not in drift_monitors:
+        return jsonify({'error': f'No drift monitor for model {name!r}'}), 404
+
+    monitors = [drift_monitors[name]] if name is not None else list(drift_monitors.values())
+    return jsonify({
+        'status': 'success',
+        'models': {
+            monitor.name: {**monitor.evaluate(), 'last_check': monitor.last_report}
+            for monitor in monitors
+        }
+    }), 200
+
+@ml_routes.route('/shadow', methods=['GET'])
+def shadow_stats():
+    # Agreement and latency of the ML_SHADOW_MODEL candidate against the global model
+    if shadow is None:
+        return jsonify({'error': 'No shadow model configured; set ML_SHADOW_MODEL'}), 404
+    return jsonify({'status': 'success', 'primary': os.path.basename(model_path), **shadow.stats()}), 200
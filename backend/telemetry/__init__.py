@@ -0,0 +1,24 @@
+"""
+Shared instrumentation for the Django and Flask services.
+
+Code wraps its stages in ``stage(service, operation, name)``; the durations
+are collected into in-process histograms and rendered in the Prometheus text
+format by ``render_prometheus()``, which both services expose on ``/metrics``.
+Set ``TELEMETRY_ENABLED=false`` to turn every stage into a no-op.
+
+``configure_logging()`` sends log records through a background queue as JSON
+lines; per-item records in hot loops go through a ``Sampler`` so only a
+fraction (``LOG_ITEM_SAMPLE_RATE``) is written, while per-request summaries
+are always logged.
+"""
+from .logs import AsyncStreamHandler, JsonFormatter, Sampler, configure_logging
+from .metrics import (
+    DEFAULT_BUCKETS, PROMETHEUS_CONTENT_TYPE, Histogram, Registry, enabled, registry, render_prometheus,
+    set_enabled, stage, timed_aiter, timed_iter
+)
+
+__all__ = [
+    'AsyncStreamHandler', 'JsonFormatter', 'Sampler', 'configure_logging',
+    'DEFAULT_BUCKETS', 'PROMETHEUS_CONTENT_TYPE', 'Histogram', 'Registry', 'enabled', 'registry',
+    'render_prometheus', 'set_enabled', 'stage', 'timed_aiter', 'timed_iter',
+]
@@ -0,0 +1,94 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Fraction of per-item records (one post, one event) that are written; summaries always are
+ITEM_SAMPLE_RATE = float(os.getenv('LOG_ITEM_SAMPLE_RATE', '0.01'))
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, level, logger and any ``extra`` fields."""
+
+    def format(self, record):
+        payload = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class AsyncStreamHandler(QueueHandler):
+    """Hand records to a background thread that formats and writes them.
+
+    The calling thread only enqueues, so slow stdout/stderr or log shippers
+    never block a request. Usable directly or as a ``logging.config`` handler class.
+    """
+
+    def __init__(self, stream=None, formatter=None):
+        super().__init__(queue.SimpleQueue())
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(formatter or JsonFormatter())
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+        self._stopped = False
+        # Flush whatever is still queued when the process exits
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, while the arguments still
+        # reflect the caller's state, but leave formatting to the listener
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def close(self):
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+        super().close()
+
+
+class Sampler:
+    """Decide whether to emit a per-item record; ``rate`` is the fraction kept."""
+
+    def __init__(self, rate=None):
+        self.rate = ITEM_SAMPLE_RATE if rate is None else rate
+
+    def __call__(self):
+        if self.rate <= 0:
+            return False
+        return self.rate >= 1 or random.random() < self.rate
+
+
+def configure_logging(level=LOG_LEVEL, stream=None):
+    """Route the root logger through a single ``AsyncStreamHandler``. Idempotent."""
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in root.handlers:
+        if isinstance(handler, AsyncStreamHandler):
+            return handler
+    handler = AsyncStreamHandler(stream)
+    root.addHandler(handler)
+    return handler
@@ -0,0 +1,210 @@
+import bisect
+import os
+import threading
+import time
+
+# Upper bounds in seconds, from sub-millisecond feature extraction to slow LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+STAGE_METRIC = 'app_stage_duration_seconds'
+STAGE_HELP = 'Time spent in each instrumented stage of a request or command.'
+LABEL_NAMES = ('service', 'operation', 'stage')
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_enabled = os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true'
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+class Histogram:
+    """Cumulative-bucket histogram; ``observe`` is safe to call from any thread."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """Return ``(cumulative_counts, sum, count)`` with one entry per bucket plus +Inf."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class Registry:
+    """Stage histograms keyed by ``(service, operation, stage)``."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, service, operation, name):
+        key = (service, operation, name)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, service, operation, name, seconds):
+        self.histogram(service, operation, name).observe(seconds)
+
+    def items(self):
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+class _Stage:
+    __slots__ = ('histogram', 'start', 'elapsed')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.elapsed = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed)
+        return False
+
+
+class _NoopStage:
+    __slots__ = ()
+    elapsed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+def stage(service, operation, name):
+    """Context manager recording how long its block takes.
+
+    The value bound by ``as`` has the duration in ``elapsed`` afterwards. When
+    telemetry is disabled a shared no-op is returned instead (``elapsed`` stays
+    None), so an instrumented block costs one function call and a flag check.
+    """
+    if not _enabled:
+        return _NOOP
+    return _Stage(registry.histogram(service, operation, name))
+
+
+def timed_iter(iterable, service, operation, name):
+    """Yield from ``iterable``, recording the total time spent producing items.
+
+    For lazily consumed work such as streamed response bodies; the time the
+    consumer spends between items is not counted. One observation is made
+    when the iterable is exhausted or closed.
+    """
+    if not _enabled:
+        yield from iterable
+        return
+
+    histogram = registry.histogram(service, operation, name)
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                return
+            elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        histogram.observe(elapsed)
+
+
+async def timed_aiter(aiterable, service, operation, name):
+    """Async ``timed_iter``: time spent awaiting items from ``aiterable``.
+
+    Under an event loop the awaited time can include other tasks' turns, so
+    this is an upper bound on the work done for this stream.
+    """
+    if not _enabled:
+        async for item in aiterable:
+            yield item
+        return
+
+    histogram = registry.histogram(service, operation, name)
+    iterator = aiterable.__aiter__()
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                elapsed += time.perf_counter() - start
+                return
+            elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        histogram.observe(elapsed)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(source=None):
+    """Render every stage histogram in the Prometheus text exposition format."""
+    source = source or registry
+    lines = [f'# HELP {STAGE_METRIC} {STAGE_HELP}', f'# TYPE {STAGE_METRIC} histogram']
+    bounds = source.buckets + (float('inf'),)
+
+    for key, histogram in source.items():
+        labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(LABEL_NAMES, key))
+        cumulative, total, count = histogram.snapshot()
+        for bound, value in zip(bounds, cumulative):
+            lines.append(f'{STAGE_METRIC}_bucket{{{labels},le="{_format_value(bound)}"}} {value}')
+        lines.append(f'{STAGE_METRIC}_sum{{{labels}}} {_format_value(total)}')
+        lines.append(f'{STAGE_METRIC}_count{{{labels}}} {count}')
+
+    return '\n'.join(lines) + '\n'
+
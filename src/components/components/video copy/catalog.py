@@ -0,0 +1,324 @@
+"""
+SQLite-backed catalog of generated images.
+
+Replaces the old ``images_db.json`` file: inserts are single atomic
+statements, listing walks the timestamp index newest-first with a keyset
+cursor, and prompt search goes through an FTS5 index when SQLite has it.
+
+Image files are content-addressed blobs shared between catalog entries;
+``blobs.refcount`` tracks how many entries point at each file.
+"""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE,
+    prompt TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    image_url TEXT,
+    status TEXT NOT NULL DEFAULT 'ready',
+    error TEXT,
+    prompt_key TEXT,
+    blob_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_images_timestamp ON images (timestamp DESC, id DESC);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Columns added after the first release of the catalog, applied to older files
+MIGRATIONS = {
+    'status': "ALTER TABLE images ADD COLUMN status TEXT NOT NULL DEFAULT 'ready'",
+    'error': 'ALTER TABLE images ADD COLUMN error TEXT',
+    'prompt_key': 'ALTER TABLE images ADD COLUMN prompt_key TEXT',
+    'blob_hash': 'ALTER TABLE images ADD COLUMN blob_hash TEXT',
+}
+
+POST_MIGRATION_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_images_prompt_key ON images (prompt_key, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_images_blob_hash ON images (blob_hash);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(
+    prompt, content='images', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS images_fts_insert AFTER INSERT ON images BEGIN
+    INSERT INTO images_fts (rowid, prompt) VALUES (new.id, new.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS images_fts_delete AFTER DELETE ON images BEGIN
+    INSERT INTO images_fts (images_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+END;
+"""
+
+COLUMNS = ('filename', 'prompt', 'timestamp', 'image_url')
+MAX_PAGE_SIZE = 200
+
+STATUS_PENDING = 'pending'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class ImageCatalog:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.has_fts = self._init_schema()
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA busy_timeout=30000')
+            self._local.connection = connection
+        return connection
+
+    def _init_schema(self):
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        existing = {row['name'] for row in connection.execute('PRAGMA table_info(images)')}
+        for column, statement in MIGRATIONS.items():
+            if column not in existing:
+                connection.execute(statement)
+        connection.create_function('prompt_key', 1, prompt_key, deterministic=True)
+        connection.execute('UPDATE images SET prompt_key = prompt_key(prompt) WHERE prompt_key IS NULL')
+        connection.executescript(POST_MIGRATION_SCHEMA)
+        indexed = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'images_fts'"
+        ).fetchone()
+        try:
+            connection.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: search falls back to a LIKE scan
+            return False
+        if not indexed:
+            # Rows written before the index existed (e.g. by an SQLite without FTS5)
+            connection.execute("INSERT INTO images_fts (images_fts) VALUES ('rebuild')")
+        return True
+
+    def add(self, filename, prompt, timestamp, image_url=None, status=STATUS_READY):
+        """Insert one image record in a single atomic statement."""
+        self._connect().execute(
+            'INSERT INTO images (filename, prompt, timestamp, image_url, status, prompt_key) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (filename, prompt, timestamp, image_url, status, prompt_key(prompt))
+        )
+
+    def set_status(self, filename, status, error=None):
+        self._connect().execute(
+            'UPDATE images SET status = ?, error = ? WHERE filename = ?',
+            (status, error, filename)
+        )
+
+    def get(self, filename):
+        row = self._connect().execute(
+            'SELECT id, filename, prompt, timestamp, image_url, status, error, blob_hash '
+            'FROM images WHERE filename = ?',
+            (filename,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {**_to_dict(row), 'status': row['status'], 'error': row['error'], 'blob_hash': row['blob_hash']}
+
+    def find_recent_by_prompt(self, prompt, since):
+        """Newest non-failed image for the same normalized prompt at or after ``since``."""
+        row = self._connect().execute(
+            'SELECT id, filename, prompt, timestamp, image_url, status FROM images '
+            'WHERE prompt_key = ? AND timestamp >= ? AND status != ? '
+            'ORDER BY timestamp DESC LIMIT 1',
+            (prompt_key(prompt), since, STATUS_FAILED)
+        ).fetchone()
+        if row is None:
+            return None
+        return {**_to_dict(row), 'status': row['status']}
+
+    def attach_blob(self, filename, blob_hash, size, place=None):
+        """Point an entry at a stored blob and mark it ready.
+
+        ``place()`` puts the blob's file on disk inside the same transaction,
+        so a concurrent ``remove()`` of the blob's last reference cannot
+        unlink it between the existence check and the attach.
+        """
+        connection = self._connect()
+        with _transaction(connection):
+            if place is not None:
+                place()
+            connection.execute(
+                'INSERT INTO blobs (hash, size, refcount) VALUES (?, ?, 1) '
+                'ON CONFLICT (hash) DO UPDATE SET refcount = refcount + 1',
+                (blob_hash, size)
+            )
+            connection.execute(
+                'UPDATE images SET blob_hash = ?, status = ?, error = NULL WHERE filename = ?',
+                (blob_hash, STATUS_READY, filename)
+            )
+
+    def remove(self, filename, unlink=None, unlink_legacy=None):
+        """Delete an entry. Returns the blob hash if no entry references it any more.
+
+        ``unlink(blob_hash)`` deletes the orphaned blob's file before the
+        transaction commits, while ``attach_blob()`` for the same hash waits.
+        An entry from before blob storage owns its file outright, so
+        ``unlink_legacy(filename)`` is always called for it.
+        """
+        connection = self._connect()
+        with _transaction(connection):
+            row = connection.execute('SELECT blob_hash FROM images WHERE filename = ?', (filename,)).fetchone()
+            if row is None:
+                raise KeyError(filename)
+            connection.execute('DELETE FROM images WHERE filename = ?', (filename,))
+
+            blob_hash = row['blob_hash']
+            if blob_hash is None:
+                if unlink_legacy is not None:
+                    unlink_legacy(filename)
+                return None
+            connection.execute('UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?', (blob_hash,))
+            # Re-checked in the same statement: only a blob nothing points at is dropped
+            orphaned = connection.execute(
+                'DELETE FROM blobs WHERE hash = ? AND refcount <= 0', (blob_hash,)
+            ).rowcount
+            if orphaned and unlink is not None:
+                unlink(blob_hash)
+        return blob_hash if orphaned else None
+
+    def increment_counter(self, name, amount=1):
+        self._connect().execute(
+            'INSERT INTO counters (name, value) VALUES (?, ?) '
+            'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    def storage_report(self):
+        """Entries, unique blobs and the bytes saved by sharing them."""
+        connection = self._connect()
+        entries, referenced_bytes = connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(blobs.size), 0) FROM images JOIN blobs ON blobs.hash = images.blob_hash'
+        ).fetchone()
+        blobs, stored_bytes = connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs'
+        ).fetchone()
+        counters = dict(connection.execute('SELECT name, value FROM counters').fetchall())
+        return {
+            'entries': entries,
+            'unique_blobs': blobs,
+            'referenced_bytes': referenced_bytes,
+            'stored_bytes': stored_bytes,
+            'shared_bytes_saved': referenced_bytes - stored_bytes,
+            'prompt_cache_hits': counters.get('prompt_cache_hits', 0),
+            'legacy_bytes_removed': counters.get('legacy_bytes_removed', 0),
+        }
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM images').fetchone()[0]
+
+    def list(self, limit=50, cursor=None, query=None):
+        """Newest-first page of downloaded images, optionally matching ``query``.
+
+        Returns ``(images, next_cursor)``; ``next_cursor`` is None on the last page.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = ['images.status = ?'], [STATUS_READY]
+
+        if cursor:
+            timestamp, row_id = decode_cursor(cursor)
+            where.append('(images.timestamp < ? OR (images.timestamp = ? AND images.id < ?))')
+            params.extend([timestamp, timestamp, row_id])
+
+        source = 'images'
+        query = (query or '').strip()
+        if query:
+            if self.has_fts:
+                source = 'images JOIN images_fts ON images_fts.rowid = images.id'
+                where.append('images_fts MATCH ?')
+                params.append(_fts_query(query))
+            else:
+                where.append("images.prompt LIKE ? ESCAPE '\\'")
+                params.append('%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+
+        sql = f'SELECT images.id, images.filename, images.prompt, images.timestamp, images.image_url FROM {source}'
+        sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY images.timestamp DESC, images.id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['timestamp'], rows[-1]['id'])
+        return [_to_dict(row) for row in rows], next_cursor
+
+    def import_json(self, json_path):
+        """One-off import of a legacy ``images_db.json`` file. Returns rows added."""
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, 'r') as f:
+            images = json.load(f).get('images', [])
+
+        connection = self._connect()
+        before = self.count()
+        with _transaction(connection):
+            connection.executemany(
+                'INSERT OR IGNORE INTO images (filename, prompt, timestamp, image_url) VALUES (?, ?, ?, ?)',
+                [tuple(image.get(column) for column in COLUMNS) for image in images]
+            )
+        return self.count() - before
+
+
+@contextmanager
+def _transaction(connection):
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def _to_dict(row):
+    return {column: row[column] for column in COLUMNS}
+
+
+def prompt_key(prompt):
+    """Hash of the whitespace-collapsed, case-folded prompt."""
+    normalized = ' '.join((prompt or '').split()).casefold()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _fts_query(query):
+    # Quote every term so user input is never parsed as FTS syntax
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(f'{timestamp}|{row_id}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return timestamp, int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor')
@@ -0,0 +1,56 @@
+"""
+Move images saved before content-addressed storage into it.
+
+Hashes every catalog entry that has no blob yet, keeps one file per distinct
+content and removes the duplicates, then prints the storage report.
+
+    python dedupe.py
+"""
+import json
+import os
+
+from catalog import STATUS_READY, ImageCatalog
+from storage import blob_filename, hash_file
+
+
+def migrate_legacy_files(catalog, folder):
+    """Attach legacy files to blobs. Returns ``(migrated, reclaimed_bytes)``."""
+    connection = catalog._connect()
+    rows = connection.execute(
+        'SELECT filename FROM images WHERE blob_hash IS NULL AND status = ?', (STATUS_READY,)
+    ).fetchall()
+
+    migrated = reclaimed = 0
+    for row in rows:
+        path = os.path.join(folder, row['filename'])
+        if not os.path.isfile(path):
+            continue
+
+        content_hash = hash_file(path)
+        size = os.path.getsize(path)
+        blob_path = os.path.join(folder, blob_filename(content_hash))
+        duplicate = []
+
+        def place():
+            # Runs inside the attach transaction, like StagedBlob.place
+            if os.path.exists(blob_path):
+                os.remove(path)
+                duplicate.append(size)
+            else:
+                os.replace(path, blob_path)
+
+        catalog.attach_blob(row['filename'], content_hash, size, place=place)
+        reclaimed += sum(duplicate)
+        migrated += 1
+
+    if reclaimed:
+        catalog.increment_counter('legacy_bytes_removed', reclaimed)
+    return migrated, reclaimed
+
+
+if __name__ == '__main__':
+    from image import UPLOAD_FOLDER, catalog
+
+    migrated, reclaimed = migrate_legacy_files(catalog, UPLOAD_FOLDER)
+    print(f"Migrated {migrated} images, reclaimed {reclaimed / (1024 * 1024):.1f} MB")
+    print(json.dumps(catalog.storage_report(), indent=2))
@@ -1,101 +1,282 @@
-from flask import Flask, request, jsonify, send_from_directory
-from flask_cors import CORS
-import openai
-import os
-import uuid
-from datetime import datetime
-import json
-
-# Set your OpenAI API key
-openai.api_key = 'your_openai_api_key'
-
-app = Flask(__name__)
-CORS(app)
-
-# Configuration
-UPLOAD_FOLDER = 'generated_images'
-DATABASE_FILE = 'images_db.json'
-
-# Create upload folder if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-def load_database():
-    try:
-        with open(DATABASE_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {'images': []}
-
-def save_database(data):
-    with open(DATABASE_FILE, 'w') as f:
-        json.dump(data, f)
-
-@app.route('/generate-image', methods=['POST'])
-def generate_image():
-    try:
-        data = request.json
-
-        if not data.get("text_prompt"):
-            return jsonify({"error": "Text prompt is required"}), 400
-
-        # Use OpenAI's DALL·E API to generate an image
-        response = openai.Image.create(
-            prompt=data.get("text_prompt"),
-            n=1,  # Number of images to generate
-            size="1024x1024"  # Image size
-        )
-
-        # Get the image URL
-        image_url = response['data'][0]['url']
-
-        # Generate unique filename
-        filename = f"{uuid.uuid4()}.png"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-
-        # Download the image
-        image_response = requests.get(image_url)
-        image_response.raise_for_status()
-
-        # Save the image file
-        with open(filepath, 'wb') as f:
-            f.write(image_response.content)
-
-        # Update database
-        db = load_database()
-        db['images'].append({
-            'filename': filename,
-            'prompt': data.get("text_prompt"),
-            'timestamp': datetime.now().isoformat(),
-            'image_url': image_url
-        })
-        save_database(db)
-
-        return jsonify({
-            "message": "Image generated successfully",
-            "filename": filename
-        }), 200
-
-    except openai.error.OpenAIError as e:
-        return jsonify({
-            "error": "Failed to communicate with OpenAI API",
-            "details": str(e)
-        }), 500
-    except Exception as e:
-        return jsonify({
-            "error": "Server error",
-            "details": str(e)
-        }), 500
-
-@app.route('/images', methods=['GET'])
-def get_images():
-    db = load_database()
-    return jsonify({
-        "images": sorted(db['images'], key=lambda x: x['timestamp'], reverse=True)
-    })
-
-@app.route('/images/<filename>')
-def serve_image(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
-
-if __name__ == '__main__':
-    app.run(debug=True)
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory
+from flask_cors import CORS
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from catalog import STATUS_FAILED, STATUS_PENDING, STATUS_READY, ImageCatalog, InvalidCursor, prompt_key
+from providers import ImageProviderError, create_provider
+from storage import ImageDownloader, blob_filename, stage_content_addressed
+from thumbnails import VARIANT_FORMATS, VARIANT_SIZES, ThumbnailCache, VariantNotFound
+
+app = Flask(__name__)
+CORS(app)
+
+# Configuration
+# Absolute so send_from_directory reads from the same place downloads are written
+UPLOAD_FOLDER = os.path.abspath(os.getenv('IMAGE_UPLOAD_FOLDER', 'generated_images'))
+THUMBNAIL_FOLDER = os.path.join(UPLOAD_FOLDER, '.variants')
+# Image files never change once written, so clients may cache them for a year
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+# Repeated prompts within this window reuse the earlier image (0 disables)
+PROMPT_CACHE_SECONDS = int(os.getenv('IMAGE_PROMPT_CACHE_SECONDS', str(24 * 60 * 60)))
+# Upper bound on prompts per batch request and on renders running at once
+BATCH_MAX_PROMPTS = int(os.getenv('IMAGE_BATCH_MAX_PROMPTS', '50'))
+BATCH_CONCURRENCY = int(os.getenv('IMAGE_BATCH_CONCURRENCY', '4'))
+CATALOG_FILE = os.getenv('IMAGE_CATALOG_FILE', 'images.sqlite3')
+LEGACY_DATABASE_FILE = 'images_db.json'
+
+# Create upload folder if it doesn't exist
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+catalog = ImageCatalog(CATALOG_FILE)
+# Carry over records from the old JSON file the first time the catalog starts
+if catalog.count() == 0:
+    catalog.import_json(LEGACY_DATABASE_FILE)
+
+# Generated images are streamed to disk on a background pool
+downloader = ImageDownloader()
+
+# Resized variants for gallery previews, bounded LRU cache on disk
+thumbnails = ThumbnailCache(UPLOAD_FOLDER, THUMBNAIL_FOLDER)
+
+# Batch renders share one pool so concurrent batches stay within the limit
+image_provider = create_provider()
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='image-batch')
+
+def find_cached_image(prompt):
+    """Recent image for the same prompt, or None when the prompt cache is off."""
+    if not PROMPT_CACHE_SECONDS:
+        return None
+    since = (datetime.now() - timedelta(seconds=PROMPT_CACHE_SECONDS)).isoformat()
+    return catalog.find_recent_by_prompt(prompt, since)
+
+@app.route('/generate-image', methods=['POST'])
+def generate_image():
+    try:
+        data = request.json
+
+        if not data.get("text_prompt"):
+            return jsonify({"error": "Text prompt is required"}), 400
+
+        # Reuse a recent image for the same prompt instead of paying for a new render
+        existing = find_cached_image(data.get("text_prompt"))
+        if existing:
+            catalog.increment_counter('prompt_cache_hits')
+            return jsonify({
+                "message": "Image reused for repeated prompt",
+                "filename": existing['filename'],
+                "status": existing['status'],
+                "cached": True
+            }), 200
+
+        # The provider renders (or requests) the image now; its bytes are fetched lazily
+        image_url, chunks = image_provider.generate(data.get("text_prompt"))
+
+        # Generate unique filename; the bytes are stored under their content hash
+        filename = f"{uuid.uuid4()}.png"
+
+        # Record the image as pending, then download it off the request thread
+        catalog.add(
+            filename=filename,
+            prompt=data.get("text_prompt"),
+            timestamp=datetime.now().isoformat(),
+            image_url=image_url,
+            status=STATUS_PENDING
+        )
+        downloader.submit(
+            chunks,
+            UPLOAD_FOLDER,
+            on_success=lambda blob: catalog.attach_blob(filename, blob.content_hash, blob.size, place=blob.place),
+            on_failure=lambda error: catalog.set_status(filename, STATUS_FAILED, str(error)),
+            label=image_url or filename
+        )
+
+        return jsonify({
+            "message": "Image generated, download queued",
+            "filename": filename,
+            "status": STATUS_PENDING,
+            "cached": False
+        }), 202
+
+    except ImageProviderError as e:
+        return jsonify({
+            "error": "Image provider failed to generate the image",
+            "details": str(e)
+        }), 500
+    except Exception as e:
+        return jsonify({
+            "error": "Server error",
+            "details": str(e)
+        }), 500
+
+def render_batch_item(prompt):
+    """Generate and store one image for a batch. Runs on the batch pool."""
+    existing = find_cached_image(prompt)
+    if existing:
+        catalog.increment_counter('prompt_cache_hits')
+        return {"filename": existing['filename'], "status": existing['status'], "cached": True}
+
+    image_url, chunks = image_provider.generate(prompt)
+    blob = stage_content_addressed(UPLOAD_FOLDER, chunks)
+
+    filename = f"{uuid.uuid4()}.png"
+    catalog.add(
+        filename=filename,
+        prompt=prompt,
+        timestamp=datetime.now().isoformat(),
+        image_url=image_url,
+        status=STATUS_PENDING
+    )
+    try:
+        catalog.attach_blob(filename, blob.content_hash, blob.size, place=blob.place)
+    except BaseException:
+        blob.discard()
+        raise
+    return {"filename": filename, "status": STATUS_READY, "cached": False}
+
+def stream_batch_results(prompts):
+    # Identical prompts in one batch are rendered once and reported for every index
+    groups = {}
+    for index, prompt in enumerate(prompts):
+        groups.setdefault(prompt_key(prompt), []).append(index)
+
+    futures = {
+        batch_executor.submit(render_batch_item, prompts[indices[0]]): indices
+        for indices in groups.values()
+    }
+    succeeded = failed = 0
+    try:
+        for future in as_completed(futures):
+            indices = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"status": STATUS_FAILED, "error": str(e)}
+
+            for position, index in enumerate(indices):
+                item = {"index": index, "prompt": prompts[index], **result}
+                if position and item['status'] != STATUS_FAILED:
+                    item['cached'] = True
+                if item['status'] == STATUS_FAILED:
+                    failed += 1
+                else:
+                    succeeded += 1
+                yield json.dumps(item) + "\n"
+
+        yield json.dumps({"complete": True, "succeeded": succeeded, "failed": failed}) + "\n"
+    finally:
+        # Client went away: don't start renders nobody will read
+        for future in futures:
+            future.cancel()
+
+@app.route('/generate-images', methods=['POST'])
+def generate_images():
+    # One NDJSON line per prompt as it finishes, in completion order, then a summary line
+    data = request.get_json(silent=True) or {}
+    prompts = data.get("prompts")
+
+    if not isinstance(prompts, list) or not prompts:
+        return jsonify({"error": "prompts must be a non-empty list"}), 400
+    if len(prompts) > BATCH_MAX_PROMPTS:
+        return jsonify({"error": f"At most {BATCH_MAX_PROMPTS} prompts per batch"}), 400
+    if not all(isinstance(prompt, str) and prompt.strip() for prompt in prompts):
+        return jsonify({"error": "Every prompt must be a non-empty string"}), 400
+
+    return Response(stream_batch_results(prompts), mimetype='application/x-ndjson')
+
+@app.route('/images', methods=['GET'])
+def get_images():
+    # Newest first, paginated with ?limit= and ?cursor=, optional prompt search with ?q=
+    try:
+        images, next_cursor = catalog.list(
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor'),
+            query=request.args.get('q')
+        )
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "images": images,
+        "next_cursor": next_cursor
+    })
+
+@app.route('/images/<filename>/status', methods=['GET'])
+def get_image_status(filename):
+    image = catalog.get(filename)
+    if image is None:
+        return jsonify({"error": "Image not found"}), 404
+    return jsonify(image)
+
+@app.route('/images/<filename>', methods=['DELETE'])
+def delete_image(filename):
+    # Only delete the file once no other catalog entry shares it; the catalog
+    # calls these inside the transaction that drops the last reference
+    removed = []
+
+    def unlink_file(stored):
+        thumbnails.discard(stored)
+        try:
+            os.remove(os.path.join(UPLOAD_FOLDER, stored))
+        except FileNotFoundError:
+            pass
+        removed.append(stored)
+
+    try:
+        catalog.remove(
+            filename,
+            unlink=lambda blob_hash: unlink_file(blob_filename(blob_hash)),
+            unlink_legacy=unlink_file,
+        )
+    except KeyError:
+        return jsonify({"error": "Image not found"}), 404
+    return jsonify({"message": "Image deleted", "file_removed": bool(removed)})
+
+@app.route('/storage/report', methods=['GET'])
+def storage_report():
+    return jsonify(catalog.storage_report())
+
+def stored_filename(filename):
+    """Map a catalog filename to the content-addressed file holding its bytes."""
+    image = catalog.get(filename)
+    if image and image['blob_hash']:
+        return blob_filename(image['blob_hash'])
+    return filename
+
+@app.route('/images/<filename>')
+def serve_image(filename):
+    filename = stored_filename(filename)
+
+    # ?size=128|256|512 serves a resized variant; ?format=webp|jpeg picks the encoding
+    size = request.args.get('size', type=int)
+    if size is None:
+        return send_from_directory(UPLOAD_FOLDER, filename, max_age=IMAGE_CACHE_MAX_AGE)
+
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    if size not in VARIANT_SIZES or fmt not in VARIANT_FORMATS:
+        return jsonify({
+            "error": "Unsupported variant",
+            "sizes": list(VARIANT_SIZES),
+            "formats": list(VARIANT_FORMATS)
+        }), 400
+
+    try:
+        path, mimetype = thumbnails.get(filename, size, fmt)
+    except VariantNotFound:
+        return jsonify({"error": "Image not found"}), 404
+
+    # Variants are derived from immutable originals, so the variant name is a stable ETag
+    response = send_file(
+        path, mimetype=mimetype, max_age=IMAGE_CACHE_MAX_AGE,
+        conditional=True, etag=os.path.basename(path)
+    )
+    response.cache_control.immutable = True
+    response.vary.add('Accept')
+    return response
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,89 @@
+"""
+Image generation backends.
+
+A provider turns a prompt into ``(image_url, chunks)``: the URL the image came
+from (None for local renders) and an iterable of PNG byte chunks that can be
+written straight into content-addressed storage.
+
+``IMAGE_PROVIDER=fake`` swaps the OpenAI API for ``FakeImageProvider``, which
+renders a PNG locally after a delay, so batches can be exercised offline.
+"""
+import hashlib
+import io
+import os
+import time
+
+from PIL import Image, ImageDraw
+
+from storage import CHUNK_SIZE, DOWNLOAD_TIMEOUT, create_session
+
+IMAGE_SIZE = '1024x1024'
+
+
+class ImageProviderError(Exception):
+    pass
+
+
+class OpenAIImageProvider:
+    name = 'openai'
+
+    def __init__(self, session=None):
+        self.session = session or create_session()
+
+    def generate(self, prompt):
+        import openai
+
+        try:
+            response = openai.Image.create(prompt=prompt, n=1, size=IMAGE_SIZE)
+        except openai.error.OpenAIError as e:
+            raise ImageProviderError(f'OpenAI API error: {e}') from e
+        image_url = response['data'][0]['url']
+        return image_url, self._download(image_url)
+
+    def _download(self, url):
+        with self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            yield from response.iter_content(chunk_size=CHUNK_SIZE)
+
+
+class FakeImageProvider:
+    """Renders a deterministic PNG per prompt after ``delay`` seconds.
+
+    Prompts containing ``fail_marker`` raise ``ImageProviderError``, to
+    exercise partial failures.
+    """
+
+    name = 'fake'
+
+    def __init__(self, delay=0.0, size=256, fail_marker='[fail]'):
+        self.delay = delay
+        self.size = size
+        self.fail_marker = fail_marker
+
+    def generate(self, prompt):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_marker and self.fail_marker in prompt:
+            raise ImageProviderError(f'Fake provider refused prompt: {prompt!r}')
+        return None, [self.render(prompt)]
+
+    def render(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+        image = Image.new('RGB', (self.size, self.size), tuple(digest[:3]))
+        draw = ImageDraw.Draw(image)
+        step = self.size // 16
+        for i in range(8):
+            color = tuple(digest[3 + i * 3:6 + i * 3])
+            draw.rectangle([i * step, i * step, self.size - i * step, self.size - i * step], outline=color, width=4)
+        encoded = io.BytesIO()
+        image.save(encoded, 'PNG')
+        return encoded.getvalue()
+
+
+def create_provider(name=None):
+    name = name or os.getenv('IMAGE_PROVIDER', 'openai')
+    if name == 'fake':
+        return FakeImageProvider(delay=float(os.getenv('FAKE_IMAGE_DELAY', '0.5')))
+    if name == 'openai':
+        return OpenAIImageProvider()
+    raise ValueError(f'Unknown image provider {name!r}')
@@ -0,0 +1,159 @@
+"""
+Background download and storage of generated images.
+
+Images are streamed to disk in fixed-size chunks through a pooled HTTP
+session, written to a temporary file in the destination directory and
+renamed into place, so memory per download stays flat and readers never
+see a partial file. Files are content-addressed: each one is named by the
+SHA-256 of its bytes, so identical renders are stored once.
+
+New bytes are first staged (``StagedBlob``) and only moved to their
+content-addressed name by ``place()``, which the catalog runs inside the
+transaction that attaches the blob. A concurrent delete of the same blob's
+last reference is serialized against it, so a blob is never unlinked
+between the existence check and the attach.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT = (5, 60)  # (connect, read) seconds
+DOWNLOAD_WORKERS = int(os.getenv('IMAGE_DOWNLOAD_WORKERS', '4'))
+
+
+def create_session(pool_size=DOWNLOAD_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def write_atomically(dest_path, chunks):
+    """Write an iterable of byte chunks to ``dest_path`` via a temp file and rename.
+
+    Returns the number of bytes written.
+    """
+    directory = os.path.dirname(dest_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.part')
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                if chunk:
+                    f.write(chunk)
+                    size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size
+
+
+def blob_filename(content_hash, suffix='.png'):
+    return f'{content_hash}{suffix}'
+
+
+class StagedBlob:
+    """Hashed bytes in a temporary file, not yet under their content-addressed name."""
+
+    def __init__(self, directory, tmp_path, content_hash, size, suffix='.png'):
+        self.tmp_path = tmp_path
+        self.content_hash = content_hash
+        self.size = size
+        self.path = os.path.join(directory, blob_filename(content_hash, suffix))
+
+    def place(self):
+        """Move the bytes into place, or drop them if that blob is already stored."""
+        if os.path.exists(self.path):
+            self.discard()
+        else:
+            os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def stage_content_addressed(directory, chunks, suffix='.png'):
+    """Write byte chunks to a temporary file in ``directory``, hashing them on the way."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                if chunk:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StagedBlob(directory, tmp_path, digest.hexdigest(), size, suffix)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageDownloader:
+    """Runs downloads on a small thread pool, off the request thread."""
+
+    def __init__(self, workers=DOWNLOAD_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-download')
+
+    def submit(self, chunks, directory, on_success=None, on_failure=None, label=None):
+        """Queue writing ``chunks`` into ``directory``.
+
+        ``chunks`` is usually an image provider's lazy download, so the
+        transfer itself happens on the worker thread. ``label`` names the
+        image in log messages.
+
+        ``on_success(blob)`` or ``on_failure(error)`` runs on the worker thread
+        when it finishes. ``on_success`` gets the ``StagedBlob`` and is
+        responsible for placing it; without one the blob is placed directly.
+        """
+        def run():
+            blob = None
+            try:
+                blob = stage_content_addressed(directory, chunks)
+                if on_success:
+                    on_success(blob)
+                else:
+                    blob.place()
+            except Exception as e:
+                # Covers a failing on_success too, so the image never stays pending
+                logger.error('Image download failed for %s: %s', label, e)
+                if blob is not None:
+                    blob.discard()
+                if on_failure:
+                    try:
+                        on_failure(e)
+                    except Exception:
+                        logger.exception('Image download failure handler raised for %s', label)
+
+        return self.executor.submit(run)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,381 @@
+"""
+Tests for the image service, run from this directory::
+
+    python -m unittest
+
+Images are rendered by ``FakeImageProvider`` and every test gets its own
+catalog and storage folder, so nothing touches the network or the real
+``generated_images`` folder.
+"""
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+_module_dir = tempfile.mkdtemp(prefix='image-tests-')
+os.environ['IMAGE_PROVIDER'] = 'fake'
+os.environ['IMAGE_UPLOAD_FOLDER'] = os.path.join(_module_dir, 'generated_images')
+os.environ['IMAGE_CATALOG_FILE'] = os.path.join(_module_dir, 'images.sqlite3')
+
+from PIL import Image  # noqa: E402
+
+import image  # noqa: E402 - reads the environment above at import
+from catalog import STATUS_READY, ImageCatalog, InvalidCursor, decode_cursor  # noqa: E402
+from dedupe import migrate_legacy_files  # noqa: E402
+from providers import FakeImageProvider  # noqa: E402
+from storage import ImageDownloader, stage_content_addressed  # noqa: E402
+from thumbnails import ThumbnailCache  # noqa: E402
+
+
+def tearDownModule():
+    shutil.rmtree(_module_dir, ignore_errors=True)
+
+
+class ImageServiceTestCase(unittest.TestCase):
+    """Points the Flask app at a fresh catalog, folder, downloader and provider for each test."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.folder = os.path.join(self.dir, 'generated_images')
+        os.makedirs(self.folder)
+
+        self.catalog = ImageCatalog(os.path.join(self.dir, 'images.sqlite3'))
+        self.thumbnails = ThumbnailCache(self.folder, os.path.join(self.folder, '.variants'))
+        self.downloader = ImageDownloader(workers=2)
+        self.addCleanup(self.downloader.shutdown)
+        self.provider = FakeImageProvider(size=64)
+        for name, value in {
+            'UPLOAD_FOLDER': self.folder,
+            'catalog': self.catalog,
+            'thumbnails': self.thumbnails,
+            'downloader': self.downloader,
+            'image_provider': self.provider,
+            'PROMPT_CACHE_SECONDS': 0,
+        }.items():
+            patcher = mock.patch.object(image, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = image.app.test_client()
+
+    def add_ready(self, filename, prompt, timestamp):
+        self.catalog.add(filename=filename, prompt=prompt, timestamp=timestamp)
+
+    def generate(self, prompt, chunks=None):
+        """POST /generate-image; ``chunks`` stand in for the provider's image bytes."""
+        with mock.patch.object(self.provider, 'generate', wraps=self.provider.generate) as generate:
+            if chunks is not None:
+                generate.return_value = ('http://img', chunks)
+            response = self.client.post('/generate-image', json={'text_prompt': prompt})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json['status'], 'pending')
+        return response.json['filename']
+
+
+class CatalogTests(ImageServiceTestCase):
+    def test_older_catalog_is_migrated_and_searchable(self):
+        # Written before the status and blob columns, by an SQLite without FTS5
+        path = os.path.join(self.dir, 'old.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.executescript("""
+            CREATE TABLE images (
+                id INTEGER PRIMARY KEY, filename TEXT NOT NULL UNIQUE, prompt TEXT NOT NULL,
+                timestamp TEXT NOT NULL, image_url TEXT
+            );
+            INSERT INTO images (filename, prompt, timestamp) VALUES ('old.png', 'Sunset over Goa', '2024-01-01T00:00:00');
+        """)
+        connection.close()
+
+        catalog = ImageCatalog(path)
+        image_row = catalog.get('old.png')
+        self.assertEqual(image_row['status'], STATUS_READY)
+        self.assertIsNone(image_row['blob_hash'])
+        self.assertEqual([row['filename'] for row in catalog.list(query='sunset')[0]], ['old.png'])
+        self.assertIsNotNone(catalog.find_recent_by_prompt('  sunset OVER goa ', '2023-01-01'))
+
+        # Reopening an up-to-date catalog is a no-op
+        self.assertEqual(ImageCatalog(path).count(), 1)
+
+    def test_search_matches_words_and_treats_input_as_text(self):
+        self.add_ready('a.png', 'Red lanterns for Diwali', '2024-01-01T00:00:00')
+        self.add_ready('b.png', 'Blue sky', '2024-01-02T00:00:00')
+        self.add_ready('c.png', 'red "OR" blue', '2024-01-03T00:00:00')
+
+        def search(query):
+            response = self.client.get('/images', query_string={'q': query})
+            self.assertEqual(response.status_code, 200)
+            return [row['filename'] for row in response.json['images']]
+
+        self.assertEqual(search('red'), ['c.png', 'a.png'])
+        self.assertEqual(search('diwali LANTERNS'), ['a.png'])
+        self.assertEqual(search('red OR'), ['c.png'])
+        self.assertEqual(search('"unbalanced'), [])
+
+    def test_keyset_cursor_pages_newest_first(self):
+        for index, timestamp in enumerate(['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-03', '2024-01-04']):
+            self.add_ready(f'{index}.png', f'prompt {index}', timestamp)
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get('/images', query_string=params).json
+            seen += [row['filename'] for row in page['images']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        # Equal timestamps are ordered by id, so none is skipped or repeated at a page edge
+        self.assertEqual(seen, ['4.png', '3.png', '2.png', '1.png', '0.png'])
+
+        # A row added after the first page does not shift later pages
+        first = self.client.get('/images', query_string={'limit': 2}).json
+        self.add_ready('new.png', 'new', '2024-02-01')
+        second = self.client.get('/images', query_string={'limit': 2, 'cursor': first['next_cursor']}).json
+        self.assertEqual([row['filename'] for row in second['images']], ['2.png', '1.png'])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/images', query_string={'cursor': 'nope'}).status_code, 400)
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('!!')
+
+    def test_legacy_json_is_imported_once(self):
+        path = os.path.join(self.dir, 'images_db.json')
+        with open(path, 'w') as f:
+            json.dump({'images': [
+                {'filename': 'x.png', 'prompt': 'Old one', 'timestamp': '2023-05-01T10:00:00', 'image_url': 'http://x'},
+                {'filename': 'y.png', 'prompt': 'Old two', 'timestamp': '2023-05-02T10:00:00'},
+            ]}, f)
+        self.assertEqual(self.catalog.import_json(path), 2)
+        self.assertEqual(self.catalog.import_json(path), 0)
+        self.assertEqual(self.catalog.get('x.png')['image_url'], 'http://x')
+        self.assertEqual(self.catalog.import_json(os.path.join(self.dir, 'missing.json')), 0)
+
+
+class DownloadTests(ImageServiceTestCase):
+    def status(self, filename):
+        return self.client.get(f'/images/{filename}/status').json
+
+    def part_files(self):
+        return [name for name in os.listdir(self.folder) if name.endswith('.part')]
+
+    def test_image_is_pending_until_written(self):
+        written = threading.Event()
+        png = b'\x89PNG kite festival'
+
+        def slow_chunks():
+            # Runs on the download pool; the request has already returned
+            written.wait(5)
+            yield png
+
+        filename = self.generate('Kite festival', slow_chunks())
+        self.assertEqual(self.status(filename)['status'], 'pending')
+        self.assertEqual(self.client.get('/images').json['images'], [])
+        written.set()
+        self.downloader.shutdown()
+
+        self.assertEqual(self.status(filename)['status'], STATUS_READY)
+        response = self.client.get(f'/images/{filename}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, png)
+        self.assertEqual([row['filename'] for row in self.client.get('/images').json['images']], [filename])
+        self.assertEqual(self.part_files(), [])
+
+    def test_failed_download_marks_the_image_failed(self):
+        def broken_chunks():
+            yield b'partial'
+            raise OSError('connection reset')
+
+        with self.assertLogs('storage', 'ERROR'):
+            filename = self.generate('Broken', broken_chunks())
+            self.downloader.shutdown()
+        self.assertEqual(self.status(filename)['status'], 'failed')
+        self.assertIn('connection reset', self.status(filename)['error'])
+        self.assertEqual(self.part_files(), [])
+
+    def test_provider_error_is_reported(self):
+        response = self.client.post('/generate-image', json={'text_prompt': 'Broken [fail]'})
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('refused', response.json['details'])
+        self.assertEqual(self.catalog.count(), 0)
+
+    def test_failing_success_handler_marks_the_image_failed(self):
+        with mock.patch.object(self.catalog, 'attach_blob', side_effect=sqlite3.OperationalError('database is locked')), \
+                self.assertLogs('storage', 'ERROR'):
+            filename = self.generate('Locked', [b'locked'])
+            self.downloader.shutdown()
+        self.assertEqual(self.status(filename)['status'], 'failed')
+        self.assertIn('database is locked', self.status(filename)['error'])
+        self.assertEqual(self.part_files(), [])
+
+
+class ThumbnailTests(ImageServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filename = 'temple.png'
+        Image.new('RGB', (600, 600), (200, 120, 40)).save(os.path.join(self.folder, self.filename))
+        self.add_ready(self.filename, 'Temple at dusk', '2024-01-01')
+
+    def test_variant_is_resized_and_conditionally_cached(self):
+        url = f'/images/{self.filename}'
+        response = self.client.get(url, query_string={'size': 128}, headers={'Accept': 'image/webp,*/*'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/webp')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('Accept', response.headers['Vary'])
+        with Image.open(io.BytesIO(response.data)) as variant:
+            self.assertEqual(variant.size, (128, 128))
+
+        etag = response.headers['ETag']
+        again = self.client.get(url, query_string={'size': 128}, headers={'Accept': 'image/webp', 'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+
+        jpeg = self.client.get(url, query_string={'size': 128})
+        self.assertEqual(jpeg.mimetype, 'image/jpeg')
+        self.assertNotEqual(jpeg.headers['ETag'], etag)
+
+    def test_unknown_variants_and_images_are_rejected(self):
+        url = f'/images/{self.filename}'
+        self.assertEqual(self.client.get(url, query_string={'size': 100}).status_code, 400)
+        self.assertEqual(self.client.get(url, query_string={'size': 128, 'format': 'gif'}).status_code, 400)
+        self.assertEqual(self.client.get('/images/missing.png', query_string={'size': 128}).status_code, 404)
+
+    def test_least_recently_served_variant_is_evicted(self):
+        first = self.thumbnails.get(self.filename, 128, 'jpeg')[0]
+        second = self.thumbnails.get(self.filename, 256, 'jpeg')[0]
+        budget = os.path.getsize(first) + os.path.getsize(second)
+        # A restarted cache picks up the variants already on disk
+        cache = ThumbnailCache(self.folder, self.thumbnails.cache_dir, max_bytes=budget)
+        self.assertEqual(cache.stats()['variants'], 2)
+
+        cache.get(self.filename, 128, 'jpeg')  # now the most recently served
+        third = cache.get(self.filename, 128, 'webp')[0]
+        self.assertTrue(os.path.exists(first))
+        self.assertTrue(os.path.exists(third))
+        self.assertFalse(os.path.exists(second))
+        self.assertLessEqual(cache.stats()['bytes'], budget)
+
+
+class BlobStorageTests(ImageServiceTestCase):
+    def blob_files(self):
+        return sorted(name for name in os.listdir(self.folder) if name.endswith('.png'))
+
+    def store(self, filename, data):
+        """What a finished download does for a generated image."""
+        self.catalog.add(filename=filename, prompt=filename, timestamp='2024-01-01', status='pending')
+        staged = stage_content_addressed(self.folder, [data])
+        self.catalog.attach_blob(filename, staged.content_hash, staged.size, place=staged.place)
+
+    def test_identical_images_share_one_refcounted_blob(self):
+        self.store('first.png', b'holi colours')
+        self.store('second.png', b'holi colours')
+        self.assertEqual(len(self.blob_files()), 1)
+        report = self.client.get('/storage/report').json
+        self.assertEqual((report['entries'], report['unique_blobs']), (2, 1))
+        self.assertEqual(report['shared_bytes_saved'], report['stored_bytes'])
+
+        response = self.client.delete('/images/first.png')
+        self.assertFalse(response.json['file_removed'])
+        self.assertEqual(self.client.get('/images/second.png').data, b'holi colours')
+
+        response = self.client.delete('/images/second.png')
+        self.assertTrue(response.json['file_removed'])
+        self.assertEqual(self.blob_files(), [])
+        self.assertEqual(self.client.delete('/images/second.png').status_code, 404)
+
+    def test_upload_staged_during_a_delete_keeps_its_file(self):
+        self.store('first.png', b'pongal')
+        # Same bytes staged while the only reference is being deleted
+        staged = stage_content_addressed(self.folder, [b'pongal'])
+        self.client.delete('/images/first.png')
+        self.assertEqual(self.blob_files(), [])
+
+        self.catalog.add(filename='late.png', prompt='Pongal', timestamp='2024-01-01', status='pending')
+        self.catalog.attach_blob('late.png', staged.content_hash, staged.size, place=staged.place)
+        self.assertEqual(self.client.get('/images/late.png').data, b'pongal')
+
+    def test_deleting_a_legacy_entry_removes_its_file_and_variants(self):
+        Image.new('RGB', (300, 300)).save(os.path.join(self.folder, 'old.png'))
+        self.add_ready('old.png', 'Older image', '2023-01-01')
+        variant = self.thumbnails.get('old.png', 128, 'jpeg')[0]
+
+        response = self.client.delete('/images/old.png')
+        self.assertTrue(response.json['file_removed'])
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 'old.png')))
+        self.assertFalse(os.path.exists(variant))
+        self.assertEqual(self.thumbnails.stats()['variants'], 0)
+
+    def test_repeated_prompt_reuses_the_recent_image(self):
+        with mock.patch.object(image, 'PROMPT_CACHE_SECONDS', 3600):
+            first = self.generate('Onam boat race', [b'boat'])
+            again = self.client.post('/generate-image', json={'text_prompt': '  onam BOAT race'}).json
+        self.assertTrue(again['cached'])
+        self.assertEqual(again['filename'], first)
+        self.assertEqual(self.client.get('/storage/report').json['prompt_cache_hits'], 1)
+
+    def test_legacy_files_are_moved_into_blobs(self):
+        png = b'legacy'
+        for filename, data in (('a.png', png), ('b.png', png), ('c.png', b'other')):
+            with open(os.path.join(self.folder, filename), 'wb') as f:
+                f.write(data)
+            self.add_ready(filename, filename, '2023-01-01')
+        self.add_ready('gone.png', 'file never written', '2023-01-01')
+
+        migrated, reclaimed = migrate_legacy_files(self.catalog, self.folder)
+        self.assertEqual((migrated, reclaimed), (3, len(png)))
+        self.assertEqual(len(self.blob_files()), 2)
+        self.assertNotIn('a.png', self.blob_files())
+        self.assertEqual(self.client.get('/images/b.png').data, png)
+        self.assertEqual(self.catalog.storage_report()['legacy_bytes_removed'], len(png))
+        self.assertEqual(migrate_legacy_files(self.catalog, self.folder), (0, 0))
+
+
+class BatchTests(ImageServiceTestCase):
+    def post_batch(self, prompts):
+        response = self.client.post('/generate-images', json={'prompts': prompts})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        return [json.loads(line) for line in response.data.decode().splitlines()]
+
+    def test_batch_streams_one_line_per_prompt_with_failures(self):
+        prompts = ['Lohri bonfire', 'Broken [fail]', '  lohri BONFIRE', 'Baisakhi fields']
+        lines = self.post_batch(prompts)
+        summary = lines.pop()
+        self.assertEqual(summary, {'complete': True, 'succeeded': 3, 'failed': 1})
+
+        by_index = {line['index']: line for line in lines}
+        self.assertEqual(sorted(by_index), [0, 1, 2, 3])
+        self.assertEqual(by_index[1]['status'], 'failed')
+        self.assertIn('refused', by_index[1]['error'])
+        self.assertEqual(by_index[3]['status'], STATUS_READY)
+        # The repeated prompt is rendered once and reported for both indices
+        self.assertEqual(by_index[0]['filename'], by_index[2]['filename'])
+        self.assertEqual(sorted([by_index[0]['cached'], by_index[2]['cached']]), [False, True])
+        self.assertEqual(by_index[2]['prompt'], prompts[2])
+        self.assertEqual(self.client.get(f"/images/{by_index[3]['filename']}").status_code, 200)
+
+    def test_batch_results_arrive_in_completion_order(self):
+        real = self.provider.generate
+
+        def generate(prompt):
+            if prompt == 'slow':
+                time.sleep(0.2)
+            return real(prompt)
+
+        with mock.patch.object(self.provider, 'generate', side_effect=generate):
+            lines = self.post_batch(['slow', 'fast'])
+        self.assertEqual([line.get('prompt') for line in lines], ['fast', 'slow', None])
+
+    def test_invalid_batches_are_rejected(self):
+        for body in ({}, {'prompts': []}, {'prompts': 'one'}, {'prompts': ['ok', '  ']},
+                     {'prompts': ['p'] * (image.BATCH_MAX_PROMPTS + 1)}):
+            self.assertEqual(self.client.post('/generate-images', json=body).status_code, 400, body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+On-demand resized variants of generated images.
+
+Each (image, size, format) variant is rendered once with Pillow and kept in
+an on-disk cache bounded by total bytes. Least recently served variants are
+evicted first; recency survives restarts because every hit touches the
+file's modification time.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from storage import write_atomically
+
+VARIANT_SIZES = (128, 256, 512)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DEFAULT_CACHE_BYTES = int(os.getenv('THUMBNAIL_CACHE_BYTES', str(512 * 1024 * 1024)))
+
+
+class VariantNotFound(Exception):
+    pass
+
+
+class ThumbnailCache:
+    def __init__(self, source_dir, cache_dir, max_bytes=DEFAULT_CACHE_BYTES):
+        self.source_dir = os.path.abspath(source_dir)
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> size, least recently used first
+        self._total = 0
+        self._lock = threading.Lock()
+        self._render_locks = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._total += size
+
+    def variant_path(self, filename, size, fmt):
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(self.cache_dir, f'{stem}_{size}.{fmt}')
+
+    def get(self, filename, size, fmt):
+        """Return ``(path, mimetype)`` for the variant, rendering it on first use."""
+        if size not in VARIANT_SIZES or fmt not in VARIANT_FORMATS:
+            raise ValueError(f'Unsupported variant {size}px {fmt}')
+
+        source = os.path.join(self.source_dir, filename)
+        if os.path.basename(filename) != filename or not os.path.isfile(source):
+            raise VariantNotFound(filename)
+
+        path = self.variant_path(filename, size, fmt)
+        mimetype = VARIANT_FORMATS[fmt][1]
+        if self._touch(path):
+            return path, mimetype
+
+        # One render per variant even if several requests miss at once
+        with self._lock:
+            render_lock = self._render_locks.setdefault(path, threading.Lock())
+        with render_lock:
+            if not self._touch(path):
+                written = self._render(source, path, size, fmt)
+                self._add(path, written)
+        with self._lock:
+            self._render_locks.pop(path, None)
+        return path, mimetype
+
+    def _render(self, source, path, size, fmt):
+        pil_format, _, options = VARIANT_FORMATS[fmt]
+        with Image.open(source) as image:
+            image.thumbnail((size, size), Image.LANCZOS)
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            encoded = io.BytesIO()
+            image.save(encoded, pil_format, **options)
+        return write_atomically(path, [encoded.getvalue()])
+
+    def _touch(self, path):
+        with self._lock:
+            if path not in self._entries:
+                return False
+            self._entries.move_to_end(path)
+        if not os.path.exists(path):
+            self._forget(path)
+            return False
+        os.utime(path)
+        return True
+
+    def _add(self, path, size):
+        evicted = []
+        with self._lock:
+            self._entries[path] = size
+            self._total += size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old_path, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                evicted.append(old_path)
+        for old_path in evicted:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+
+    def discard(self, filename):
+        """Drop every cached variant of ``filename``."""
+        for size in VARIANT_SIZES:
+            for fmt in VARIANT_FORMATS:
+                path = self.variant_path(filename, size, fmt)
+                self._forget(path)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _forget(self, path):
+        with self._lock:
+            size = self._entries.pop(path, None)
+            if size is not None:
+                self._total -= size
+
+    def stats(self):
+        with self._lock:
+            return {'variants': len(self._entries), 'bytes': self._total, 'max_bytes': self.max_bytes}
+